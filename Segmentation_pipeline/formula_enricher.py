@@ -1,18 +1,25 @@
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+import os
 import sys
 
 from .enricher_utils import enrich_anchor, set_enrichment_status
 
+logger = logging.getLogger(__name__)
 
-def enrich_formula_chunks(chunks: List[Dict[str, Any]], doc_id: str = "book") -> None:
-    extractor = _load_formula_extractor()
-    if extractor is None:
+
+def enrich_formula_chunks(chunks: List[Dict[str, Any]], doc_id: str = "book") -> Dict[str, Any]:
+    loaded = _load_formula_extractor()
+    if loaded is None:
         for chunk in chunks:
             if chunk.get("type") == "formula":
                 set_enrichment_status(chunk, "formula", "skipped", "synapta_formula_unavailable")
-        return
+        return {}
+    extract_many, extract_one = loaded
 
+    pending: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    requests: List[Dict[str, Any]] = []
     for chunk in chunks:
         if chunk.get("type") != "formula":
             continue
@@ -21,19 +28,33 @@ def enrich_formula_chunks(chunks: List[Dict[str, Any]], doc_id: str = "book") ->
             set_enrichment_status(chunk, "formula", "skipped", "empty_formula_text")
             continue
         anchor = enrich_anchor(chunk, doc_id)
-        try:
-            synapta_formula = extractor(
-                formula_text=formula_text,
-                page_number=anchor["page_start"],
-                book_id=doc_id,
-                heading_path=anchor["heading_path"],
-                bbox=anchor["bbox"],
-                chapter_number=anchor["chapter_number"],
-                chapter_title=anchor["chapter_title"],
-            )
-        except Exception as exc:
-            set_enrichment_status(chunk, "formula", "error", f"extract_failed:{type(exc).__name__}")
-            continue
+        pending.append((chunk, anchor))
+        requests.append({
+            "formula_text": formula_text,
+            "page_number": anchor["page_start"],
+            "heading_path": anchor["heading_path"],
+            "bbox": anchor["bbox"],
+            "chapter_number": anchor["chapter_number"],
+            "chapter_title": anchor["chapter_title"],
+        })
+
+    # One batch call shares analysis (and LLM enrichment) across repeated formulas;
+    # if it fails, fall back to per-chunk extraction so errors stay per chunk.
+    llm_service = _load_llm_service()
+    try:
+        payloads: Optional[List[Dict[str, Any]]] = extract_many(requests, book_id=doc_id, llm_service=llm_service)
+    except Exception:
+        payloads = None
+
+    for idx, (chunk, anchor) in enumerate(pending):
+        if payloads is not None:
+            synapta_formula = payloads[idx]
+        else:
+            try:
+                synapta_formula = extract_one(book_id=doc_id, **requests[idx])
+            except Exception as exc:
+                set_enrichment_status(chunk, "formula", "error", f"extract_failed:{type(exc).__name__}")
+                continue
 
         if synapta_formula:
             synapta_formula["source_chunk_id"] = anchor["source_chunk_id"]
@@ -49,13 +70,38 @@ def enrich_formula_chunks(chunks: List[Dict[str, Any]], doc_id: str = "book") ->
         else:
             set_enrichment_status(chunk, "formula", "empty", "no_formula_payload")
 
+    unique = len({p["canonical_formula_key"] for p in payloads or [] if p})
+    return {
+        "formulas": len(pending),
+        "unique_formulas": unique,
+        "batched": payloads is not None,
+        "llm": type(llm_service).__name__ if llm_service is not None else None,
+    }
 
-def _load_formula_extractor() -> Optional[Callable[..., Any]]:
+
+def _load_formula_extractor() -> Optional[Tuple[Callable[..., Any], Callable[..., Any]]]:
     root = Path(__file__).resolve().parents[1] / "synapta-formula-segmentation"
     if root.exists():
         sys.path.insert(0, str(root))
     try:
-        from formula_item_extractor import extract_formula_item
-        return extract_formula_item
+        from formula_item_extractor import extract_formula_item, extract_formula_items
+        return extract_formula_items, extract_formula_item
     except Exception:
         return None
+
+
+def _load_llm_service() -> Optional[Any]:
+    """LLM for variable/summary enrichment, chosen by SYNAPTA_FORMULA_ENRICH_LLM (gemini, openai, claude; unset = none)."""
+    backend = (os.environ.get("SYNAPTA_FORMULA_ENRICH_LLM") or "").strip().lower()
+    if backend in ("", "off", "none"):
+        return None
+    try:
+        from llm_services import AnthropicLLMService, GeminiLLMService, OpenAILLMService
+    except Exception as exc:
+        logger.warning("Formula LLM enrichment unavailable: %s", exc)
+        return None
+    services = {"gemini": GeminiLLMService, "openai": OpenAILLMService, "claude": AnthropicLLMService}
+    if backend not in services:
+        logger.warning("Unknown SYNAPTA_FORMULA_ENRICH_LLM backend: %s", backend)
+        return None
+    return services[backend]()
@@ -17,6 +17,7 @@ from .table_enricher import enrich_table_chunks
 from .image_enricher import enrich_image_chunks
 from .formula_enricher import enrich_formula_chunks
 from .qa_derivation_enricher import enrich_qa_derivation
+from .run_profile import RunProfile
 from .enricher_utils import chapter_from_heading_path, normalize_heading_path
 
 logger = logging.getLogger(__name__)
@@ -28,7 +29,9 @@ def process_mineru_json(
     out_dir: Path,
     char_limit: int = 1500,
 ) -> Tuple[Path, Path]:
+    profile = RunProfile(json_path.stem)
     logger.info("[1/8] Load and normalize MinerU JSON")
+    profile.stage("load")
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
@@ -36,6 +39,7 @@ def process_mineru_json(
     blocks = filter_blocks(raw_blocks)
 
     logger.info("[2/8] Layout correction and visual crop preparation")
+    profile.stage("layout_and_crops")
     layout = LayoutCorrectorJson()
     blocks = layout.process(blocks, page_sizes)
     if pdf_path and pdf_path.exists():
@@ -43,6 +47,7 @@ def process_mineru_json(
         extract_visual_crops(pdf_path, blocks, visual_dir)
 
     logger.info("[3/8] TOC extraction and document tree build")
+    profile.stage("toc_and_tree")
     toc_entries: List[Dict] = []
     toc_source = ""
     if pdf_path and pdf_path.exists():
@@ -63,12 +68,14 @@ def process_mineru_json(
     _prune_empty_sections(doc)
 
     logger.info("[4/8] Build elements")
+    profile.stage("elements")
     elements = finalize_segments(build_elements(doc))
     mark_numbered_lists(elements)
     link_references(elements)
     _annotate_traceability(elements, doc_id=json_path.stem, pdf_path=pdf_path)
 
     logger.info("[5/8] Build chunks")
+    profile.stage("chunks")
     chunker = ChunkerJson(char_limit=char_limit)
     chunks = finalize_segments(chunker.chunk(doc))
     mark_numbered_lists(chunks)
@@ -76,13 +83,15 @@ def process_mineru_json(
     _annotate_traceability(chunks, doc_id=json_path.stem, pdf_path=pdf_path)
 
     logger.info("[6/8] Run table/image/formula enrichers")
-    enrich_table_chunks(chunks, doc_id=json_path.stem, out_dir=out_dir)
-    enrich_image_chunks(chunks, doc_id=json_path.stem, out_dir=out_dir)
-    enrich_formula_chunks(chunks, doc_id=json_path.stem)
+    profile.stage("enrichers")
+    profile.record("table", enrich_table_chunks(chunks, doc_id=json_path.stem, out_dir=out_dir))
+    profile.record("image", enrich_image_chunks(chunks, doc_id=json_path.stem, out_dir=out_dir))
+    profile.record("formula", enrich_formula_chunks(chunks, doc_id=json_path.stem))
     # Re-link after enrichers so equation/caption-derived targets can be resolved.
     link_references(chunks)
 
     logger.info("[7/8] Build QA/derivation sidecars")
+    profile.stage("qa_derivation")
     enrich_qa_derivation(
         chunks=chunks,
         blocks=blocks,
@@ -92,12 +101,14 @@ def process_mineru_json(
     )
 
     logger.info("[8/8] Extract metadata and write outputs")
+    profile.stage("metadata_and_write")
     metadata = extract_metadata(raw_blocks)
 
     out_dir.mkdir(parents=True, exist_ok=True)
     elements_path = out_dir / f"{json_path.stem}_elements.json"
     chunks_path = out_dir / f"{json_path.stem}_chunks.json"
     metadata_path = out_dir / f"{json_path.stem}_metadata.json"
+    profile_path = out_dir / f"{json_path.stem}_run_profile.json"
 
     with open(elements_path, "w", encoding="utf-8") as f:
         json.dump({"doc_id": json_path.stem, "content": elements}, f, ensure_ascii=False, indent=2)
@@ -113,6 +124,18 @@ def process_mineru_json(
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump({"doc_id": json_path.stem, "metadata": metadata}, f, ensure_ascii=False, indent=2)
 
+    profile.stage(None)
+    table_cache = (profile.enrichers.get("table") or {}).get("cache")
+    if table_cache:
+        logger.info(
+            "Table result cache: hits=%d misses=%d evictions=%d size=%.1fMB",
+            table_cache["hits"],
+            table_cache["misses"],
+            table_cache["evictions"],
+            table_cache["size_bytes"] / (1024 * 1024),
+        )
+    profile.write(profile_path)
+
     logger.info(
         "Completed %s: elements=%d chunks=%d",
         json_path.name,
@@ -1,5 +1,6 @@
+from bisect import bisect_right
 import re
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 
 PATTERNS = [
@@ -8,6 +9,89 @@ PATTERNS = [
     (r"\b(?:Equation|Eq\.?)\s*\(?\s*(\d+(?:\.\d+)*)\s*\)?", "equation"),
     (r"\b(?:Appendix)\s+([A-Z])", "appendix"),
 ]
+_COMPILED_INSENSITIVE = [(re.compile(pattern, re.IGNORECASE), rtype) for pattern, rtype in PATTERNS]
+
+# Verb context recorded around a mention: "see Table 2.1", "refer to Table 2.1", "Table 2.1 shows".
+_VERB_BEFORE = re.compile(r"(see|refer\s+to)\s+$", re.IGNORECASE)
+_VERB_AFTER = re.compile(r"\s+shows", re.IGNORECASE)
+_VERB_WINDOW = 40
+
+
+class ReferenceIndex:
+    """Every Figure/Table/Equation/Appendix mention of a document, found in one scan.
+
+    Mentions are keyed by (type, id) so a caller looks up the mentions of one
+    target in O(1) instead of re-scanning the whole text per target.
+    """
+
+    def __init__(self, text: str, page_starts: Optional[List[Tuple[int, int]]] = None):
+        # page_starts: (char offset, page number) for each page, in text order
+        self.text = text or ""
+        self._page_offsets = [start for start, _ in page_starts or []]
+        self._page_numbers = [page for _, page in page_starts or []]
+        self._mentions: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for pattern, rtype in _COMPILED_INSENSITIVE:
+            for m in pattern.finditer(self.text):
+                self._mentions.setdefault((rtype, m.group(1)), []).append(self._mention(m, rtype))
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[Tuple[int, str]], separator: str = "\n") -> "ReferenceIndex":
+        """Index (page number, page text) pairs joined with `separator`."""
+        texts: List[str] = []
+        page_starts: List[Tuple[int, int]] = []
+        offset = 0
+        for page, page_text in pages:
+            if texts:
+                offset += len(separator)
+            page_starts.append((offset, page))
+            texts.append(page_text or "")
+            offset += len(page_text or "")
+        return cls(separator.join(texts), page_starts)
+
+    def _mention(self, m: "re.Match[str]", rtype: str) -> Dict[str, Any]:
+        start, end = m.span()
+        verbs: List[Tuple[str, str]] = []
+        before = _VERB_BEFORE.search(self.text, max(0, start - _VERB_WINDOW), start)
+        if before:
+            verb = "see" if before.group(1).lower() == "see" else "refer to"
+            verbs.append((verb, self.text[before.start():end]))
+        after = _VERB_AFTER.match(self.text, end)
+        if after:
+            verbs.append(("shows", self.text[start:after.end()]))
+        return {
+            "type": rtype,
+            "id": m.group(1),
+            "raw": m.group(0),
+            "start": start,
+            "end": end,
+            "page": self.page_at(start),
+            "verbs": verbs,
+        }
+
+    def page_at(self, offset: int) -> Optional[int]:
+        if not self._page_offsets:
+            return None
+        idx = bisect_right(self._page_offsets, offset) - 1
+        return self._page_numbers[max(idx, 0)]
+
+    def lookup(self, rtype: str, rid: str) -> List[Dict[str, Any]]:
+        """Mentions of one target, in text order (e.g. lookup("table", "2.1"))."""
+        return self._mentions.get((rtype, str(rid).strip().rstrip(".")), [])
+
+    def verb_mentions(self, rtype: str, rid: str, verbs: Iterable[str] = ("see", "shows", "refer to")) -> List[Dict[str, Any]]:
+        """Mentions carrying a verb context, grouped by verb in the given order.
+
+        Each result has the mention's page/offsets plus `verb` and `evidence`
+        (the verb phrase together with the mention, e.g. "see Table 2.1").
+        """
+        mentions = self.lookup(rtype, rid)
+        out: List[Dict[str, Any]] = []
+        for verb in verbs:
+            for mention in mentions:
+                for mention_verb, evidence in mention["verbs"]:
+                    if mention_verb == verb:
+                        out.append({**mention, "verb": verb, "evidence": evidence})
+        return out
 
 
 def extract_references(text: str) -> List[Dict[str, str]]:
@@ -0,0 +1,111 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+from typing import Any, Dict, Tuple
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(*parts: Any) -> str:
+    raw = "::".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Persistent JSON result cache, one file per key, bounded by total size.
+
+    Entries are evicted least-recently-used first (hits refresh the file mtime)
+    once the directory grows past `max_bytes`. A cached `None` is a valid entry
+    so "no result" outcomes are not recomputed either.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+        self._sizes: Dict[Path, int] = {}
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for p in self.cache_dir.glob("*.json"):
+                self._sizes[p] = p.stat().st_size
+        except Exception:
+            self.stats["errors"] += 1
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value)."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            value = entry.get("value")  # AttributeError for a non-object entry
+            os.utime(path, None)
+        except FileNotFoundError:
+            self.stats["misses"] += 1
+            return False, None
+        except Exception:
+            self.stats["errors"] += 1
+            self.stats["misses"] += 1
+            return False, None
+        self.stats["hits"] += 1
+        return True, value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"value": value}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._sizes[path] = path.stat().st_size
+            self.stats["writes"] += 1
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        self._evict()
+
+    def size_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def _evict(self) -> None:
+        total = self.size_bytes()
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for p in list(self._sizes):
+            try:
+                by_age.append((p.stat().st_mtime, p))
+            except FileNotFoundError:
+                self._sizes.pop(p, None)
+        by_age.sort()
+        for _, p in by_age:
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+            except Exception:
+                self.stats["errors"] += 1
+                continue
+            total -= self._sizes.pop(p, 0)
+            self.stats["evictions"] += 1
+
+    def report(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": (self.stats["hits"] / lookups) if lookups else 0.0,
+            "entries": len(self._sizes),
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+        }
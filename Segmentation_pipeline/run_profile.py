@@ -0,0 +1,39 @@
+from pathlib import Path
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class RunProfile:
+    """Per-run wall time by pipeline stage plus stats reported by the enrichers."""
+
+    def __init__(self, doc_id: str):
+        self.doc_id = doc_id
+        self.stages: Dict[str, float] = {}
+        self.enrichers: Dict[str, Dict[str, Any]] = {}
+        self._started = time.perf_counter()
+        self._current: Optional[Tuple[str, float]] = None
+
+    def stage(self, name: Optional[str]) -> None:
+        """Close the running stage (if any) and start `name` (None just closes)."""
+        now = time.perf_counter()
+        if self._current is not None:
+            prev, started = self._current
+            self.stages[prev] = round(now - started, 3)
+        self._current = (name, now) if name else None
+
+    def record(self, module: str, stats: Optional[Dict[str, Any]]) -> None:
+        if stats:
+            self.enrichers[module] = stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "doc_id": self.doc_id,
+            "total_seconds": round(time.perf_counter() - self._started, 3),
+            "stages": dict(self.stages),
+            "enrichers": self.enrichers,
+        }
+
+    def write(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
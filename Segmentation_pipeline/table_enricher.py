@@ -1,25 +1,35 @@
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import json
 import re
 import sys
 
 from .enricher_utils import enrich_anchor, resolve_visual_path, set_enrichment_status
+from .result_cache import ResultCache, cache_key, file_digest
+
+# Upper bound on the on-disk table result cache (least recently used entries go first).
+TABLE_CACHE_MAX_BYTES = 256 * 1024 * 1024
 
 
 def enrich_table_chunks(
     chunks: List[Dict[str, Any]],
     doc_id: str = "book",
     out_dir: Optional[Path] = None,
-) -> None:
-    extractor = _load_table_extractor()
+) -> Dict[str, Any]:
+    loaded = _load_table_extractor()
     extracted_tables: List[Dict[str, Any]] = []
-    if extractor is None:
+    if loaded is None:
         for chunk in chunks:
             if chunk.get("type") == "table":
                 set_enrichment_status(chunk, "table", "skipped", "synapta_table_unavailable")
         _write_synapta_table_outputs(extracted_tables, doc_id=doc_id)
-        return
+        return {}
+    extractor, extractor_version = loaded
+
+    # Crops that are byte-identical to a previous run reuse that run's result.
+    cache = None
+    if out_dir is not None and extractor_version:
+        cache = ResultCache(out_dir / ".cache" / "table_results", max_bytes=TABLE_CACHE_MAX_BYTES)
 
     for chunk in chunks:
         if chunk.get("type") != "table":
@@ -29,15 +39,31 @@ def enrich_table_chunks(
         if not image_path:
             set_enrichment_status(chunk, "table", "skipped", "local_image_not_found")
             continue
-        try:
-            table_data = extractor(
-                image_path=image_path,
-                page_number=anchor["page_start"],
-                caption=chunk.get("caption") or "",
-            )
-        except Exception as exc:
-            set_enrichment_status(chunk, "table", "error", f"extract_failed:{type(exc).__name__}")
-            continue
+        caption = chunk.get("caption") or ""
+
+        key = None
+        hit = False
+        table_data = None
+        if cache is not None:
+            try:
+                # Page and caption feed segment_id/source_anchor/caption in the payload.
+                key = cache_key(file_digest(image_path), extractor_version, anchor["page_start"], caption)
+                hit, table_data = cache.get(key)
+            except OSError:
+                key = None
+
+        if not hit:
+            try:
+                table_data = extractor(
+                    image_path=image_path,
+                    page_number=anchor["page_start"],
+                    caption=caption,
+                )
+            except Exception as exc:
+                set_enrichment_status(chunk, "table", "error", f"extract_failed:{type(exc).__name__}")
+                continue
+            if key is not None:
+                cache.set(key, table_data)
 
         if table_data:
             table_data["source_chunk_id"] = anchor["source_chunk_id"]
@@ -51,15 +77,16 @@ def enrich_table_chunks(
             set_enrichment_status(chunk, "table", "empty", "no_table_payload")
 
     _write_synapta_table_outputs(extracted_tables, doc_id=doc_id)
+    return {"cache": cache.report()} if cache is not None else {}
 
 
-def _load_table_extractor() -> Optional[Callable[..., Any]]:
+def _load_table_extractor() -> Optional[Tuple[Callable[..., Any], Optional[str]]]:
     root = Path(__file__).resolve().parents[1] / "synapta-table-segmentation"
     if root.exists():
         sys.path.insert(0, str(root))
     try:
-        from table_image_extractor import extract_table_from_image
-        return extract_table_from_image
+        from table_image_extractor import extract_table_from_image, extractor_fingerprint
+        return extract_table_from_image, extractor_fingerprint()
     except Exception:
         return None
 
@@ -0,0 +1,191 @@
+"""
+Micro-benchmark of the formula/prose block classifier (segmenter/block_classifier.py).
+
+Runs the decisions FormulaExtractor.scan_page makes for every text block over
+the blocks of a PDF (or a built-in textbook-like sample) and reports the
+per-block cost:
+  - old checks:  the per-check decision path FormulaExtractor used before block_classifier
+  - single pass: features computed from scratch for every block
+  - cold memo:   a fresh run, repeated texts (headers, footers, repeated formulas) hit the memo
+  - warm memo:   every block text already classified
+
+Usage:
+  python bench_block_classifier.py
+  python bench_block_classifier.py --pdf path/to/book.pdf --max-pages 200
+"""
+
+import argparse
+import random
+import re
+import time
+from typing import List, Tuple
+
+from segmenter.block_classifier import _block_features, block_cache_info, block_features, clear_block_cache
+
+Block = Tuple[str, float, float]  # (text, x0, page_width)
+
+_SAMPLE_PROSE = [
+    "The capital asset pricing model relates the expected return of an asset to its systematic risk.",
+    "Investors hold a combination of the market portfolio and the risk-free asset, depending on risk aversion.",
+    "In this section we show how the efficient frontier changes when borrowing is restricted.",
+    "Consider a portfolio manager who must decide how much to invest in the two risky assets.",
+]
+_SAMPLE_FORMULAS = [
+    "E(r_i) = r_f + β_i[E(r_M) − r_f]    (9.1)",
+    "σ_P^2 = w_D^2 σ_D^2 + w_E^2 σ_E^2 + 2 w_D w_E Cov(r_D, r_E)",
+    "S_P = [E(r_P) − r_f] / σ_P",
+    "D = Σ t × w_t    (16.1)",
+    "P = C/(1 + y) + C/(1 + y)^2 + ... + (C + F)/(1 + y)^T",
+    "k = 1",
+]
+_SAMPLE_FURNITURE = ["Chapter 9  The Capital Asset Pricing Model", "www.mhhe.com/bkm", "PART III"]
+
+
+def sample_blocks(pages: int = 400, seed: int = 0) -> List[Block]:
+    """Textbook-like pages: running header/footer, prose, a few formulas and labels"""
+    rng = random.Random(seed)
+    blocks: List[Block] = []
+    for page in range(pages):
+        blocks.append((rng.choice(_SAMPLE_FURNITURE), 72.0, 612.0))
+        for _ in range(rng.randint(4, 9)):
+            if rng.random() < 0.7:
+                text = " ".join(rng.sample(_SAMPLE_PROSE, 2))
+                if rng.random() < 0.3:
+                    text += f" See page {rng.randint(1, 900)}."
+                blocks.append((text, 72.0, 612.0))
+            else:
+                blocks.append((rng.choice(_SAMPLE_FORMULAS), rng.choice([72.0, 180.0]), 612.0))
+        blocks.append((str(page + 1), 300.0, 612.0))
+    return blocks
+
+
+def pdf_blocks(path: str, max_pages: int) -> List[Block]:
+    import fitz  # PyMuPDF
+
+    blocks: List[Block] = []
+    with fitz.open(path) as doc:
+        for page in doc.pages(0, min(max_pages, len(doc))):
+            width = page.rect.width
+            for x0, _y0, _x1, _y1, text, _no, block_type in page.get_text("blocks"):
+                if block_type == 0 and text.strip():
+                    blocks.append((text.strip(), x0, width))
+    return blocks
+
+
+def classify(blocks: List[Block]) -> int:
+    """scan_page's decision for every block; returns the number of formula candidates"""
+    found = 0
+    for text, x0, width in blocks:
+        features = block_features(text)
+        if features.is_formula_heuristic or (
+                features.is_formula(x0, width)
+                and not (features.looks_like_prose and not features.has_equation_label)):
+            found += 1
+    return found
+
+
+# Decision path of FormulaExtractor before block_classifier, kept verbatim as the
+# baseline (including the symbol sets rebuilt on every call)
+
+
+def _legacy_is_formula(text: str, x0: float, page_width: float) -> bool:
+    clean = text.strip()
+    if len(clean) <= 3 and not re.search(r'\(\d+\.\d+\)', clean):
+        if not re.search(r'[=+\-*/×÷∑∫√]', clean):
+            return False
+    if not re.search(r'[A-Za-zα-ωΑ-Ω]', clean):
+        if re.fullmatch(r'[\d\.\-%\s]+', clean):
+            if len(clean.split()) <= 2 and not re.search(r'\(\d+\.\d+\)', clean):
+                return False
+    if re.fullmatch(r'[A-Za-z]\s*=\s*[-]?\d+(\.\d+)?', clean) and not re.search(r'\(\d+\.\d+\)', clean):
+        return False
+    is_centered = False
+    if page_width:
+        is_centered = (page_width * 0.2) < x0 < (page_width * 0.6)
+    math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '/', '\\', '(', ')', '[', ']'}
+    has_math_symbol = any(s in text for s in math_symbols)
+    has_eq_keyword = "Eq." in text or "Equation" in text or bool(re.search(r'\(\d+\.\d+\)', text))
+    words = text.split()
+    math_token_count = sum(1 for word in words if any(sym in word for sym in math_symbols) or
+                           re.search(r'[A-Za-z]\d+|\d+[A-Za-z]|[A-Za-z]_[A-Za-z]', word))
+    math_token_ratio = math_token_count / (len(words) if words else 1)
+    if math_token_ratio < 0.3 and not has_eq_keyword:
+        return False
+    return has_math_symbol and (is_centered or has_eq_keyword or math_token_ratio >= 0.3)
+
+
+def _legacy_is_formula_heuristic(text: str) -> bool:
+    clean = text.strip()
+    if not clean:
+        return False
+    if re.search(r'https?://|www\.|\.com\b|\.edu\b|\.net\b', clean, re.IGNORECASE):
+        return False
+    if re.search(r'^\(?\d+(?:\.\d+)+[a-z]?\)?$', clean):
+        return False
+    math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '∂', '∆'}
+    if any(s in clean for s in math_symbols):
+        return True
+    return bool(re.search(r'[A-Za-z][_(]', clean))
+
+
+def _legacy_looks_like_prose(text: str) -> bool:
+    words = text.split()
+    if len(words) >= 8:
+        math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '/', '\\'}
+        math_token_count = sum(1 for w in words if any(s in w for s in math_symbols))
+        if (math_token_count / max(len(words), 1)) < 0.2:
+            return True
+    return False
+
+
+def classify_legacy(blocks: List[Block]) -> int:
+    """classify() with the old per-check methods"""
+    found = 0
+    for text, x0, width in blocks:
+        if _legacy_is_formula_heuristic(text) or (
+                _legacy_is_formula(text, x0, width)
+                and not (_legacy_looks_like_prose(text) and not re.search(r'\(\d+\.\d+\)', text))):
+            found += 1
+    return found
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-block cost of the formula/prose block classifier")
+    parser.add_argument("--pdf", help="Take text blocks from this PDF instead of the built-in sample")
+    parser.add_argument("--max-pages", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    blocks = pdf_blocks(args.pdf, args.max_pages) if args.pdf else sample_blocks(args.max_pages)
+    distinct = len({text for text, _, _ in blocks})
+    print(f"{len(blocks)} text blocks, {distinct} distinct texts")
+
+    legacy_time = min(_timed(lambda: classify_legacy(blocks)) for _ in range(args.repeat))
+    single_pass = min(_timed(lambda: [_block_features.__wrapped__(t) for t, _, _ in blocks])
+                      for _ in range(args.repeat))
+
+    def cold():
+        clear_block_cache()
+        classify(blocks)
+
+    cold_time = min(_timed(cold) for _ in range(args.repeat))
+    warm_time = min(_timed(lambda: classify(blocks)) for _ in range(args.repeat))
+    info = block_cache_info()
+
+    per_block = lambda seconds: f"{seconds / max(len(blocks), 1) * 1e6:8.2f} µs/block"
+    print(f"  old checks  : {per_block(legacy_time)}")
+    print(f"  single pass : {per_block(single_pass)}")
+    print(f"  cold memo   : {per_block(cold_time)}")
+    print(f"  warm memo   : {per_block(warm_time)}")
+    print(f"  formula candidates: {classify(blocks)} (old checks: {classify_legacy(blocks)}), "
+          f"memo size: {info.currsize}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 import csv
+import heapq
 import re
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, NamedTuple, Set, Tuple
 
 from schemas import ConceptLink, SegmentBase
 from llm_services import LLMService, generate_json_with_llm
+from segmenter.phrase_automaton import PhraseAutomaton
 
 
 class Concept:
@@ -20,6 +22,38 @@ class Concept:
         self.pages = pages or []
 
 
+class _ConceptPhrases(NamedTuple):
+    """Automaton ids of one concept's phrases (None = phrase normalizes to nothing)."""
+    name: Optional[int]
+    aliases: List[Tuple[str, Optional[int]]]    # (alias, id)
+    description: Optional[int]
+    tags: List[Optional[int]]                   # raw-text automaton ids, one per tag
+    tag_ngrams: List[Tuple[str, Optional[int]]]
+    desc_ngrams: List[Tuple[str, Optional[int]]]
+
+
+class _SegmentHits:
+    """Result of scanning one segment's heading/title and body with the concept automatons."""
+
+    def __init__(self, title: Dict[int, bool], body: Dict[int, bool], raw_tags: Set[int]):
+        self.title = title
+        self.body = body
+        self.raw_tags = raw_tags
+
+    @staticmethod
+    def _hit(hits: Dict[int, bool], pid: Optional[int], boundary: bool) -> bool:
+        if pid is None:
+            return False
+        bounded = hits.get(pid)
+        return bounded is not None and (bounded or not boundary)
+
+    def in_title(self, pid: Optional[int], boundary: bool = True) -> bool:
+        return self._hit(self.title, pid, boundary)
+
+    def in_body(self, pid: Optional[int], boundary: bool = True) -> bool:
+        return self._hit(self.body, pid, boundary)
+
+
 class ConceptLinker:
     """Links segments to concepts from a concept list (TSV/Excel)."""
     
@@ -32,6 +66,20 @@ class ConceptLinker:
         self._concept_term_freqs: Dict[str, Dict[str, int]] = {}
         self._term_df: Dict[str, int] = {}
         self._concept_by_id: Dict[str, Concept] = {}
+        # Matching index over self.concepts, built by _build_match_index
+        self._indexed_concepts: Optional[List[Concept]] = None
+        self._phrase_matcher = PhraseAutomaton()   # normalized names/aliases/descriptions/n-grams
+        self._tag_matcher = PhraseAutomaton()      # raw lowercased tags
+        self._concept_phrases: List[_ConceptPhrases] = []
+        self._evidence_phrases: Dict[str, _ConceptPhrases] = {}
+        self._concepts_by_phrase: Dict[int, List[int]] = {}
+        self._concepts_by_tag: Dict[int, List[int]] = {}
+        self._concepts_by_page: Dict[int, List[int]] = {}
+        self._always_tagged: List[int] = []
+        self._concept_postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._concept_norms: List[float] = []
+        self._name_words: List[Set[str]] = []
+        self._name_letter_words: List[Set[str]] = []
         if concept_list_path:
             self.load_concepts(concept_list_path)
     
@@ -62,6 +110,7 @@ class ConceptLinker:
             print(f"ConceptLinker: Loaded {len(self.concepts)} concepts from {path}")
             self._index_concepts()
             self._build_semantic_index()
+            self._build_match_index()
         except Exception as e:
             print(f"Error loading concepts from {path}: {e}")
     
@@ -162,7 +211,83 @@ class ConceptLinker:
     def _index_concepts(self) -> None:
         self._concept_by_id = {c.concept_id: c for c in self.concepts if c.concept_id}
 
-    def _build_lexical_evidence(self, segment: SegmentBase, concept: Concept) -> Optional[Dict[str, Any]]:
+    def _build_match_index(self) -> None:
+        """
+        Index self.concepts for linking: one Aho-Corasick automaton over the
+        normalized names, aliases, descriptions and tag/description n-grams,
+        one over the raw tags, phrase/tag/page -> concept lookups, and the
+        concept TF-IDF vectors as a sparse term -> (concept, weight) matrix.
+        A segment is then linked with one scan per text and a sparse product.
+        """
+        self._phrase_matcher = PhraseAutomaton()
+        self._tag_matcher = PhraseAutomaton()
+        self._concept_phrases = []
+        self._concepts_by_phrase = {}
+        self._concepts_by_tag = {}
+        self._concepts_by_page = {}
+        self._always_tagged = []
+
+        def add_phrase(phrase: str) -> Optional[int]:
+            return self._phrase_matcher.add(self._normalize_text(phrase)) if phrase else None
+
+        for idx, concept in enumerate(self.concepts):
+            phrases = _ConceptPhrases(
+                name=add_phrase(concept.name or ""),
+                aliases=[(alias, add_phrase(alias)) for alias in concept.aliases],
+                description=add_phrase(concept.description or ""),
+                tags=[self._tag_matcher.add(t.lower()) for t in concept.tags or []],
+                tag_ngrams=[(p, add_phrase(p)) for p in self._extract_ngrams(" ".join(concept.tags or []), min_n=2, max_n=4)],
+                desc_ngrams=[(p, add_phrase(p)) for p in self._extract_ngrams(concept.description or "", min_n=2, max_n=4)],
+            )
+            self._concept_phrases.append(phrases)
+            # Phrases that can give the concept a positive score (n-grams only feed evidence)
+            for pid in {phrases.name, phrases.description, *(pid for _, pid in phrases.aliases)}:
+                if pid is not None:
+                    self._concepts_by_phrase.setdefault(pid, []).append(idx)
+            for pid in set(phrases.tags):
+                if pid is None:
+                    self._always_tagged.append(idx)  # an empty tag matches any text
+                else:
+                    self._concepts_by_tag.setdefault(pid, []).append(idx)
+            for page in {p for p in concept.pages if p}:
+                self._concepts_by_page.setdefault(page, []).append(idx)
+        self._phrase_matcher.build()
+        self._tag_matcher.build()
+        # Evidence looks concepts up by id; like _concept_by_id, the last concept with an id wins
+        self._evidence_phrases = {c.concept_id: p for c, p in zip(self.concepts, self._concept_phrases) if c.concept_id}
+
+        self._name_words = [set(c.name.lower().split()) for c in self.concepts]
+        self._name_letter_words = [set(re.findall(r'[A-Za-z][A-Za-z\-]+', c.name.lower())) for c in self.concepts]
+
+        self._concept_postings = {}
+        self._concept_norms = []
+        for idx, concept in enumerate(self.concepts):
+            vec = self._build_concept_vector(concept.concept_id)
+            self._concept_norms.append(sum(v * v for v in vec.values()) ** 0.5)
+            for term, weight in vec.items():
+                self._concept_postings.setdefault(term, []).append((idx, weight))
+        self._indexed_concepts = list(self.concepts)
+
+    def _ensure_match_index(self) -> None:
+        if self._indexed_concepts != self.concepts:
+            self._build_match_index()
+
+    def _scan_segment(self, segment: SegmentBase) -> _SegmentHits:
+        """One automaton pass over the segment's heading/title and body text."""
+        title_text = " ".join([
+            segment.heading_path or "",
+            segment.chapter_title or "",
+        ]).strip().lower()
+        body_text = (segment.text_content or "").lower()
+        raw_tags = set(self._tag_matcher.scan(title_text)) | set(self._tag_matcher.scan(body_text))
+        return _SegmentHits(
+            self._phrase_matcher.scan(self._normalize_text(title_text)),
+            self._phrase_matcher.scan(self._normalize_text(body_text)),
+            raw_tags,
+        )
+
+    def _build_lexical_evidence(self, segment: SegmentBase, concept: Concept,
+                                hits: Optional[_SegmentHits] = None) -> Optional[Dict[str, Any]]:
         if not concept:
             return None
         heading_text = " ".join([
@@ -172,51 +297,45 @@ class ConceptLinker:
         body_text = (segment.text_content or "").strip()
         if not heading_text and not body_text:
             return None
-
-        def _match(text: str, phrase: str, match_type: str, source: str) -> Optional[Dict[str, Any]]:
-            if phrase and text and self._phrase_in_text(text, phrase, boundary=True):
-                return {
-                    "type": match_type,
-                    "matched_phrase": phrase,
-                    "source": source
-                }
+        self._ensure_match_index()
+        phrases = self._evidence_phrases.get(concept.concept_id)
+        if phrases is None:
             return None
+        if hits is None:
+            hits = self._scan_segment(segment)
+
+        def _evidence(phrase: str, match_type: str, source: str) -> Dict[str, Any]:
+            return {
+                "type": match_type,
+                "matched_phrase": phrase,
+                "source": source
+            }
 
         # 1) Heading/title match (highest priority)
-        ev = _match(heading_text, concept.name, "heading", "heading_path")
-        if ev:
-            return ev
-        for alias in concept.aliases or []:
-            ev = _match(heading_text, alias, "heading", "heading_path")
-            if ev:
-                return ev
+        if concept.name and hits.in_title(phrases.name):
+            return _evidence(concept.name, "heading", "heading_path")
+        for alias, pid in phrases.aliases:
+            if alias and hits.in_title(pid):
+                return _evidence(alias, "heading", "heading_path")
 
         # 2) Direct name/alias match in body
-        ev = _match(body_text, concept.name, "name", "segment_text")
-        if ev:
-            return ev
-        for alias in concept.aliases or []:
-            ev = _match(body_text, alias, "alias", "segment_text")
-            if ev:
-                return ev
+        if concept.name and hits.in_body(phrases.name):
+            return _evidence(concept.name, "name", "segment_text")
+        for alias, pid in phrases.aliases:
+            if alias and hits.in_body(pid):
+                return _evidence(alias, "alias", "segment_text")
 
         # 3) Tag/rationale n-gram match (heading preferred, then body)
-        tag_phrases = self._extract_ngrams(" ".join(concept.tags or []), min_n=2, max_n=4)
-        desc_phrases = self._extract_ngrams(concept.description or "", min_n=2, max_n=4)
-        for phrase in tag_phrases:
-            ev = _match(heading_text, phrase, "tag", "heading_path")
-            if ev:
-                return ev
-            ev = _match(body_text, phrase, "tag", "segment_text")
-            if ev:
-                return ev
-        for phrase in desc_phrases:
-            ev = _match(heading_text, phrase, "rationale", "heading_path")
-            if ev:
-                return ev
-            ev = _match(body_text, phrase, "rationale", "segment_text")
-            if ev:
-                return ev
+        for phrase, pid in phrases.tag_ngrams:
+            if hits.in_title(pid):
+                return _evidence(phrase, "tag", "heading_path")
+            if hits.in_body(pid):
+                return _evidence(phrase, "tag", "segment_text")
+        for phrase, pid in phrases.desc_ngrams:
+            if hits.in_title(pid):
+                return _evidence(phrase, "rationale", "heading_path")
+            if hits.in_body(pid):
+                return _evidence(phrase, "rationale", "segment_text")
 
         return None
 
@@ -246,18 +365,29 @@ class ConceptLinker:
         links: List[ConceptLink] = []
         if not self.concepts:
             return links
+        self._ensure_match_index()
         
-        title_text = " ".join([
-            segment.heading_path or "",
-            segment.chapter_title or "",
-        ]).strip().lower()
         body_text = (segment.text_content or "").lower()
         page_num = getattr(segment, "page_start", None)
+        hits = self._scan_segment(segment)
+
+        # Only concepts with a phrase/tag hit or a nearby page can score above zero;
+        # they are scored in concept-list order, as a full pass would
+        candidates: Set[int] = set(self._always_tagged)
+        for matched in (hits.title, hits.body):
+            for pid in matched:
+                candidates.update(self._concepts_by_phrase.get(pid, ()))
+        for pid in hits.raw_tags:
+            candidates.update(self._concepts_by_tag.get(pid, ()))
+        if page_num:
+            for page in range(page_num - 3, page_num + 4):
+                candidates.update(self._concepts_by_page.get(page, ()))
 
         scored_candidates: List[Tuple[Concept, float, str]] = []
         best_by_concept = {}
-        for concept in self.concepts:
-            score, method = self._score_concept(concept, title_text, body_text, page_num)
+        for idx in sorted(candidates):
+            concept = self.concepts[idx]
+            score, method = self._score_concept(concept, self._concept_phrases[idx], hits, page_num)
             if score <= 0:
                 continue
             scored_candidates.append((concept, score, method))
@@ -289,9 +419,8 @@ class ConceptLinker:
 
         # Heuristic keyword overlap fallback
         if not links:
-            for concept in self.concepts:
-                concept_words = set(concept.name.lower().split())
-                segment_words = set(body_text.split())
+            segment_words = set(body_text.split())
+            for concept, concept_words in zip(self.concepts, self._name_words):
                 overlap = len(concept_words & segment_words) / max(len(concept_words), 1)
                 if overlap > 0.5:
                     links.append(ConceptLink(
@@ -319,7 +448,7 @@ class ConceptLinker:
         any_strong = False
         for link in deduped:
             concept = self._concept_by_id.get(link.concept_id)
-            evidence = self._build_lexical_evidence(segment, concept) if concept else None
+            evidence = self._build_lexical_evidence(segment, concept, hits) if concept else None
             semantic_present = link.link_method in semantic_methods
             lexical_present = bool(evidence) or link.link_method in lexical_methods
             if semantic_present and lexical_present:
@@ -335,46 +464,47 @@ class ConceptLinker:
 
         return filtered[:5]  # Top 5 matches
 
-    def _score_concept(self, concept: Concept, title_text: str, body_text: str, page_num: Optional[int]) -> tuple:
+    def _score_concept(self, concept: Concept, phrases: _ConceptPhrases, hits: _SegmentHits,
+                       page_num: Optional[int]) -> tuple:
         name = concept.name or ""
         score = 0.0
         method = "heuristic"
 
-        if name and self._phrase_in_text(title_text, name, boundary=True):
+        if name and hits.in_title(phrases.name, boundary=True):
             score += 0.6
             method = "exact_match"
         if not score:
-            for alias in concept.aliases:
-                if alias and self._phrase_in_text(title_text, alias, boundary=True):
+            for alias, pid in phrases.aliases:
+                if alias and hits.in_title(pid, boundary=True):
                     score += 0.5
                     method = "alias"
                     break
 
-        if name and self._phrase_in_text(body_text, name, boundary=True):
+        if name and hits.in_body(phrases.name, boundary=True):
             score += 0.35
             method = method if method != "heuristic" else "exact_match"
         if score < 0.5:
-            for alias in concept.aliases:
-                if alias and self._phrase_in_text(body_text, alias, boundary=True):
+            for alias, pid in phrases.aliases:
+                if alias and hits.in_body(pid, boundary=True):
                     score += 0.3
                     method = method if method != "heuristic" else "alias"
                     break
 
-        if score < 0.4 and name and len(name) >= 4 and self._phrase_in_text(body_text, name, boundary=False):
+        if score < 0.4 and name and len(name) >= 4 and hits.in_body(phrases.name, boundary=False):
             score += 0.15
         if score < 0.4:
-            for alias in concept.aliases:
-                if alias and len(alias) >= 4 and self._phrase_in_text(body_text, alias, boundary=False):
+            for alias, pid in phrases.aliases:
+                if alias and len(alias) >= 4 and hits.in_body(pid, boundary=False):
                     score += 0.12
                     break
 
         if concept.tags:
-            tag_hits = sum(1 for t in concept.tags if t.lower() in body_text or t.lower() in title_text)
+            tag_hits = sum(1 for pid in phrases.tags if pid is None or pid in hits.raw_tags)
             if tag_hits:
                 score += min(0.2, 0.05 * tag_hits)
 
         if concept.description:
-            if self._phrase_in_text(body_text, concept.description, boundary=False):
+            if hits.in_body(phrases.description, boundary=False):
                 score += 0.1
 
         if page_num and concept.pages:
@@ -538,10 +668,10 @@ class ConceptLinker:
         words = set(re.findall(r'[A-Za-z][A-Za-z\-]+', text.lower()))
         if not words:
             return None
+        self._ensure_match_index()
         best = None
         best_score = 0.0
-        for concept in self.concepts:
-            c_words = set(re.findall(r'[A-Za-z][A-Za-z\-]+', concept.name.lower()))
+        for concept, c_words in zip(self.concepts, self._name_letter_words):
             if not c_words:
                 continue
             score = len(words & c_words) / max(len(c_words), 1)
@@ -560,19 +690,26 @@ class ConceptLinker:
         query_vec = self._build_tfidf_vector(self._tokenize(segment_text))
         if not query_vec:
             return []
+        self._ensure_match_index()
+        # Sparse product of the query with the concept-term matrix (same summation
+        # order as _cosine_similarity, so scores are bit-identical)
+        dots: Dict[int, float] = {}
+        for term, weight in query_vec.items():
+            for idx, concept_weight in self._concept_postings.get(term, ()):
+                dots[idx] = dots.get(idx, 0.0) + weight * concept_weight
+        norm_q = sum(v * v for v in query_vec.values()) ** 0.5
         scored: List[Tuple[str, float]] = []
-        for concept in self.concepts:
-            concept_vec = self._build_concept_vector(concept.concept_id)
-            if not concept_vec:
+        for idx in sorted(dots):
+            norm_c = self._concept_norms[idx]
+            if norm_q == 0 or norm_c == 0:
                 continue
-            score = self._cosine_similarity(query_vec, concept_vec)
+            score = dots[idx] / (norm_q * norm_c)
             if score > 0.18:
-                scored.append((concept.concept_id, score))
+                scored.append((self.concepts[idx].concept_id, score))
         if not scored:
             return []
-        scored.sort(key=lambda x: x[1], reverse=True)
         links: List[ConceptLink] = []
-        for concept_id, score in scored[:5]:
+        for concept_id, score in heapq.nlargest(5, scored, key=lambda x: x[1]):
             links.append(ConceptLink(
                 concept_id=concept_id,
                 link_method="semantic",
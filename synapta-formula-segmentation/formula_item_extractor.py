@@ -1,15 +1,27 @@
 """
-Create a FormulaSegment from a single formula text + minimal context.
-This bypasses full PDF parsing and LLM enrichment.
+Create FormulaSegments from formula text + minimal context.
+This bypasses full PDF parsing; LLM enrichment is optional (batch entry point only).
 """
 
-from typing import Any, Dict, Optional, Tuple
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 import hashlib
 import re
 
 from schemas import BBox, FormulaSegment, VariableDefinition
 
 
+@dataclass
+class _FormulaAnalysis:
+    """Text-derived fields of one formula, shared by all of its occurrences."""
+    canonical_key: str
+    equation_number: Optional[str]
+    variables: List[VariableDefinition]
+    latex: Optional[str]
+    needs_review: bool
+    summary: Optional[str] = None
+
+
 def extract_formula_item(
     formula_text: str,
     page_number: int,
@@ -20,16 +32,122 @@ def extract_formula_item(
     chapter_title: Optional[str] = None,
 ) -> Dict[str, Any]:
     raw = (formula_text or "").strip()
+    return _build_formula_item(raw, _analyse_formula(raw), page_number, book_id,
+                               heading_path, bbox, chapter_number, chapter_title)
+
+
+def extract_formula_items(
+    items: List[Dict[str, Any]],
+    book_id: str,
+    llm_service: Optional[Any] = None,
+    batch_size: int = 20,
+) -> List[Dict[str, Any]]:
+    """
+    Batch form of extract_formula_item. Each item holds its keyword arguments
+    (formula_text, page_number, heading_path, bbox, chapter_number, chapter_title).
+
+    Items are grouped by canonical key: equation number, variable symbols,
+    LaTeX fallback and review flag are computed once per distinct formula
+    text, then fanned out to every item with its own page, bbox and heading
+    anchor, so each payload equals what extract_formula_item returns. With an
+    llm_service that supports extract_variables_batch, each canonical formula
+    is sent once (batch_size formulas per call) and its variables and summary
+    are shared by the whole group. Returns one payload per item, in order.
+    """
+    # canonical key -> {formula text -> analysis}; texts in one group differ only in whitespace
+    groups: Dict[str, Dict[str, _FormulaAnalysis]] = {}
+    headings: Dict[str, List[str]] = {}
+    raws: List[str] = []
+    for item in items:
+        raw = (item.get("formula_text") or "").strip()
+        raws.append(raw)
+        variants = groups.setdefault(_canonical_key(raw), {})
+        if raw not in variants:
+            variants[raw] = _analyse_formula(raw)
+        key_headings = headings.setdefault(variants[raw].canonical_key, [])
+        heading = item.get("heading_path")
+        if heading and heading not in key_headings:
+            key_headings.append(heading)
+
+    if llm_service is not None and hasattr(llm_service, "extract_variables_batch"):
+        _enrich_with_llm(groups, headings, llm_service, batch_size)
+
+    analyses = {raw: analysis for variants in groups.values() for raw, analysis in variants.items()}
+    return [
+        _build_formula_item(
+            raw, analyses[raw], item.get("page_number", 1), book_id,
+            item.get("heading_path"), item.get("bbox"),
+            item.get("chapter_number", "unknown"), item.get("chapter_title"),
+        )
+        for raw, item in zip(raws, items)
+    ]
+
+
+def _analyse_formula(raw: str) -> _FormulaAnalysis:
     equation_number = _extract_equation_number(raw)
-    canonical_key = _canonical_key(raw)
+    symbols = _extract_variable_symbols(raw)
+    return _FormulaAnalysis(
+        canonical_key=_canonical_key(raw),
+        equation_number=equation_number,
+        variables=symbols,
+        latex=_latex_fallback(raw),
+        needs_review=_needs_review(raw, equation_number, symbols),
+    )
+
+
+def _enrich_with_llm(groups: Dict[str, Dict[str, _FormulaAnalysis]], headings: Dict[str, List[str]],
+                     llm_service: Any, batch_size: int) -> None:
+    """Replace heuristic symbols/short meaning with one extract_variables_batch result per canonical formula."""
+    keys = [key for key, variants in groups.items() if next(iter(variants))]
+    batch_size = max(1, batch_size)
+    for start in range(0, len(keys), batch_size):
+        chunk = keys[start:start + batch_size]
+        batch_inputs = []
+        for key in chunk:
+            raw, analysis = next(iter(groups[key].items()))
+            batch_inputs.append((raw, " ... ".join(headings[key][:3]), [v.symbol for v in analysis.variables]))
+        results = llm_service.extract_variables_batch(items=batch_inputs)
+        for key, (variables, summary) in zip(chunk, results):
+            for raw, analysis in groups[key].items():
+                verified = _verify_symbols(variables, raw)
+                if verified:
+                    analysis.variables = verified
+                    analysis.needs_review = _needs_review(raw, analysis.equation_number, verified)
+                if summary:
+                    analysis.summary = summary
+
+
+def _verify_symbols(variables: List[VariableDefinition], formula_text: str) -> List[VariableDefinition]:
+    """Drop LLM variables whose symbol does not occur as a standalone token in the formula."""
+    text = re.sub(r"[{}\\]", "", formula_text or "")
+    kept = []
+    for v in variables:
+        symbol = re.sub(r"[\s{}\\]", "", v.symbol or "")
+        if symbol and re.search(rf"(?<![A-Za-z]){re.escape(symbol)}(?![A-Za-z])", text):
+            kept.append(v)
+    return kept
+
+
+def _build_formula_item(
+    raw: str,
+    analysis: _FormulaAnalysis,
+    page_number: int,
+    book_id: str,
+    heading_path: Optional[str],
+    bbox: Optional[Dict[str, float]],
+    chapter_number: str,
+    chapter_title: Optional[str],
+) -> Dict[str, Any]:
+    equation_number = analysis.equation_number
+    canonical_key = analysis.canonical_key
     ch_num, ch_title = _extract_chapter_metadata(heading_path, chapter_number, chapter_title)
     if ch_num == "unknown" and equation_number:
         m = re.search(r'\((\d+)(?:\.\d+)*\)', equation_number)
         if m:
             ch_num = m.group(1)
     usage_type = _infer_usage_type(raw, heading_path)
-    symbols = _extract_variable_symbols(raw)
-    short_meaning = _build_short_meaning(raw, symbols, usage_type, equation_number)
+    symbols = analysis.variables
+    short_meaning = analysis.summary or _build_short_meaning(raw, symbols, usage_type, equation_number)
 
     seg = FormulaSegment(
         segment_id=f"formula_{canonical_key[:12]}_p{page_number}",
@@ -42,14 +160,14 @@ def extract_formula_item(
         text_content=raw,
         heading_path=heading_path,
         formula_text_raw=raw,
-        formula_latex=_latex_fallback(raw),
+        formula_latex=analysis.latex,
         equation_number=equation_number,
         canonical_formula_key=canonical_key,
         variables=symbols,
         usage_type=usage_type,
         short_meaning=short_meaning,
         confidence=1.0,
-        needs_human_review=_needs_review(raw, equation_number, symbols),
+        needs_human_review=analysis.needs_review,
     )
     return seg.model_dump()
 
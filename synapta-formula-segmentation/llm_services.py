@@ -1,6 +1,5 @@
 import os
 import re
-import time
 import json
 import hashlib
 from abc import ABC, abstractmethod
@@ -8,6 +7,8 @@ from typing import List, Dict, Any, Optional, Tuple
 
 from schemas import VariableDefinition
 from segmenter.cache_manager import DiskCache
+from segmenter.llm_cassette import cassette_client
+from segmenter.llm_executor import estimate_tokens, get_llm_executor, request_key
 
 
 class LLMService(ABC):
@@ -85,7 +86,19 @@ class OpenAILLMService(LLMService):
             except ImportError:
                 print("Warning: openai package not installed. Install with: pip install openai")
                 self.client = None
-    
+        self.client = cassette_client(self.client, "openai")
+        self.executor = get_llm_executor("openai", base_url or "")
+
+    def _chat(self, prompt: str, **kwargs):
+        """chat.completions.create for one user prompt, through the shared executor"""
+        kwargs = {"model": self.model_name, "messages": [{"role": "user", "content": prompt}], **kwargs}
+        return self.executor.call(
+            self.client.chat.completions.create,
+            key=request_key(self.base_url, kwargs),
+            tokens=estimate_tokens(prompt, kwargs.get("max_tokens")),
+            **kwargs,
+        )
+
     def _get_cache_key(self, prompt: str, method: str) -> str:
         """Generate cache key from prompt and method."""
         cache_str = f"{method}:{prompt}"
@@ -143,36 +156,24 @@ Example format (but you can use any clear format):
         cache_key = self._get_cache_key(prompt, "extract_variables")
         
         def _do_extract():
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    # NO JSON format requirement - free text response
-                    response = self.client.chat.completions.create(
-                        model=self.model_name,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.3  # Lower temperature for more consistent extraction
-                    )
-                    
-                    content = response.choices[0].message.content
-                    
-                    # Step 3: Parse free text response and structure as VariableDefinition
-                    result = self._parse_meanings_response(content, candidate_symbols, formula_text)
-                    
-                    return result
-                    
-                except Exception as e:
-                    if "rate_limit" in str(e).lower() or "429" in str(e):
-                        wait_time = 2 * (attempt + 1)
-                        print(f"Rate limit hit, waiting {wait_time}s...")
-                        time.sleep(wait_time)
-                        continue
-                    print(f"LLM Error (extract_variables): {e}")
-                    if attempt < max_retries - 1:
-                        time.sleep(1)
-                        continue
-                    return []
-            
-            return []
+            # Rate limits and transient errors are retried by the executor
+            try:
+                # NO JSON format requirement - free text response
+                response = self._chat(
+                    prompt,
+                    temperature=0.3  # Lower temperature for more consistent extraction
+                )
+
+                content = response.choices[0].message.content
+
+                # Step 3: Parse free text response and structure as VariableDefinition
+                result = self._parse_meanings_response(content, candidate_symbols, formula_text)
+
+                return result
+
+            except Exception as e:
+                print(f"LLM Error (extract_variables): {e}")
+                return []
         
         return self._cached_call(cache_key, _do_extract)
     
@@ -310,30 +311,18 @@ Return a JSON object with:
 
 Return ONLY valid JSON, no other text."""
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    response_format={"type": "json_object"},
-                    temperature=0.3
-                )
-                data = parse_json_response(response.choices[0].message.content)
-                return data or {"problem_statement": text}
-                
-            except Exception as e:
-                if "rate_limit" in str(e).lower() or "429" in str(e):
-                    wait_time = 2 * (attempt + 1)
-                    time.sleep(wait_time)
-                    continue
-                print(f"LLM Error (structure_worked_example): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                return {"problem_statement": text}
-        
-        return {"problem_statement": text}
+        try:
+            response = self._chat(
+                prompt,
+                response_format={"type": "json_object"},
+                temperature=0.3
+            )
+            data = parse_json_response(response.choices[0].message.content)
+            return data or {"problem_statement": text}
+
+        except Exception as e:
+            print(f"LLM Error (structure_worked_example): {e}")
+            return {"problem_statement": text}
     
     def extract_formula_summary(self, formula_text: str, variables: List[VariableDefinition]) -> Optional[str]:
         """Extract a short summary of what the formula calculates."""
@@ -358,46 +347,27 @@ Formula: {formula_text}
 Focus on: What quantity does it compute? What is it used for in finance/economics?
 Return ONLY the summary text, no JSON, no explanation, no markdown."""
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.5,
-                    max_tokens=100
-                )
-                
-                summary = response.choices[0].message.content.strip()
-                # Remove markdown formatting if present
-                summary = summary.replace("**", "").replace("*", "").strip()
-                
-                if summary and len(summary) < 200:
-                    return summary
-                
-                # Fallback if summary is too long or empty
-                if variables:
-                    var_names = [v.symbol for v in variables[:3]]
-                    return f"Formula computing {', '.join(var_names)}"
-                
-                return None
-                
-            except Exception as e:
-                if "rate_limit" in str(e).lower() or "429" in str(e):
-                    wait_time = 2 * (attempt + 1)
-                    time.sleep(wait_time)
-                    continue
-                print(f"LLM Error (extract_formula_summary): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                
-                # Fallback
-                if variables:
-                    var_names = [v.symbol for v in variables[:3]]
-                    return f"Formula computing {', '.join(var_names)}"
-                return None
-        
+        try:
+            response = self._chat(
+                prompt,
+                temperature=0.5,
+                max_tokens=100
+            )
+
+            summary = response.choices[0].message.content.strip()
+            # Remove markdown formatting if present
+            summary = summary.replace("**", "").replace("*", "").strip()
+
+            if summary and len(summary) < 200:
+                return summary
+
+        except Exception as e:
+            print(f"LLM Error (extract_formula_summary): {e}")
+
+        # Fallback if the call failed or the summary is too long or empty
+        if variables:
+            var_names = [v.symbol for v in variables[:3]]
+            return f"Formula computing {', '.join(var_names)}"
         return None
 
     def convert_to_latex(self, formula_text: str, canonical_key: Optional[str] = None) -> Optional[str]:
@@ -413,9 +383,8 @@ Formula: {formula_text}
 
         def _do_convert():
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
+                response = self._chat(
+                    prompt,
                     temperature=0.2,
                     max_tokens=300
                 )
@@ -455,9 +424,8 @@ Return ONLY valid JSON."""
         cache_key = self._get_cache_key(prompt, "extract_variables_batch")
         def _do_batch():
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
+                response = self._chat(
+                    prompt,
                     response_format={"type": "json_object"},
                     temperature=0.3,
                 )
@@ -516,12 +484,20 @@ class GeminiLLMService(LLMService):
             except Exception as e:
                 print(f"Warning: Gemini client initialization failed: {e}")
                 print("Gemini LLM features will fail or fallback.")
+        self.client = cassette_client(self.client, "gemini")
+        self.executor = get_llm_executor("gemini")
 
     def _generate(self, prompt: str, json_mode: bool = False) -> Optional[str]:
         if not self.client:
             return None
         try:
-            response = self.client.models.generate_content(model=self.model_name, contents=prompt)
+            response = self.executor.call(
+                self.client.models.generate_content,
+                key=request_key(self.model_name, prompt),
+                tokens=estimate_tokens(prompt),
+                model=self.model_name,
+                contents=prompt,
+            )
             # Try response.text first (new SDK)
             if hasattr(response, "text") and response.text:
                 return response.text
@@ -601,9 +577,6 @@ Example format (but you can use any clear format):
                     result = self._parse_meanings_response(text, candidate_symbols, formula_text)
                     return result
                 except Exception as e:
-                    if "429" in str(e) or "quota" in str(e).lower():
-                        time.sleep(2 * (attempt + 1))
-                        continue
                     print(f"LLM Error (extract_variables): {e}")
                     return []
              return []
@@ -678,10 +651,8 @@ Return a JSON object with: "title", "problem_statement", "steps" (array of strin
                     data = parse_json_response(raw)
                     return data or {"problem_statement": text}
             except Exception as e:
-                if "429" in str(e) or "quota" in str(e).lower():
-                    time.sleep(2 * (attempt + 1))
-                    continue
                 print(f"LLM Error (structure_worked_example): {e}")
+                break
         return {"problem_statement": text}
 
     def extract_formula_summary(self, formula_text: str, variables: List[VariableDefinition]) -> Optional[str]:
@@ -699,10 +670,8 @@ Formula: {formula_text}
                     summary = summary.replace("**", "").replace("*", "").strip()[:200]
                     return summary if summary else (f"Formula computing {', '.join([v.symbol for v in variables[:3]])}" if variables else None)
             except Exception as e:
-                if "429" in str(e) or "quota" in str(e).lower():
-                    time.sleep(2 * (attempt + 1))
-                    continue
                 print(f"LLM Error (extract_formula_summary): {e}")
+                break
         return f"Formula computing {', '.join([v.symbol for v in variables[:3]])}" if variables else None
 
     def convert_to_latex(self, formula_text: str, canonical_key: Optional[str] = None) -> Optional[str]:
@@ -796,26 +765,27 @@ Return ONLY valid JSON."""
                     continue
                 return [([], None) for _ in items]
             except Exception as e:
+                # Rate limits and transient errors were already retried by the executor
                 error_str = str(e)
-                if "429" in error_str or "quota" in error_str.lower() or "rate_limit" in error_str.lower() or "RESOURCE_EXHAUSTED" in error_str:
-                    wait = 2 * (attempt + 1)
-                    print(f"    Rate limit, waiting {wait}s...")
-                    if attempt == 0:
-                        print(f"    Full error: {error_str[:300]}")
-                    time.sleep(wait)
-                    continue
-                if attempt == 0:
-                    print(f"    Error: {type(e).__name__}: {error_str[:300]}")
-                    # Include response details when available.
-                    if hasattr(e, "response"):
-                        print(f"    Response status: {getattr(e.response, 'status_code', 'N/A')}")
-                if attempt < 2:
-                    time.sleep(1)
-                    continue
+                print(f"    Error: {type(e).__name__}: {error_str[:300]}")
+                # Include response details when available.
+                if hasattr(e, "response"):
+                    print(f"    Response status: {getattr(e.response, 'status_code', 'N/A')}")
                 return [([], None) for _ in items]
         return [([], None) for _ in items]
 
 
+def _create_message(executor, client, **kwargs):
+    """Anthropic messages.create for one request, through the shared executor"""
+    prompt = "".join(str(m.get("content", "")) for m in kwargs.get("messages", []))
+    return executor.call(
+        client.messages.create,
+        key=request_key(kwargs),
+        tokens=estimate_tokens(kwargs.get("system", "") + prompt, kwargs.get("max_tokens")),
+        **kwargs,
+    )
+
+
 class AnthropicLLMService(LLMService):
     """Claude(Anthropic) API for variable extraction, summary, worked_example. ANTHROPIC_API_KEY or CLAUDE_API_KEY required."""
     def __init__(self, api_key: str = None, model: str = "claude-3-5-sonnet-20240620",
@@ -843,6 +813,8 @@ class AnthropicLLMService(LLMService):
                 self.client = anthropic.Anthropic(api_key=self.api_key)
              except ImportError:
                  pass
+        self.client = cassette_client(self.client, "anthropic")
+        self.executor = get_llm_executor("anthropic")
 
     def _get_cache_key(self, prompt: str, method: str) -> str:
         """Generate cache key from prompt and method."""
@@ -867,7 +839,8 @@ class AnthropicLLMService(LLMService):
         last_error = None
         for model in model_chain:
             try:
-                message = self.client.messages.create(
+                message = _create_message(
+                    self.executor, self.client,
                     model=model,
                     max_tokens=max_tokens,
                     messages=[{"role": "user", "content": prompt}]
@@ -922,9 +895,6 @@ Example format (but you can use any clear format):
                 result = self._parse_meanings_response(raw, candidate_symbols, formula_text)
                 return result
             except Exception as e:
-                if "429" in str(e) or "overloaded" in str(e).lower():
-                    time.sleep(2 * (attempt + 1))
-                    continue
                 print(f"LLM Error (Anthropic extract_variables): {e}")
                 return []
         return []
@@ -995,10 +965,8 @@ Example format (but you can use any clear format):
                     data = parse_json_response(raw)
                     return data if isinstance(data, dict) else {"problem_statement": text}
             except Exception as e:
-                if "429" in str(e) or "overloaded" in str(e).lower():
-                    time.sleep(2 * (attempt + 1))
-                    continue
                 print(f"LLM Error (Anthropic structure_worked_example): {e}")
+                break
         return {"problem_statement": text}
 
     def extract_formula_summary(self, formula_text: str, variables: List[VariableDefinition]) -> Optional[str]:
@@ -1016,10 +984,8 @@ Formula: {formula_text}
                     summary = summary.replace("**", "").replace("*", "").strip()[:200]
                     return summary or (f"Formula computing {', '.join([v.symbol for v in variables[:3]])}" if variables else None)
             except Exception as e:
-                if "429" in str(e) or "overloaded" in str(e).lower():
-                    time.sleep(2 * (attempt + 1))
-                    continue
                 print(f"LLM Error (Anthropic extract_formula_summary): {e}")
+                break
         return f"Formula computing {', '.join([v.symbol for v in variables[:3]])}" if variables else None
 
     def _serialize_batch_for_cache(
@@ -1113,19 +1079,9 @@ Return ONLY valid JSON."""
                     continue
                 return [([], None) for _ in items]
             except Exception as e:
+                # Rate limits and transient errors were already retried by the executor
                 error_str = str(e)
-                if "429" in error_str or "overloaded" in error_str.lower():
-                    wait = 2 * (attempt + 1)
-                    print(f"    Rate limit, waiting {wait}s...")
-                    if attempt == 0:
-                        print(f"    Full error: {error_str[:300]}")
-                    time.sleep(wait)
-                    continue
-                if attempt == 0:
-                    print(f"    Error: {type(e).__name__}: {error_str[:300]}")
-                if attempt < 2:
-                    time.sleep(1)
-                    continue
+                print(f"    Error: {type(e).__name__}: {error_str[:300]}")
                 return [([], None) for _ in items]
         return [([], None) for _ in items]
 
@@ -1146,6 +1102,8 @@ class ClaudeLLMService:
             except ImportError:
                 print("Warning: anthropic package not installed. Install with: pip install anthropic")
                 self.client = None
+        self.client = cassette_client(self.client, "anthropic")
+        self.executor = get_llm_executor("anthropic")
     
     def generate_solution(self, question_text: str, formulas: List[str] = None, 
                          context: str = "") -> Dict[str, Any]:
@@ -1177,7 +1135,8 @@ Return JSON with:
             # Try latest model first, fallback to older if not available
             model_name = "claude-3-5-sonnet-20240229"
             try:
-                message = self.client.messages.create(
+                message = _create_message(
+                    self.executor, self.client,
                     model=model_name,
                     max_tokens=2000,
                     messages=[{"role": "user", "content": prompt}]
@@ -1189,7 +1148,8 @@ Return JSON with:
                     # Try simpler model name once, then give up
                     try:
                         model_name = "claude-3-5-sonnet"
-                        message = self.client.messages.create(
+                        message = _create_message(
+                            self.executor, self.client,
                             model=model_name,
                             max_tokens=2000,
                             messages=[{"role": "user", "content": prompt}]
@@ -1259,7 +1219,8 @@ Return JSON with:
             # Try latest model first, fallback to older if not available
             model_name = "claude-3-5-sonnet-20240229"
             try:
-                message = self.client.messages.create(
+                message = _create_message(
+                    self.executor, self.client,
                     model=model_name,
                     max_tokens=1000,
                     messages=[{"role": "user", "content": prompt}]
@@ -1271,7 +1232,8 @@ Return JSON with:
                     # Try simpler model name once, then give up
                     try:
                         model_name = "claude-3-5-sonnet"
-                        message = self.client.messages.create(
+                        message = _create_message(
+                            self.executor, self.client,
                             model=model_name,
                             max_tokens=1000,
                             messages=[{"role": "user", "content": prompt}]
@@ -1403,7 +1365,8 @@ def _generate_json_anthropic(llm_service: "AnthropicLLMService", prompt: str, te
     system = "You must respond with only valid JSON. No markdown code blocks, no explanation, no preamble. Output nothing before or after the JSON."
     for model in model_chain:
         try:
-            message = llm_service.client.messages.create(
+            message = _create_message(
+                llm_service.executor, llm_service.client,
                 model=model,
                 max_tokens=4096,  # haiku/sonnet cap; opus allows more but 4096 is safe for all
                 system=system,
@@ -1424,9 +1387,8 @@ def generate_json_with_llm(llm_service: LLMService, prompt: str, temperature: fl
         if not llm_service.client:
             return None
         try:
-            response = llm_service.client.chat.completions.create(
-                model=llm_service.model_name,
-                messages=[{"role": "user", "content": prompt}],
+            response = llm_service._chat(
+                prompt,
                 response_format={"type": "json_object"},
                 temperature=temperature
             )
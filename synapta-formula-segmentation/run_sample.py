@@ -9,6 +9,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from synapta_segmenter import Pipeline
+from segmenter.llm_cassette import use_cassette
 
 # --- Book config: add new textbooks here for easy switching ---
 BOOKS = {
@@ -62,6 +63,14 @@ def parse_args():
     p.add_argument("--batch-size", type=int, default=None, help="Override LLM batch size")
     p.add_argument("--no-lexicon", action="store_true", help="Disable variable lexicon")
     p.add_argument("--clear-cache", action="store_true", help="Delete outputs/.cache (solution cache) before run; variable/LaTeX caches are in-memory only")
+    p.add_argument("--no-formula-kb", action="store_true", help="Do not read/write the corpus formula knowledge base (.cache/formula_kb.db)")
+    p.add_argument("--page-workers", type=int, default=1, metavar="N",
+                   help="Extract pages in N worker processes (map/reduce; same output as serial, default: 1)")
+    p.add_argument("--llm-cassette", type=str, metavar="PATH", help="Record LLM calls to / replay them from this cassette (JSON Lines)")
+    p.add_argument("--llm-cassette-mode", default="replay", choices=["record", "replay"], help="Cassette mode (default: replay, no network)")
+    p.add_argument("--replay-latency", default="recorded", metavar="SPEC",
+                   help="Replay latency: recorded, none, fixed:SECONDS, lognormal or lognormal:MEDIAN,SIGMA (default: recorded)")
+    p.add_argument("--replay-latency-scale", type=float, default=1.0, help="Multiply replay latencies by this factor")
     return p.parse_args()
 
 
@@ -164,6 +173,11 @@ def main():
         print(f"Scope: chapter {chapter} pages {page_range[0]}-{page_range[1]}")
     print(f"Output: {output_path}")
 
+    if args.llm_cassette:
+        cassette = use_cassette(args.llm_cassette, mode=args.llm_cassette_mode,
+                                latency=args.replay_latency, latency_scale=args.replay_latency_scale)
+        print(f"LLM cassette: {args.llm_cassette} ({cassette.mode}, latency={cassette.latency})")
+
     pipeline = Pipeline(
         concept_list_path=concept_list_path,
         target_chapter=chapter if not full_book else None,
@@ -181,6 +195,8 @@ def main():
         reference_stub_types=set(),
         enable_llm_disambiguation=True,
         llm_disambiguation_batch_size=8,
+        formula_store_path=None if args.no_formula_kb else os.path.join(".cache", "formula_kb.db"),
+        page_workers=args.page_workers,
     )
     pipeline.run(
         pdf_path,
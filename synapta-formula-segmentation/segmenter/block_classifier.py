@@ -0,0 +1,140 @@
+"""
+Formula/prose classification of PDF text blocks.
+
+FormulaExtractor asks the same questions of every text block on every page
+(does it look like a formula, is it prose, does it carry an equation label).
+block_features computes every lexical feature those decisions need in one
+pass with precompiled patterns, and memoizes the result by block text:
+running headers, footers and repeated formulas recur across pages and are
+classified once per run (per process when pages are extracted in parallel).
+Geometry (the block's x position) is applied on top, so it is not cached.
+
+bench_block_classifier.py measures the per-block cost.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+# Distinct block texts kept in the memo (least recently used are dropped)
+BLOCK_CACHE_SIZE = 65536
+
+# Symbol sets of the original checks; "**" is the only multi-character symbol
+_PROSE_MATH = re.compile(r"[=∑√∫σπθλ+−×÷^/\\]|\*\*")
+_TOKEN_MATH = re.compile(r"[=∑√∫σπθλ+−×÷^/\\()\[\]]|\*\*|[A-Za-z]\d|\d[A-Za-z]|[A-Za-z]_[A-Za-z]")
+_LAYOUT_MATH = re.compile(r"[=∑√∫σπθλ+−×÷^/\\()\[\]]|\*\*")
+_HEURISTIC_MATH = re.compile(r"[=∑√∫σπθλ+−×÷^∂∆]|\*\*")
+_GREEK_OR_OPERATOR = re.compile(r"([α-ωΑ-Ω])|([=+\-−*/×÷^∑∫√∂∆])")
+_SHORT_OPERATOR = re.compile(r"[=+\-*/×÷∑∫√]")
+_LETTER = re.compile(r"[A-Za-zα-ωΑ-Ω]")
+_EQUATION_LABEL = re.compile(r"\(\d+\.\d+\)")
+_NUMERIC_ONLY = re.compile(r"[\d\.\-%\s]+")
+_INDEX_ASSIGNMENT = re.compile(r"[A-Za-z]\s*=\s*[-]?\d+(\.\d+)?")
+_BARE_LABEL = re.compile(r"\(?\d+(?:\.\d+)+[a-z]?\)?")
+_URL = re.compile(r"https?://|www\.|\.com\b|\.edu\b|\.net\b", re.IGNORECASE)
+_VARIABLE = re.compile(r"[A-Za-z][_(]")
+
+
+@dataclass(frozen=True)
+class BlockFeatures:
+    """Lexical features of one (stripped) text block"""
+    n_chars: int
+    n_words: int
+    # Words containing a math symbol (prose test) / a symbol, bracket or subscript (formula test)
+    math_tokens: int
+    math_tokens_loose: int
+    greek_count: int
+    operator_count: int
+    has_letter: bool
+    has_equation_label: bool  # "(9.1)" anywhere
+    has_eq_keyword: bool      # equation label, "Eq." or "Equation"
+    has_short_operator: bool
+    has_layout_symbol: bool
+    has_heuristic_symbol: bool
+    has_variable_pattern: bool
+    is_numeric_only: bool
+    is_index_assignment: bool  # "k = 1"
+    is_bare_label: bool
+    is_url: bool
+
+    @property
+    def math_token_ratio(self) -> float:
+        return self.math_tokens / self.n_words if self.n_words else 0.0
+
+    @property
+    def looks_like_prose(self) -> bool:
+        """Eight or more words, under 20% of them math tokens"""
+        return self.n_words >= 8 and self.math_tokens / self.n_words < 0.2
+
+    @property
+    def is_formula_heuristic(self) -> bool:
+        """Fast check: math symbols or variable-like patterns, excluding URLs and bare labels"""
+        if not self.n_chars or self.is_url or self.is_bare_label:
+            return False
+        return self.has_heuristic_symbol or self.has_variable_pattern
+
+    def is_formula(self, x0: float, page_width: float) -> bool:
+        """Formula rather than prose, given the block's left edge (centered blocks count as display math)"""
+        if self.n_chars <= 3 and not self.has_equation_label and not self.has_short_operator:
+            return False
+        if (not self.has_letter and self.is_numeric_only and self.n_words <= 2
+                and not self.has_equation_label):
+            return False
+        if self.is_index_assignment and not self.has_equation_label:
+            return False
+        is_centered = bool(page_width) and (page_width * 0.2) < x0 < (page_width * 0.6)
+        ratio = self.math_tokens_loose / (self.n_words or 1)
+        if ratio < 0.3 and not self.has_eq_keyword:
+            return False
+        return self.has_layout_symbol and (is_centered or self.has_eq_keyword or ratio >= 0.3)
+
+
+def block_features(text: str) -> BlockFeatures:
+    """Features of `text` (memoized by its stripped form)"""
+    return _block_features((text or "").strip())
+
+
+@lru_cache(maxsize=BLOCK_CACHE_SIZE)
+def _block_features(clean: str) -> BlockFeatures:
+    words = clean.split()
+    math_tokens = math_tokens_loose = 0
+    for word in words:
+        if _TOKEN_MATH.search(word):
+            math_tokens_loose += 1
+            if _PROSE_MATH.search(word):
+                math_tokens += 1
+    greek_count = operator_count = 0
+    for m in _GREEK_OR_OPERATOR.finditer(clean):
+        if m.lastindex == 1:
+            greek_count += 1
+        else:
+            operator_count += 1
+    has_equation_label = _EQUATION_LABEL.search(clean) is not None
+    return BlockFeatures(
+        n_chars=len(clean),
+        n_words=len(words),
+        math_tokens=math_tokens,
+        math_tokens_loose=math_tokens_loose,
+        greek_count=greek_count,
+        operator_count=operator_count,
+        has_letter=_LETTER.search(clean) is not None,
+        has_equation_label=has_equation_label,
+        has_eq_keyword=has_equation_label or "Eq." in clean or "Equation" in clean,
+        has_short_operator=_SHORT_OPERATOR.search(clean) is not None,
+        has_layout_symbol=_LAYOUT_MATH.search(clean) is not None,
+        has_heuristic_symbol=_HEURISTIC_MATH.search(clean) is not None,
+        has_variable_pattern=_VARIABLE.search(clean) is not None,
+        is_numeric_only=_NUMERIC_ONLY.fullmatch(clean) is not None,
+        is_index_assignment=_INDEX_ASSIGNMENT.fullmatch(clean) is not None,
+        is_bare_label=_BARE_LABEL.fullmatch(clean) is not None,
+        is_url=_URL.search(clean) is not None,
+    )
+
+
+def block_cache_info():
+    """functools cache statistics of the block memo (hits, misses, maxsize, currsize)"""
+    return _block_features.cache_info()
+
+
+def clear_block_cache() -> None:
+    _block_features.cache_clear()
@@ -2,64 +2,263 @@ import os
 import sqlite3
 import hashlib
 import json
-from typing import Optional, Any, Dict
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional, Any, Dict, Iterable, Set, Tuple
+
+class _ConnectionHolder:
+    """Per-thread owner of a DiskCache connection (weak-referenceable, unlike the connection)"""
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+
+def _release_connection(conn: sqlite3.Connection, connections: Set[sqlite3.Connection],
+                        lock: threading.Lock) -> None:
+    with lock:
+        connections.discard(conn)
+    try:
+        conn.close()
+    except Exception:
+        pass
+
 
 class DiskCache:
     """
-    Simple SQLite-based disk cache for LLM responses.
+    SQLite-based disk cache for LLM responses.
+
+    - One connection per thread, reused across calls, in WAL mode, so readers
+      do not block on a writer and threads do not serialize on file locks.
+      A thread's connection is closed when the thread exits.
+    - A bounded in-memory LRU tier (memory_items) in front of sqlite. It holds
+      the JSON text, so every get() returns a fresh object as before.
+    - set_many() writes a batch in one transaction; get_many() prefetches many
+      keys with one query per chunk.
+    - Entries older than ttl_seconds are treated as misses. compact() deletes
+      them, trims the table to max_entries (oldest first) and checkpoints the
+      WAL. It can run on a background thread (compact_in_background) or from
+      the command line: python -m segmenter.cache_manager compact
     """
-    def __init__(self, cache_dir: str = ".cache", db_name: str = "llm_cache.db"):
+    # SQLite's default limit on host parameters per statement is 999
+    _CHUNK = 500
+
+    def __init__(self, cache_dir: str = ".cache", db_name: str = "llm_cache.db",
+                 memory_items: int = 4096, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
         self.cache_dir = cache_dir
         self.db_path = os.path.join(cache_dir, db_name)
+        self.memory_items = memory_items
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connections: Set[sqlite3.Connection] = set()
+        self._connections_lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        # Lookup counters (memory_hits is the part of hits served by the LRU tier)
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
         self._init_db()
 
     def _init_db(self):
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir, exist_ok=True)
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''
+
+        conn = self._conn()
+        conn.execute('''
             CREATE TABLE IF NOT EXISTS cache (
                 key TEXT PRIMARY KEY,
                 value TEXT,
                 timestamp REAL
             )
         ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_timestamp ON cache (timestamp)")
         conn.commit()
-        conn.close()
+
+    def _conn(self) -> sqlite3.Connection:
+        """This thread's connection (opened on first use)"""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            holder = _ConnectionHolder(conn)
+            # The thread-local holder is dropped when its thread exits (or on close());
+            # the finalizer then closes the connection so short-lived threads do not leak it
+            weakref.finalize(holder, _release_connection, conn, self._connections, self._connections_lock)
+            self._local.holder = holder
+            with self._connections_lock:
+                self._connections.add(conn)
+        return holder.conn
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+    def _expired(self, timestamp: Optional[float], now: float) -> bool:
+        return self.ttl_seconds is not None and (timestamp or 0) < now - self.ttl_seconds
+
+    def _remember(self, key: str, json_val: str, timestamp: float):
+        if self.memory_items <= 0:
+            return
+        with self._memory_lock:
+            self._memory[key] = (json_val, timestamp)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str, now: float) -> Optional[str]:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[1], now):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return entry[0]
 
     def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Cached values for the keys that are present (misses are left out)"""
+        now = time.time()
+        found: Dict[str, str] = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            json_val = self._from_memory(key, now)
+            if json_val is None:
+                missing.append(key)
+            else:
+                found[key] = json_val
+        memory_hits = len(found)
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            c.execute("SELECT value FROM cache WHERE key = ?", (key,))
-            row = c.fetchone()
-            conn.close()
-            
-            if row:
-                return json.loads(row[0])
-            return None
+            conn = self._conn()
+            for start in range(0, len(missing), self._CHUNK):
+                chunk = missing[start:start + self._CHUNK]
+                rows = conn.execute(
+                    f"SELECT key, value, timestamp FROM cache WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, json_val, timestamp in rows:
+                    if not self._expired(timestamp, now):
+                        found[key] = json_val
+                        self._remember(key, json_val, timestamp or now)
         except Exception as e:
             print(f"Cache read error: {e}")
-            return None
+        with self._memory_lock:
+            self.memory_hits += memory_hits
+            self.hits += len(found)
+            self.misses += len(missing) - (len(found) - memory_hits)
+        result = {}
+        for key, json_val in found.items():
+            try:
+                result[key] = json.loads(json_val)
+            except ValueError as e:
+                print(f"Cache read error: {e}")
+        return result
 
     def set(self, key: str, value: Any):
+        self.set_many({key: value})
+
+    def set_many(self, items: Any):
+        """Write many key -> value pairs (a dict or (key, value) pairs) in one transaction"""
+        pairs = items.items() if isinstance(items, dict) else items
+        now = time.time()
         try:
-            conn = sqlite3.connect(self.db_path)
-            c = conn.cursor()
-            json_val = json.dumps(value)
-            c.execute(
-                "INSERT OR REPLACE INTO cache (key, value, timestamp) VALUES (?, ?, strftime('%s', 'now'))",
-                (key, json_val)
-            )
-            conn.commit()
-            conn.close()
+            rows = [(key, json.dumps(value), now) for key, value in pairs]
+            if not rows:
+                return
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO cache (key, value, timestamp) VALUES (?, ?, ?)",
+                    rows,
+                )
+            for key, json_val, timestamp in rows:
+                self._remember(key, json_val, timestamp)
         except Exception as e:
             print(f"Cache write error: {e}")
 
+    def compact(self, vacuum: bool = False) -> Dict[str, int]:
+        """Delete expired entries, trim to max_entries (oldest first), checkpoint the WAL"""
+        stats = {"expired": 0, "evicted": 0}
+        try:
+            conn = self._conn()
+            with conn:
+                if self.ttl_seconds is not None:
+                    stats["expired"] = conn.execute(
+                        "DELETE FROM cache WHERE timestamp < ?", (time.time() - self.ttl_seconds,)
+                    ).rowcount
+                if self.max_entries is not None:
+                    stats["evicted"] = conn.execute(
+                        "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY timestamp DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    ).rowcount
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if vacuum:
+                conn.execute("VACUUM")
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except Exception as e:
+            print(f"Cache compaction error: {e}")
+        if stats["expired"] or stats["evicted"]:
+            with self._memory_lock:
+                self._memory.clear()
+        return stats
+
+    def compact_in_background(self, vacuum: bool = False) -> threading.Thread:
+        """Run compact() on a daemon thread (with its own connection)"""
+        thread = threading.Thread(target=self.compact, kwargs={"vacuum": vacuum}, daemon=True)
+        thread.start()
+        return thread
+
     def generate_key(self, prompt: str, model: str, params: Dict[str, Any] = None) -> str:
         """Generate a deterministic hash key."""
         params_str = json.dumps(params or {}, sort_keys=True)
         raw = f"{model}::{params_str}::{prompt}"
         return hashlib.md5(raw.encode()).hexdigest()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Maintain the LLM disk cache")
+    parser.add_argument("command", choices=["compact", "stats"])
+    parser.add_argument("--cache-dir", default=".cache")
+    parser.add_argument("--db-name", default="llm_cache.db")
+    parser.add_argument("--ttl-days", type=float, default=None, help="Delete entries older than this")
+    parser.add_argument("--max-entries", type=int, default=None, help="Keep only the newest N entries")
+    parser.add_argument("--vacuum", action="store_true", help="Also rebuild the file to reclaim space")
+    args = parser.parse_args()
+
+    cache = DiskCache(
+        cache_dir=args.cache_dir,
+        db_name=args.db_name,
+        ttl_seconds=args.ttl_days * 86400 if args.ttl_days is not None else None,
+        max_entries=args.max_entries,
+    )
+    if args.command == "compact":
+        print(cache.compact(vacuum=args.vacuum))
+    else:
+        count, oldest, newest = cache._conn().execute(
+            "SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM cache"
+        ).fetchone()
+        print({"entries": count, "oldest": oldest, "newest": newest,
+               "bytes": os.path.getsize(cache.db_path)})
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, Field
+
+from schemas import VariableDefinition
+
+# Bump when verification / post-processing of enrichment results changes, so
+# records produced by older logic are no longer reused
+ENRICHMENT_VERSION = 1
+
+
+class FormulaRecord(BaseModel):
+    """Verified enrichment of one canonical formula, shared across books."""
+    canonical_key: str
+    formula_text: str
+    variables: List[VariableDefinition] = Field(default_factory=list)
+    summary: Optional[str] = None
+    latex: Optional[str] = None
+    # Share of the LLM's variables that survived verification against the formula
+    confidence: float = 0.0
+    # Books/runs that produced or confirmed this record:
+    # [{"book_id", "doc_uri", "source", "confidence", "at"}]
+    provenance: List[Dict[str, Any]] = Field(default_factory=list)
+    # Revision of this record (bumped whenever its content is replaced)
+    version: int = 1
+    enrichment_version: int = ENRICHMENT_VERSION
+    updated_at: float = 0.0
+
+
+class FormulaStore:
+    """
+    Corpus-level formula knowledge base (SQLite, keyed by canonical formula key).
+
+    Standard formulas (CAPM, Sharpe ratio, duration, ...) recur across books.
+    FormulaExtractor looks every unique formula up here before sending a batch
+    to the LLM and writes verified results back, so a formula is enriched once
+    for the whole corpus instead of once per book. A record is only replaced by
+    a result of equal or higher confidence; otherwise the new book is just
+    added to its provenance.
+    """
+    _CHUNK = 500
+
+    def __init__(self, path: str = os.path.join(".cache", "formula_kb.db"), min_confidence: float = 0.6):
+        self.path = path
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS formulas (
+                canonical_key TEXT PRIMARY KEY,
+                record TEXT,
+                confidence REAL,
+                enrichment_version INTEGER,
+                updated_at REAL
+            )
+        ''')
+        self._conn.commit()
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, FormulaRecord]:
+        """Reusable records (current enrichment version, confidence >= min_confidence)"""
+        keys = [k for k in dict.fromkeys(keys) if k]
+        found: Dict[str, FormulaRecord] = {}
+        with self._lock:
+            for start in range(0, len(keys), self._CHUNK):
+                chunk = keys[start:start + self._CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT canonical_key, record FROM formulas WHERE canonical_key IN ({','.join('?' * len(chunk))})"
+                    " AND enrichment_version = ? AND confidence >= ?",
+                    [*chunk, ENRICHMENT_VERSION, self.min_confidence],
+                ).fetchall()
+                for key, record in rows:
+                    try:
+                        found[key] = FormulaRecord(**json.loads(record))
+                    except Exception as e:
+                        print(f"Formula store read error ({key}): {e}")
+        return found
+
+    def get(self, key: Optional[str]) -> Optional[FormulaRecord]:
+        return self.get_many([key]).get(key) if key else None
+
+    def _load(self, key: str) -> Optional[FormulaRecord]:
+        row = self._conn.execute(
+            "SELECT record FROM formulas WHERE canonical_key = ? AND enrichment_version = ?",
+            (key, ENRICHMENT_VERSION),
+        ).fetchone()
+        return FormulaRecord(**json.loads(row[0])) if row else None
+
+    def _save(self, record: FormulaRecord) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO formulas (canonical_key, record, confidence, enrichment_version, updated_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (record.canonical_key, record.model_dump_json(), record.confidence, record.enrichment_version, record.updated_at),
+        )
+
+    def put_many(self, results: List[Dict[str, Any]], book_id: Optional[str] = None,
+                 doc_uri: Optional[str] = None, source: Optional[str] = None) -> int:
+        """
+        Merge verified results into the store in one transaction.
+
+        Each result is a dict with canonical_key, formula_text, variables,
+        summary, latex (optional) and confidence. Returns how many records
+        were created or replaced.
+        """
+        now = time.time()
+        written = 0
+        with self._lock:
+            try:
+                with self._conn:
+                    for result in results:
+                        key = result.get("canonical_key")
+                        if not key:
+                            continue
+                        confidence = float(result.get("confidence") or 0.0)
+                        provenance = {"book_id": book_id, "doc_uri": doc_uri, "source": source,
+                                      "confidence": round(confidence, 3), "at": now}
+                        existing = self._load(key)
+                        if existing and existing.confidence > confidence:
+                            if all(p.get("book_id") != book_id for p in existing.provenance):
+                                existing.provenance.append(provenance)
+                                self._save(existing)
+                            continue
+                        provenance_list = [p for p in (existing.provenance if existing else [])
+                                           if p.get("book_id") != book_id]
+                        self._save(FormulaRecord(
+                            canonical_key=key,
+                            formula_text=result.get("formula_text") or "",
+                            variables=result.get("variables") or [],
+                            summary=result.get("summary"),
+                            latex=result.get("latex") or (existing.latex if existing else None),
+                            confidence=confidence,
+                            provenance=provenance_list + [provenance],
+                            version=existing.version + 1 if existing else 1,
+                            updated_at=now,
+                        ))
+                        written += 1
+            except Exception as e:
+                print(f"Formula store write error: {e}")
+        return written
+
+    def set_latex(self, key: Optional[str], latex: Optional[str]) -> None:
+        """Attach a LaTeX rendering to an existing record that has none"""
+        if not key or not latex:
+            return
+        with self._lock:
+            try:
+                existing = self._load(key)
+                if existing and not existing.latex:
+                    existing.latex = latex
+                    existing.updated_at = time.time()
+                    with self._conn:
+                        self._save(existing)
+            except Exception as e:
+                print(f"Formula store write error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, reusable = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(confidence >= ? AND enrichment_version = ?), 0) FROM formulas",
+                (self.min_confidence, ENRICHMENT_VERSION),
+            ).fetchone()
+        return {"formulas": total, "reusable": reusable}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,237 @@
+"""
+Record/replay of raw LLM API calls, for offline benchmarks and regression runs.
+
+A cassette is a JSON Lines file with one recorded API call per line: the
+provider, the request (SDK keyword arguments), the response text, the token
+usage, the latency and, for failed calls, the error.
+
+- record: every service client is wrapped so real calls pass through and are
+  appended to the cassette
+- replay: service clients are replaced by stand-ins that answer from the
+  cassette without network access, API keys or provider SDKs installed.
+  Responses are rebuilt in the shape each SDK returns, so the services,
+  the executor (limits, dedup, retries) and everything above them run
+  unchanged. Requests with several recordings (e.g. a 429 and then a
+  success) are answered in recorded order, then the last one repeats.
+  A request that was never recorded raises CassetteMiss.
+
+Replay latency can be the recorded latency, none, a fixed delay or a
+lognormal distribution (fitted to the recorded latencies per provider unless
+median and sigma are given), optionally scaled; sampling is seeded.
+
+Enable with use_cassette(path, mode) before the services are created, via
+run_sample.py --llm-cassette, or with SYNAPTA_LLM_CASSETTE (path),
+SYNAPTA_LLM_CASSETTE_MODE and SYNAPTA_LLM_REPLAY_LATENCY.
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from segmenter.llm_executor import request_key, usage_tokens
+
+
+class CassetteMiss(LookupError):
+    """Replay was asked for a request the cassette has no recording of"""
+
+
+class ReplayedAPIError(Exception):
+    """A recorded API failure, raised again on replay"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _response_text(provider: str, response: Any) -> Optional[str]:
+    if provider == "openai":
+        return response.choices[0].message.content if response.choices else None
+    if provider == "gemini":
+        return getattr(response, "text", None)
+    content = getattr(response, "content", None)
+    return content[0].text if content else None
+
+
+def _build_response(provider: str, text: Optional[str], tokens: Optional[int]) -> Any:
+    """Minimal stand-in for the SDK response object the services read"""
+    tokens = tokens or 0
+    if provider == "openai":
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")],
+                               usage=SimpleNamespace(total_tokens=tokens))
+    if provider == "gemini":
+        return SimpleNamespace(text=text, candidates=[], prompt_feedback=None,
+                               usage_metadata=SimpleNamespace(total_token_count=tokens))
+    content = [SimpleNamespace(type="text", text=text)] if text is not None else []
+    return SimpleNamespace(content=content, usage=SimpleNamespace(input_tokens=0, output_tokens=tokens))
+
+
+def _client_shape(provider: str, create: Callable[..., Any]) -> Any:
+    """Object exposing `create` where the provider SDK client has its call"""
+    if provider == "openai":
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    if provider == "gemini":
+        return SimpleNamespace(models=SimpleNamespace(generate_content=create))
+    return SimpleNamespace(messages=SimpleNamespace(create=create))
+
+
+def _sdk_call(provider: str, client: Any) -> Callable[..., Any]:
+    if provider == "openai":
+        return client.chat.completions.create
+    if provider == "gemini":
+        return client.models.generate_content
+    return client.messages.create
+
+
+class Cassette:
+    """One cassette file in record or replay mode (see module docstring)"""
+
+    def __init__(self, path: str, mode: str = "replay", latency: str = "recorded",
+                 latency_scale: float = 1.0, seed: int = 0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.stats: Dict[str, int] = {"recorded": 0, "replayed": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lognormal: Dict[str, tuple] = {}
+        if mode == "replay":
+            self._load()
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["key"]].append(entry)
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        for entries in self._entries.values():
+            for entry in entries:
+                if entry.get("latency"):
+                    latencies[entry["provider"]].append(math.log(entry["latency"]))
+        for provider, logs in latencies.items():
+            mu = sum(logs) / len(logs)
+            sigma = math.sqrt(sum((x - mu) ** 2 for x in logs) / len(logs))
+            self._lognormal[provider] = (mu, sigma)
+
+    def wrap(self, client: Any, provider: str) -> Any:
+        """Client to use instead of `client` (which may be None in replay mode)"""
+        if self.mode == "replay":
+            return _client_shape(provider, lambda **kwargs: self._replay(provider, kwargs))
+        if client is None:
+            return None
+        call = _sdk_call(provider, client)
+        return _client_shape(provider, lambda **kwargs: self._record(provider, call, kwargs))
+
+    def _record(self, provider: str, call: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        entry: Dict[str, Any] = {"provider": provider, "key": request_key(provider, kwargs),
+                                 "request": kwargs, "text": None, "tokens": None, "error": None}
+        start = time.perf_counter()
+        try:
+            response = call(**kwargs)
+        except Exception as e:
+            entry["latency"] = time.perf_counter() - start
+            status = getattr(e, "status_code", None)
+            entry["error"] = {"message": str(e), "status_code": status if isinstance(status, int) else None}
+            self._append(entry)
+            raise
+        entry["latency"] = time.perf_counter() - start
+        entry["text"] = _response_text(provider, response)
+        entry["tokens"] = usage_tokens(response)
+        self._append(entry)
+        return response
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.stats["recorded"] += 1
+
+    def _replay(self, provider: str, kwargs: Dict[str, Any]) -> Any:
+        key = request_key(provider, kwargs)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"cassette has no recording of this {provider} request ({key[:12]})")
+            entry = entries[min(self._cursor[key], len(entries) - 1)]
+            self._cursor[key] += 1
+            self.stats["replayed"] += 1
+            delay = self._delay(provider, entry)
+        if delay > 0:
+            time.sleep(delay)
+        if entry.get("error"):
+            raise ReplayedAPIError(entry["error"]["message"], entry["error"].get("status_code"))
+        return _build_response(provider, entry.get("text"), entry.get("tokens"))
+
+    def _delay(self, provider: str, entry: Dict[str, Any]) -> float:
+        kind, _, params = self.latency.partition(":")
+        if kind == "none":
+            return 0.0
+        if kind == "fixed":
+            seconds = float(params or 0)
+        elif kind == "lognormal":
+            if params:
+                median, sigma = (float(x) for x in params.split(","))
+                mu = math.log(median)
+            else:
+                mu, sigma = self._lognormal.get(provider, (0.0, 0.0))
+            seconds = self._random.lognormvariate(mu, sigma)
+        elif kind == "recorded":
+            seconds = entry.get("latency") or 0.0
+        else:
+            raise ValueError(f"Unknown replay latency: {self.latency}")
+        return seconds * self.latency_scale
+
+
+_active: Optional[Cassette] = None
+_env_checked = False
+_active_lock = threading.Lock()
+
+
+def use_cassette(path: Optional[str], mode: str = "replay", latency: str = "recorded",
+                 latency_scale: float = 1.0, seed: int = 0) -> Optional[Cassette]:
+    """Make `path` the process-wide cassette for services created afterwards (None turns it off)"""
+    global _active, _env_checked
+    with _active_lock:
+        _env_checked = True
+        _active = Cassette(path, mode, latency, latency_scale, seed) if path else None
+        return _active
+
+
+def active_cassette() -> Optional[Cassette]:
+    """The cassette set by use_cassette, or configured by SYNAPTA_LLM_CASSETTE"""
+    global _active, _env_checked
+    with _active_lock:
+        if not _env_checked:
+            _env_checked = True
+            path = os.environ.get("SYNAPTA_LLM_CASSETTE")
+            if path:
+                _active = Cassette(
+                    path,
+                    mode=os.environ.get("SYNAPTA_LLM_CASSETTE_MODE", "replay"),
+                    latency=os.environ.get("SYNAPTA_LLM_REPLAY_LATENCY", "recorded"),
+                )
+        return _active
+
+
+def cassette_client(client: Any, provider: str) -> Any:
+    """`client` as seen through the active cassette (unchanged when none is active)"""
+    cassette = active_cassette()
+    return cassette.wrap(client, provider) if cassette else client
@@ -0,0 +1,375 @@
+"""
+Shared execution layer for all LLM API calls.
+
+Every service (OpenAI-compatible, Gemini, Anthropic, Claude solution agent)
+sends its raw SDK call through the executor of its provider instead of calling
+the client directly. Executors are shared per process and run on one asyncio
+event loop on a background thread, so the limits hold across all threads and
+service instances:
+
+- a semaphore caps concurrent requests per provider
+- a request bucket caps requests per minute (RPM)
+- a token bucket caps tokens per minute (TPM); each request reserves its
+  estimated prompt + completion tokens and is settled against the usage the
+  API reports once it returns
+- identical requests that are in flight at the same time share one API call
+- rate-limit (429), overload and 5xx errors, timeouts and connection errors
+  are retried with full-jitter exponential backoff (Retry-After is honoured);
+  anything else is raised to the caller immediately
+
+Limits are read from the environment per provider, e.g.
+SYNAPTA_LLM_OPENAI_CONCURRENCY, SYNAPTA_LLM_ANTHROPIC_RPM,
+SYNAPTA_LLM_GEMINI_TPM (0 disables a limit), and SYNAPTA_LLM_MAX_RETRIES.
+
+`run_pipelined` fans independent work items (chapters, question batches) out
+to one long-lived pool of pipeline threads. It does not throttle them itself:
+their LLM calls wait for the provider budget here, so the provider limits
+decide throughput.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+# (concurrency, requests per minute, tokens per minute)
+DEFAULT_LIMITS: Dict[str, Tuple[int, float, float]] = {
+    "openai": (8, 500, 200_000),
+    "gemini": (8, 300, 1_000_000),
+    "anthropic": (4, 50, 40_000),
+}
+# Completion budget assumed when a request does not set max_tokens
+DEFAULT_COMPLETION_TOKENS = 1024
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504, 529}
+_RETRY_MARKERS = ("rate_limit", "rate limit", "quota", "resource_exhausted", "overloaded",
+                  "timeout", "timed out", "temporarily unavailable", "connection")
+# Status codes quoted in error messages (whole numbers only, not digits inside ids or hashes)
+_RETRY_STATUS_TEXT = re.compile(r"\b(?:429|502|503|529)\b")
+_RETRY_ERRORS = {"RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+                 "ServiceUnavailableError", "OverloadedError", "ResourceExhausted", "ServerError"}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+def estimate_tokens(text: str, max_tokens: Optional[int] = None) -> int:
+    """Rough request size: ~4 characters per prompt token plus the completion budget"""
+    return len(text or "") // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def request_key(*parts: Any) -> str:
+    """Stable key of a request (used to share identical in-flight calls)"""
+    raw = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for status in (getattr(error, "status_code", None), getattr(error, "code", None),
+                   getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(status, int):
+            return status
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, overload, server errors and transport failures"""
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    if type(error).__name__ in _RETRY_ERRORS:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in _RETRY_MARKERS) or bool(_RETRY_STATUS_TEXT.search(message))
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After") or "")
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    """Total tokens reported by an OpenAI, Anthropic or Gemini response"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        total = getattr(usage, "total_tokens", None)
+        if isinstance(total, int):
+            return total
+        inputs, outputs = getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+        if isinstance(inputs, int) and isinstance(outputs, int):
+            return inputs + outputs
+    total = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+    return total if isinstance(total, int) else None
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1) -> None:
+        if self.rate <= 0:
+            return
+        # A request larger than the bucket would never fit; let it drain the bucket instead
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+    def settle(self, delta: float) -> None:
+        """Charge (delta > 0) or refund (delta < 0) tokens after the fact; may go into debt"""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - delta)
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """The process-wide executor loop (started on first use)"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-executor", daemon=True).start()
+        return _loop
+
+
+class LLMExecutor:
+    """Rate-limited, deduplicating runner for one provider's API calls (see module docstring)"""
+
+    def __init__(
+        self,
+        provider: str,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 60,
+        tokens_per_minute: float = 0,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+    ):
+        self.provider = provider
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.stats: Dict[str, int] = {"requests": 0, "deduplicated": 0, "retries": 0, "failures": 0, "tokens": 0}
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+        # Blocking SDK calls run here; the semaphore keeps at most max_concurrency busy
+        self._calls = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"llm-{provider}")
+        self._loop = _event_loop()
+        # Loop-bound primitives are created on the executor loop
+        self._semaphore, self._requests, self._tokens = asyncio.run_coroutine_threadsafe(
+            self._make_limits(), self._loop).result()
+
+    async def _make_limits(self) -> Tuple[asyncio.Semaphore, TokenBucket, TokenBucket]:
+        # Request bursts are kept to the concurrency; a full minute of tokens may burst
+        requests = TokenBucket(self.requests_per_minute / 60, capacity=self.max_concurrency)
+        tokens = TokenBucket(self.tokens_per_minute / 60, capacity=max(1.0, self.tokens_per_minute))
+        return asyncio.Semaphore(self.max_concurrency), requests, tokens
+
+    def call(self, fn: Callable[..., Any], *args: Any, key: Optional[str] = None,
+             tokens: int = DEFAULT_COMPLETION_TOKENS, **kwargs: Any) -> Any:
+        """Blocking call from any thread; see `acall` for the arguments"""
+        return self.submit(fn, *args, key=key, tokens=tokens, **kwargs).result()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, key: Optional[str] = None,
+               tokens: int = DEFAULT_COMPLETION_TOKENS, **kwargs: Any) -> Future:
+        """Schedule a call without waiting; the returned future holds the response"""
+        return asyncio.run_coroutine_threadsafe(self.acall(fn, *args, key=key, tokens=tokens, **kwargs), self._loop)
+
+    async def acall(self, fn: Callable[..., Any], *args: Any, key: Optional[str] = None,
+                    tokens: int = DEFAULT_COMPLETION_TOKENS, **kwargs: Any) -> Any:
+        """Response of fn(*args, **kwargs), run within this provider's limits.
+
+        `key` identifies the request (see `request_key`); a call with the same
+        key as one still in flight waits for that call's response instead of
+        sending another request. `tokens` is the estimated request size
+        (see `estimate_tokens`) reserved against the TPM budget.
+        """
+        if key is None:
+            return await self._run(fn, args, kwargs, tokens)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(fn, args, kwargs, tokens))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["deduplicated"] += 1
+        return await asyncio.shield(task)
+
+    async def _run(self, fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any], tokens: int) -> Any:
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                await self._requests.acquire()
+                await self._tokens.acquire(tokens)
+                self.stats["requests"] += 1
+                try:
+                    response = await loop.run_in_executor(self._calls, lambda: fn(*args, **kwargs))
+                except Exception as e:
+                    if not is_retryable(e) or attempt == self.max_retries:
+                        self.stats["failures"] += 1
+                        raise
+                    self.stats["retries"] += 1
+                    delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                    await asyncio.sleep(max(delay, _retry_after_seconds(e) or 0))
+                    continue
+                used = usage_tokens(response)
+                if used is not None:
+                    self._tokens.settle(used - min(tokens, self._tokens.capacity))
+                self.stats["tokens"] += used if used is not None else tokens
+                return response
+
+
+_executors: Dict[Tuple[str, str], LLMExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_llm_executor(provider: str, endpoint: str = "") -> LLMExecutor:
+    """Process-wide executor per (provider, endpoint), configured from the environment.
+
+    `endpoint` separates budgets of OpenAI-compatible backends (OpenRouter,
+    Groq, Ollama) that share the "openai" limits but not the quota.
+    """
+    with _executors_lock:
+        executor = _executors.get((provider, endpoint))
+        if executor is None:
+            concurrency, rpm, tpm = DEFAULT_LIMITS.get(provider, (4, 60, 0))
+            prefix = f"SYNAPTA_LLM_{provider.upper()}"
+            executor = LLMExecutor(
+                provider,
+                max_concurrency=int(_env_float(f"{prefix}_CONCURRENCY", concurrency)),
+                requests_per_minute=_env_float(f"{prefix}_RPM", rpm),
+                tokens_per_minute=_env_float(f"{prefix}_TPM", tpm),
+                max_retries=int(_env_float("SYNAPTA_LLM_MAX_RETRIES", 4)),
+            )
+            _executors[(provider, endpoint)] = executor
+        return executor
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every executor created in this process"""
+    with _executors_lock:
+        return {f"{p}@{e}" if e else p: dict(x.stats) for (p, e), x in _executors.items()}
+
+
+class _PipelineTask:
+    """One work item of a run_pipelined call; runs once, on a pool thread or on the waiting caller"""
+    __slots__ = ("fn", "item", "future", "claimed")
+
+    def __init__(self, fn: Callable[[Any], Any], item: Any):
+        self.fn = fn
+        self.item = item
+        self.future: Future = Future()
+        self.claimed = False
+
+    def run(self) -> None:
+        with _pipeline_lock:
+            if self.claimed:
+                return
+            self.claimed = True
+        self.future.set_running_or_notify_cancel()
+        try:
+            result = self.fn(self.item)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+_pipeline_pool: Optional[ThreadPoolExecutor] = None
+_pipeline_lock = threading.Lock()
+_pipeline_local = threading.local()
+
+
+def _mark_pipeline_thread() -> None:
+    _pipeline_local.is_worker = True
+
+
+def _get_pipeline_pool() -> ThreadPoolExecutor:
+    """Process-wide pool of SYNAPTA_LLM_PIPELINE_WIDTH threads shared by every run_pipelined call"""
+    global _pipeline_pool
+    with _pipeline_lock:
+        if _pipeline_pool is None:
+            _pipeline_pool = ThreadPoolExecutor(
+                max_workers=max(1, int(_env_float("SYNAPTA_LLM_PIPELINE_WIDTH", 32))),
+                thread_name_prefix="llm-pipeline",
+                initializer=_mark_pipeline_thread,
+            )
+        return _pipeline_pool
+
+
+def run_pipelined(fn: Callable[[Any], Any], items: Iterable[Any],
+                  max_workers: Optional[int] = None) -> Iterator[Tuple[Any, Future]]:
+    """Run fn(item) for every item on the shared pipeline pool; yield (item, future) as each finishes.
+
+    Workers only block on LLM calls, which queue for their provider's budget,
+    so the pool width (SYNAPTA_LLM_PIPELINE_WIDTH) just has to exceed what the
+    providers admit at once; `max_workers` caps how many of this call's items
+    are queued at a time. Threads are reused across calls and nested calls
+    share the same width. A nested call (made from a pipeline thread) runs the
+    items no thread has started yet itself, so a saturated pool cannot
+    deadlock on its own queue.
+    """
+    tasks = [_PipelineTask(fn, item) for item in items]
+    if not tasks:
+        return
+    pool = _get_pipeline_pool()
+    queued = deque(tasks)
+
+    def submit_next(_: Any = None) -> None:
+        with _pipeline_lock:
+            task = queued.popleft() if queued else None
+        if task is None:
+            return
+        try:
+            pool.submit(task.run)
+        except RuntimeError:
+            # Pool shut down (interpreter exit): run it here
+            task.run()
+
+    for task in tasks:
+        task.future.add_done_callback(submit_next)
+    for _ in range(min(max_workers or len(tasks), len(tasks))):
+        submit_next()
+    if getattr(_pipeline_local, "is_worker", False):
+        for task in tasks:
+            task.run()
+
+    index = {task.future: task for task in tasks}
+    for future in as_completed(index):
+        yield index[future].item, future
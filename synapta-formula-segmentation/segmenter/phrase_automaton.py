@@ -0,0 +1,118 @@
+"""
+Aho-Corasick automaton for matching many phrases against a text in one scan.
+
+ConceptLinker registers every concept name, alias, description and
+tag/description n-gram once, then scans each segment's text a single time
+instead of running one substring or regex search per phrase. A scan reports,
+per matched phrase, whether any occurrence is delimited by word boundaries
+(the same test as re.search(r'\\b' + re.escape(phrase) + r'\\b', text)).
+"""
+
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Transitions live in one dict keyed by state * _STRIDE + code point, which is
+# several times smaller than a dict per state for tries of ~10^5 states
+_STRIDE = 0x110000
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class PhraseAutomaton:
+    """Phrases are added, then build() is called once before scanning"""
+
+    def __init__(self):
+        self.phrases: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._goto: Dict[int, int] = {}
+        self._fail = array("l", [0])
+        # Phrase ids ending at each state (own phrase plus those reached via failure links)
+        self._out: Dict[int, List[int]] = {}
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self.phrases)
+
+    @property
+    def states(self) -> int:
+        return len(self._fail)
+
+    def add(self, phrase: str) -> Optional[int]:
+        """Register `phrase` and return its id (None for an empty phrase)"""
+        if not phrase:
+            return None
+        pid = self._ids.get(phrase)
+        if pid is not None:
+            return pid
+        if self._built:
+            raise RuntimeError("PhraseAutomaton.add() after build()")
+        pid = len(self.phrases)
+        self.phrases.append(phrase)
+        self._ids[phrase] = pid
+        state = 0
+        for ch in phrase:
+            key = state * _STRIDE + ord(ch)
+            nxt = self._goto.get(key)
+            if nxt is None:
+                nxt = len(self._fail)
+                self._fail.append(0)
+                self._goto[key] = nxt
+            state = nxt
+        self._out.setdefault(state, []).append(pid)
+        return pid
+
+    def get(self, phrase: str) -> Optional[int]:
+        return self._ids.get(phrase) if phrase else None
+
+    def build(self) -> None:
+        """Compute failure links (breadth-first) and merge outputs along them"""
+        goto, fail, out = self._goto, self._fail, self._out
+        children: Dict[int, List[Tuple[int, int]]] = {}
+        for key, nxt in goto.items():
+            parent, code = divmod(key, _STRIDE)
+            children.setdefault(parent, []).append((code, nxt))
+        queue = deque(nxt for _, nxt in children.get(0, ()))
+        while queue:
+            state = queue.popleft()
+            for code, nxt in children.get(state, ()):
+                queue.append(nxt)
+                fallback = fail[state]
+                while fallback and fallback * _STRIDE + code not in goto:
+                    fallback = fail[fallback]
+                target = goto.get(fallback * _STRIDE + code, 0)
+                fail[nxt] = target
+                if target in out:
+                    out[nxt] = out.get(nxt, []) + out[target]
+        self._built = True
+
+    def scan(self, text: str) -> Dict[int, bool]:
+        """Matched phrase ids -> True if some occurrence has word boundaries on both sides"""
+        if not self._built:
+            self.build()
+        hits: Dict[int, bool] = {}
+        if not text:
+            return hits
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self.phrases
+        size = len(text)
+        state = 0
+        for end, ch in enumerate(text):
+            code = ord(ch)
+            while state and state * _STRIDE + code not in goto:
+                state = fail[state]
+            state = goto.get(state * _STRIDE + code, 0)
+            outputs = out.get(state)
+            if not outputs:
+                continue
+            after_word = end + 1 < size and _is_word(text[end + 1])
+            end_word = _is_word(ch)
+            for pid in outputs:
+                if hits.get(pid):
+                    continue
+                start = end - len(phrases[pid]) + 1
+                before_word = start > 0 and _is_word(text[start - 1])
+                bounded = before_word != _is_word(text[start]) and end_word != after_word
+                hits[pid] = bounded
+        return hits
@@ -5,10 +5,11 @@ import json
 import time
 import typing
 import hashlib
+import multiprocessing
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Tuple, Set, Union, Literal
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple, Set, Union, Literal
 from collections import defaultdict, Counter
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import fitz  # PyMuPDF
 from schemas import (
@@ -40,7 +41,11 @@ from llm_services import (
 )
 from concept_linker import ConceptLinker
 from segmenter.utils import format_solution_text
+from segmenter.block_classifier import block_features
 from segmenter.context import ContextProcessor
+from segmenter.formula_store import FormulaRecord, FormulaStore
+from segmenter.llm_cassette import active_cassette
+from segmenter.llm_executor import executor_stats, run_pipelined
 
 # Load environment variables
 try:
@@ -208,6 +213,18 @@ class FurnitureDetector:
 
 # Extractors
 
+class _MergeFragment(NamedTuple):
+    """What the merge decision needs from one formula segment, computed once per segment."""
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+    centered: bool  # horizontal midpoint within 20% of page width from the center
+    equation_number: Optional[str]
+    prose: bool
+    label: bool
+
+
 class BaseExtractor(ABC):
     @abstractmethod
     def process_page(self, page: fitz.Page, page_num: int, book_id: str, blocks: List[Any] = None,
@@ -219,18 +236,25 @@ class BaseExtractor(ABC):
 
 class FormulaExtractor(BaseExtractor):
     def __init__(self, llm_service: LLMService = None, llm_mode: Literal["off", "light", "full"] = "full",
-                 use_lexicon: bool = True):
+                 use_lexicon: bool = True, formula_store: Optional[FormulaStore] = None):
         self.llm_service = llm_service or MockLLMService()
         self.llm_mode = llm_mode
         self.use_lexicon = use_lexicon
         self._canonical_var_cache: Dict[str, List[VariableDefinition]] = {}
         self._symbol_meaning_cache: Dict[str, VariableDefinition] = {}
         self._summary_cache: Dict[str, Optional[str]] = {}
+        # Corpus-level knowledge base shared across books (None = per-run caches only);
+        # lookups are memoized per run, misses included
+        self.formula_store = formula_store
+        self._known_formulas: Dict[str, Optional[FormulaRecord]] = {}
+        self._provenance: Tuple[Optional[str], Optional[str]] = (None, None)  # (book_id, doc_uri)
         self._llm_stats: Dict[str, int] = {
             "extract_variables_calls": 0,
             "extract_variables_cache_hits": 0,
             "extract_variables_symbol_hits": 0,
             "extract_variables_skipped": 0,
+            "knowledge_base_hits": 0,
+            "knowledge_base_writes": 0,
         }
 
     def process_page(self, page: fitz.Page, page_num: int, book_id: str, blocks: List[Any] = None,
@@ -238,6 +262,7 @@ class FormulaExtractor(BaseExtractor):
         segments = []
         if blocks is None:
             blocks = page.get_text("blocks")
+        self._provenance = (book_id, doc_uri)
         
         # First pass: collect potential formula segments
         raw_formula_segments = []
@@ -250,16 +275,11 @@ class FormulaExtractor(BaseExtractor):
             if not clean_text: continue
             
             # Check if it's prose that was misclassified as formula
-            if self._is_formula(clean_text, x0, page.rect.width):
-                # Additional check: if math token ratio is very low, it's prose
-                words = clean_text.split()
-                math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '/', '\\'}
-                math_token_count = sum(1 for word in words if any(sym in word for sym in math_symbols))
-                math_token_ratio = math_token_count / len(words) if words else 0
-                
+            features = block_features(clean_text)
+            if features.is_formula(x0, page.rect.width):
                 # If math token ratio < 0.2 and no equation number, it's likely prose
                 # Skip it here - let TextBlockExtractor handle it as explanatory_text
-                if math_token_ratio < 0.2 and not re.search(r'\(\d+\.\d+\)', clean_text):
+                if features.math_token_ratio < 0.2 and not features.has_equation_label:
                     continue
                 # Extract broader context (two blocks before/after)
                 context_before_text = ""
@@ -356,6 +376,7 @@ class FormulaExtractor(BaseExtractor):
         book_id: str,
         doc_uri: Optional[str] = None,
         batch_size: int = 10,
+        scanned: Optional[List[FormulaSegment]] = None,
     ) -> List[FormulaSegment]:
         """
         New batch pipeline:
@@ -363,18 +384,25 @@ class FormulaExtractor(BaseExtractor):
         2. Deduplicate by canonical key.
         3. Send unique formulas to LLM in batches.
         4. Fan-out results to all instances.
+
+        scanned: phase 1 output (scan_page results in page order) when the pages
+                 were already scanned elsewhere, e.g. by parallel page workers.
         """
-        print(f"Phase 1: Scanning pages {start_page} to {end_page} for formulas...")
-        all_segments = []
-        
-        # 1. Scan (fast, no LLM)
-        for i in range(start_page, end_page):
-            page_num = i + 1
-            blocks = clean_by_page.get(page_num, [])
-            page = doc[i]
-            page_segments = self.scan_page(page, page_num, book_id, blocks, doc_uri)
-            all_segments.extend(page_segments)
-            
+        self._provenance = (book_id, doc_uri)
+        if scanned is not None:
+            all_segments = scanned
+        else:
+            print(f"Phase 1: Scanning pages {start_page} to {end_page} for formulas...")
+            all_segments = []
+
+            # 1. Scan (fast, no LLM)
+            for i in range(start_page, end_page):
+                page_num = i + 1
+                blocks = clean_by_page.get(page_num, [])
+                page = doc[i]
+                page_segments = self.scan_page(page, page_num, book_id, blocks, doc_uri)
+                all_segments.extend(page_segments)
+
         print(f"  Found {len(all_segments)} formula candidates.")
         
         # 2. Enrich (Batch + Dedupe)
@@ -397,12 +425,12 @@ class FormulaExtractor(BaseExtractor):
             if not clean_text: continue
             
             # Heuristic detection checks
-            if not self._is_formula_heuristic(clean_text):
+            features = block_features(clean_text)
+            if not features.is_formula_heuristic:
                  # Fallback to geometry/token check if heuristic fails but looks like formula
-                 # (Copied logic from old is_formula check)
-                 if not self._is_formula(clean_text, x0, page_width):
+                 if not features.is_formula(x0, page_width):
                      continue
-                 if self._looks_like_prose(clean_text) and not re.search(r'\(\d+\.\d+\)', clean_text):
+                 if features.looks_like_prose and not features.has_equation_label:
                      continue
 
             # Context extraction
@@ -451,6 +479,11 @@ class FormulaExtractor(BaseExtractor):
         
         unique_keys = list(by_key.keys())
         print(f"Phase 2: Enriching {len(unique_keys)} unique formulas (from {len(segments)} total)...")
+        # One knowledge-base query for every formula of the document
+        self._prefetch_known_formulas(
+            key for key in unique_keys
+            if key not in self._canonical_var_cache and not self._is_simple_formula(by_key[key][0].text_content)
+        )
         
         # Prepare batch items
         to_enrich = []
@@ -482,8 +515,8 @@ class FormulaExtractor(BaseExtractor):
                     s.confidence = 1.0 # High confidence for simple rules
                 continue
 
-            # 2. Check Cache
-            cached = self._get_cached_variables_by_key(key)
+            # 2. Check Cache (this run, then the corpus knowledge base)
+            cached = self._get_cached_variables_by_key(key) or self._adopt_known_formula(key)
             if cached:
                 # Fan out from cache
                 summary = self._summary_cache.get(key)
@@ -511,6 +544,7 @@ class FormulaExtractor(BaseExtractor):
             return
 
         # Process in chunks
+        source = getattr(self.llm_service, "model_name", None) or type(self.llm_service).__name__
         for i in range(0, len(to_enrich), batch_size):
             chunk_keys = to_enrich[i : i + batch_size]
             batch_inputs = [] # (formula, context, candidates)
@@ -536,6 +570,7 @@ class FormulaExtractor(BaseExtractor):
             results = self.llm_service.extract_variables_batch(items=batch_inputs)
             
             # Fan out results
+            verified_results = []
             for idx, item_result in enumerate(results):
                 key = batch_ids[idx]
                 formula_text = batch_inputs[idx][0]
@@ -551,12 +586,20 @@ class FormulaExtractor(BaseExtractor):
                 self._update_variable_caches(key, processed)
                 if summary:
                     self._summary_cache[key] = summary
+                if processed:
+                    verified_results.append(self._knowledge_result(key, formula_text, processed, summary,
+                                                                   len(verified) / len(vars_list)))
                 
                 # Update all instances
                 for s in by_key[key]:
                     s.variables = self._clone_variables(processed)
                     s.short_meaning = summary
             
+            # Write verified enrichments back to the corpus knowledge base
+            rep = by_key[batch_ids[0]][0]
+            self._store_known_formulas(verified_results, book_id=rep.book_id,
+                                       doc_uri=getattr(rep, "doc_uri", None), source=source)
+            
             print(f"  Processed batch {i // batch_size + 1}/{(len(to_enrich) + batch_size - 1) // batch_size}")
 
 
@@ -621,6 +664,11 @@ class FormulaExtractor(BaseExtractor):
         - Close y-distance (within 2 lines, ~30-40 pixels)
         - Same equation_number OR no equation_number but close proximity
         - Similar x-position (centered formulas)
+
+        Single sweep per page: fragments are sorted by y0 and each group
+        absorbs the following fragments while they merge with its first one.
+        Per-segment inputs (bbox, prose/label flags) are computed once, and a
+        merged FormulaSegment is only built for each final group.
         """
         if not formula_segments:
             return []
@@ -639,85 +687,80 @@ class FormulaExtractor(BaseExtractor):
                 page_width = page_widths[page_num]
             elif page_segments and page_segments[0].bbox:
                 page_width = max(s.bbox.x1 for s in page_segments if s.bbox)  # best-effort
+            fragments = [self._merge_fragment(seg, page_width) for seg in page_segments]
             
             i = 0
             while i < len(page_segments):
-                current = page_segments[i]
-                merge_group = [current]
-                
-                # Look ahead for fragments to merge
+                # Sweep down the page while fragments merge with the group's first fragment
                 j = i + 1
-                while j < len(page_segments):
-                    candidate = page_segments[j]
-                    
-                    # Check if should merge
-                    should_merge = self._should_merge_formulas(current, candidate, page_height, page_width)
-                    
-                    if should_merge:
-                        merge_group.append(candidate)
-                        j += 1
-                    else:
-                        break
+                while j < len(page_segments) and self._fragments_merge(fragments[i], fragments[j], page_width):
+                    j += 1
                 
-                # Merge the group
-                if len(merge_group) > 1:
-                    merged_seg = self._merge_formula_group(merge_group)
-                    merged.append(merged_seg)
-                    i = j  # Skip merged segments
+                if j - i > 1:
+                    merged.append(self._merge_formula_group(page_segments[i:j]))
                 else:
-                    merged.append(current)
-                    i += 1
+                    merged.append(page_segments[i])
+                i = j
         
         return merged
     
+    def _merge_fragment(self, seg: FormulaSegment, page_width: Optional[float]) -> Optional[_MergeFragment]:
+        """Merge inputs of one segment (None without a bbox, which never merges)."""
+        if not seg.bbox:
+            return None
+        x0, y0, x1, y1 = seg.bbox.x0, seg.bbox.y0, seg.bbox.x1, seg.bbox.y1
+        centered = bool(page_width) and abs((x0 + x1) / 2 - page_width / 2) < page_width * 0.2
+        return _MergeFragment(
+            x0, y0, x1, y1, centered, seg.equation_number,
+            self._looks_like_prose(seg.formula_text_raw), self._is_equation_label(seg.formula_text_raw),
+        )
+    
     def _should_merge_formulas(self, seg1: FormulaSegment, seg2: FormulaSegment, page_height: float,
                                page_width: Optional[float]) -> bool:
         """Check if two formula segments should be merged."""
-        if not seg1.bbox or not seg2.bbox:
-            return False
-        
         # Must be on same page
         if seg1.page_start != seg2.page_start:
             return False
+        return self._fragments_merge(self._merge_fragment(seg1, page_width),
+                                     self._merge_fragment(seg2, page_width), page_width)
+    
+    def _fragments_merge(self, f1: Optional[_MergeFragment], f2: Optional[_MergeFragment],
+                         page_width: Optional[float]) -> bool:
+        """Merge decision for two fragments of the same page (f1 above f2)."""
+        if f1 is None or f2 is None:
+            return False
         
         # Hard stop: avoid merging with likely prose
-        if self._looks_like_prose(seg1.formula_text_raw) or self._looks_like_prose(seg2.formula_text_raw):
-            # Allow equation label to attach to formula
-            if not (self._is_equation_label(seg1.formula_text_raw) or self._is_equation_label(seg2.formula_text_raw)):
-                return False
+        # (an equation label may still attach to a formula)
+        if (f1.prose or f2.prose) and not (f1.label or f2.label):
+            return False
         
         # Check y-distance (within ~2 lines, ~40 pixels)
-        y_distance = abs(seg2.bbox.y0 - seg1.bbox.y1)
+        y_distance = abs(f2.y0 - f1.y1)
         max_y_distance = 40.0  # pixels
         
         if y_distance > max_y_distance:
             return False
         
         # Check x-position similarity (both should be centered or similar x)
-        x_overlap = not (seg1.bbox.x1 < seg2.bbox.x0 or seg2.bbox.x1 < seg1.bbox.x0)
-        x_close = abs(seg1.bbox.x0 - seg2.bbox.x0) < 100  # Within 100 pixels
-        is_centered = False
-        if page_width:
-            mid1 = (seg1.bbox.x0 + seg1.bbox.x1) / 2
-            mid2 = (seg2.bbox.x0 + seg2.bbox.x1) / 2
-            is_centered = abs(mid1 - page_width / 2) < page_width * 0.2 and \
-                          abs(mid2 - page_width / 2) < page_width * 0.2
+        x_overlap = not (f1.x1 < f2.x0 or f2.x1 < f1.x0)
+        x_close = abs(f1.x0 - f2.x0) < 100  # Within 100 pixels
+        is_centered = f1.centered and f2.centered
         
         if not (x_overlap or x_close or is_centered):
             return False
         
         # If both have equation numbers, they must match
-        if seg1.equation_number and seg2.equation_number:
-            return seg1.equation_number == seg2.equation_number
+        if f1.equation_number and f2.equation_number:
+            return f1.equation_number == f2.equation_number
         
         # If one has equation number and other doesn't, merge if close
         # (denominator/numerator often don't have eq number)
-        if (seg1.equation_number and not seg2.equation_number) or \
-           (seg2.equation_number and not seg1.equation_number):
+        if f1.equation_number or f2.equation_number:
             return True  # Merge (likely numerator/denominator)
         
         # Equation label line (e.g., "(9.1)" or "Eq. 9.1") should attach to nearby formula
-        if self._is_equation_label(seg1.formula_text_raw) or self._is_equation_label(seg2.formula_text_raw):
+        if f1.label or f2.label:
             return y_distance < 60.0
         
         # Both have no equation number - merge if very close
@@ -806,43 +849,7 @@ class FormulaExtractor(BaseExtractor):
         Detect if text is a formula, not prose.
         Filters out explanatory text with low math token ratio.
         """
-        clean = text.strip()
-        # Drop single-symbol labels (common in figures/axes)
-        if len(clean) <= 3 and not re.search(r'\(\d+\.\d+\)', clean):
-            if not re.search(r'[=+\-*/×÷∑∫√]', clean):
-                return False
-        # Reject numeric-only or table-like fragments (e.g., column values)
-        if not re.search(r'[A-Za-zα-ωΑ-Ω]', clean):
-            if re.fullmatch(r'[\d\.\-%\s]+', clean):
-                # Drop tiny numeric fragments; keep larger numeric blocks for context/merge
-                if len(clean.split()) <= 2 and not re.search(r'\(\d+\.\d+\)', clean):
-                    return False
-        # Reject tiny index assignments like "k = 1" without equation labels
-        if re.fullmatch(r'[A-Za-z]\s*=\s*[-]?\d+(\.\d+)?', clean) and not re.search(r'\(\d+\.\d+\)', clean):
-            return False
-        # Centered if left margin is far from page edge
-        is_centered = False
-        if page_width:
-            is_centered = (page_width * 0.2) < x0 < (page_width * 0.6)
-        math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '/', '\\', '(', ')', '[', ']'}
-        has_math_symbol = any(s in text for s in math_symbols)
-        has_eq_keyword = "Eq." in text or "Equation" in text or bool(re.search(r'\(\d+\.\d+\)', text))
-        
-        # Calculate math token ratio to filter out prose
-        words = text.split()
-        math_token_count = sum(1 for word in words if any(sym in word for sym in math_symbols) or 
-                              re.search(r'[A-Za-z]\d+|\d+[A-Za-z]|[A-Za-z]_[A-Za-z]', word))  # Subscripts, variables
-        total_tokens = len(words) if words else 1
-        math_token_ratio = math_token_count / total_tokens
-        
-        # Filter out prose: if math token ratio is too low, it's likely explanatory text
-        # Threshold: at least 30% math tokens OR has equation keyword
-        if math_token_ratio < 0.3 and not has_eq_keyword:
-            return False  # Likely prose, not formula
-        
-        if has_math_symbol and (is_centered or has_eq_keyword or math_token_ratio >= 0.3):
-            return True
-        return False
+        return block_features(text).is_formula(x0, page_width)
 
     def _raw_as_latex_fallback(self, raw: str) -> str:
         """Normalize raw formula text for use when LaTeX conversion fails. Never returns None."""
@@ -862,10 +869,17 @@ class FormulaExtractor(BaseExtractor):
         # Simple heuristic: if already looks like LaTeX, return as-is
         if '\\' in formula_text or '{' in formula_text:
             return formula_text
+        known = self._known_formula(canonical_key)
+        if known and known.latex:
+            return known.latex
         try:
-            return self.llm_service.convert_to_latex(formula_text, canonical_key=canonical_key)
+            latex = self.llm_service.convert_to_latex(formula_text, canonical_key=canonical_key)
         except Exception:
             return None
+        if known and latex and self.formula_store:
+            self.formula_store.set_latex(canonical_key, latex)
+            known.latex = latex
+        return latex
     
     def _extract_eq_number(self, text: str, context_after: str = None) -> Optional[str]:
         """
@@ -916,35 +930,11 @@ class FormulaExtractor(BaseExtractor):
 
     def _is_formula_heuristic(self, text: str) -> bool:
         """
-        Fast heuristic to check if text looks like a formula.
-        Checks for:
-        - Geometric shapes (lines, circles) vs text density (handled by caller?)
-        - Presence of math symbols
-        - Low prose density
+        Fast heuristic to check if text looks like a formula:
+        math symbols or variable-like patterns such as E(r_M), excluding
+        URLs and bare equation labels.
         """
-        clean = text.strip()
-        if not clean:
-            return False
-        # Skip obvious URLs/domains or boilerplate strings
-        if re.search(r'https?://|www\.|\.com\b|\.edu\b|\.net\b', clean, re.IGNORECASE):
-            return False
-            
-        # Detect Equation Labels (e.g. (9.1)) -> assume formula line if attached
-        if re.search(r'^\(?\d+(?:\.\d+)+[a-z]?\)?$', clean):
-             return False # Just a label segment, not formula content? 
-             # Actually, often formula lines are just the label if detection split badly.
-             # But here we want content.
-        
-        # Check math symbols
-        math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '∂', '∆'}
-        if any(s in clean for s in math_symbols):
-             return True
-             
-        # Check variable-like patterns (e.g. E(r_M))
-        if re.search(r'[A-Za-z][_(]', clean):
-             return True
-             
-        return False
+        return block_features(text).is_formula_heuristic
 
     def _classify_formula_usage(self, text: str, context: str) -> Literal["definition", "application", "reference"]:
         """Classify formula usage type based on context."""
@@ -1092,6 +1082,10 @@ class FormulaExtractor(BaseExtractor):
             return None
         if canonical_key and canonical_key in self._summary_cache:
             return self._summary_cache[canonical_key]
+        known = self._known_formula(canonical_key)
+        if known and known.summary:
+            self._summary_cache[canonical_key] = known.summary
+            return known.summary
         summary = self.llm_service.extract_formula_summary(formula_text, variables)
         if canonical_key:
             self._summary_cache[canonical_key] = summary
@@ -1106,6 +1100,66 @@ class FormulaExtractor(BaseExtractor):
             "LLM stats (variables): "
             f"calls={total} cache_hits={cache_hits} symbol_cache_hits={symbol_hits}"
         )
+        if self.formula_store:
+            kb = self.formula_store.stats()
+            print(
+                "Formula knowledge base: "
+                f"hits={stats['knowledge_base_hits']} writes={stats['knowledge_base_writes']} "
+                f"formulas={kb['formulas']} reusable={kb['reusable']}"
+            )
+        for provider, counters in executor_stats().items():
+            print(f"LLM executor ({provider}): " + " ".join(f"{k}={v}" for k, v in counters.items()))
+        cassette = active_cassette()
+        if cassette:
+            print(f"LLM cassette ({cassette.mode}): " + " ".join(f"{k}={v}" for k, v in cassette.stats.items()))
+
+    def _prefetch_known_formulas(self, canonical_keys) -> None:
+        """Load knowledge-base records for many keys with one query"""
+        if not self.formula_store:
+            return
+        keys = [k for k in canonical_keys if k and k not in self._known_formulas]
+        found = self.formula_store.get_many(keys)
+        for key in keys:
+            self._known_formulas[key] = found.get(key)
+
+    def _known_formula(self, canonical_key: Optional[str]) -> Optional[FormulaRecord]:
+        if not self.formula_store or not canonical_key:
+            return None
+        if canonical_key not in self._known_formulas:
+            self._known_formulas[canonical_key] = self.formula_store.get(canonical_key)
+        return self._known_formulas[canonical_key]
+
+    def _adopt_known_formula(self, canonical_key: Optional[str]) -> Optional[List[VariableDefinition]]:
+        """Variables of a knowledge-base record (also seeding this run's caches), or None"""
+        known = self._known_formula(canonical_key)
+        if not known or not known.variables:
+            return None
+        self._llm_stats["knowledge_base_hits"] += 1
+        self._update_variable_caches(canonical_key, known.variables)
+        if known.summary and canonical_key not in self._summary_cache:
+            self._summary_cache[canonical_key] = known.summary
+        return self._clone_variables(known.variables)
+
+    def _knowledge_result(self, canonical_key: str, formula_text: str, variables: List[VariableDefinition],
+                          summary: Optional[str], confidence: float) -> Dict[str, Any]:
+        return {
+            "canonical_key": canonical_key,
+            "formula_text": formula_text,
+            "variables": self._clone_variables(variables),
+            "summary": summary,
+            "confidence": confidence,
+        }
+
+    def _store_known_formulas(self, results: List[Dict[str, Any]], book_id: Optional[str] = None,
+                              doc_uri: Optional[str] = None, source: Optional[str] = None) -> None:
+        """Write verified enrichments back to the knowledge base"""
+        if not self.formula_store or not results:
+            return
+        self._llm_stats["knowledge_base_writes"] += self.formula_store.put_many(
+            results, book_id=book_id, doc_uri=doc_uri, source=source
+        )
+        for result in results:
+            self._known_formulas.pop(result["canonical_key"], None)
 
     def _extract_variables(self, formula_text: str, context_text: str = "",
                            candidate_symbols: Optional[List[str]] = None,
@@ -1120,8 +1174,8 @@ class FormulaExtractor(BaseExtractor):
         
         This reduces LLM calls by 60-80% for typical textbooks.
         """
-        # Cache hit by canonical formula signature
-        cached = self._get_cached_variables_by_key(canonical_key)
+        # Cache hit by canonical formula signature (this run, then the corpus knowledge base)
+        cached = self._get_cached_variables_by_key(canonical_key) or self._adopt_known_formula(canonical_key)
         if cached:
             return cached
 
@@ -1166,6 +1220,14 @@ class FormulaExtractor(BaseExtractor):
                 merged = cached_symbols + verified_vars
                 processed = self._post_process_variables(merged, formula_text)
                 self._update_variable_caches(canonical_key, processed)
+                if canonical_key and processed:
+                    book_id, doc_uri = self._provenance
+                    self._store_known_formulas(
+                        [self._knowledge_result(canonical_key, formula_text, processed, None,
+                                                len(verified_vars) / len(llm_vars))],
+                        book_id=book_id, doc_uri=doc_uri,
+                        source=getattr(self.llm_service, "model_name", None) or type(self.llm_service).__name__,
+                    )
                 return processed
         
         # Step 4: Fallback to heuristic if LLM failed or was skipped
@@ -1240,13 +1302,7 @@ class FormulaExtractor(BaseExtractor):
         return False
     
     def _looks_like_prose(self, text: str) -> bool:
-        words = text.split()
-        if len(words) >= 8:
-            math_symbols = {'=', '∑', '√', '∫', 'σ', 'π', 'θ', 'λ', '+', '−', '×', '÷', '^', '**', '/', '\\'}
-            math_token_count = sum(1 for w in words if any(s in w for s in math_symbols))
-            if (math_token_count / max(len(words), 1)) < 0.2:
-                return True
-        return False
+        return block_features(text).looks_like_prose
     
     def _is_equation_label(self, text: str) -> bool:
         clean = (text or "").strip()
@@ -1470,6 +1526,32 @@ class TextBlockExtractor(BaseExtractor):
         else:
             self.reference_stub_types = {t.lower() for t in reference_stub_types}
     
+    def apply_example_structure(self, seg: WorkedExampleSegment, structure: Dict[str, Any]) -> None:
+        """Fill title, prompt, steps and final answer from the LLM structure, with heuristic fallbacks."""
+        clean_text = seg.text_content
+        steps = structure.get("steps", []) if isinstance(structure, dict) else []
+        final_answer_raw = structure.get("final_answer") if isinstance(structure, dict) else None
+        final_answer = str(final_answer_raw).strip() if final_answer_raw is not None else None
+        example_prompt = structure.get("problem_statement") if isinstance(structure, dict) else None
+        if not steps:
+            steps = self._fallback_example_steps(clean_text)
+        if not example_prompt:
+            example_prompt = clean_text
+        if not final_answer:
+            final_answer = self._extract_final_answer(clean_text)
+        seg.title = structure.get("title") if isinstance(structure, dict) else None
+        seg.example_prompt = example_prompt
+        seg.steps = steps
+        seg.final_answer = final_answer
+        seg.needs_human_review = not structure
+
+    def get_state(self) -> Tuple[Optional[str], Optional[int], Optional[str]]:
+        """Section state carried from page to page (see process_page)"""
+        return self.current_section, self.last_problem_number, self.last_problem_section
+
+    def set_state(self, state: Tuple[Optional[str], Optional[int], Optional[str]]) -> None:
+        self.current_section, self.last_problem_number, self.last_problem_section = state
+
     def _is_explanatory_text(self, text: str) -> bool:
         """
         Detect explanatory/prose text that might be misclassified.
@@ -1711,20 +1793,6 @@ class TextBlockExtractor(BaseExtractor):
                 structure = {}
                 if self.llm_mode != "off" and self.llm_service:
                     structure = self.llm_service.structure_worked_example(clean_text)
-                # Extract given data and output variables heuristically
-                given_data = self._extract_given_data(clean_text)
-                output_vars = self._extract_output_variables(clean_text)
-                steps = structure.get("steps", []) if isinstance(structure, dict) else []
-                final_answer_raw = structure.get("final_answer") if isinstance(structure, dict) else None
-                final_answer = str(final_answer_raw).strip() if final_answer_raw is not None else None
-                example_prompt = structure.get("problem_statement") if isinstance(structure, dict) else None
-                if not steps:
-                    steps = self._fallback_example_steps(clean_text)
-                if not example_prompt:
-                    example_prompt = clean_text
-                if not final_answer:
-                    final_answer = self._extract_final_answer(clean_text)
-                
                 seg = WorkedExampleSegment(
                     segment_id=str(uuid.uuid4()),
                     book_id=book_id,
@@ -1733,16 +1801,13 @@ class TextBlockExtractor(BaseExtractor):
                     page_end=page_num,
                     bbox=BBox(page=page_num, x0=x0, y0=y0, x1=x1, y1=y1),
                     text_content=clean_text,
-                    title=structure.get("title") if isinstance(structure, dict) else None,
-                    example_prompt=example_prompt,
-                    given_data=given_data,
-                    steps=steps,
-                    final_answer=final_answer,
-                    output_variables=output_vars,
+                    example_prompt=clean_text,
+                    # Extract given data and output variables heuristically
+                    given_data=self._extract_given_data(clean_text),
+                    output_variables=self._extract_output_variables(clean_text),
                     doc_uri=doc_uri,
                 )
-                if not structure:
-                    seg.needs_human_review = True
+                self.apply_example_structure(seg, structure)
                 segments.append(seg)
                 
             # Concept Check question (detect before general questions)
@@ -2469,6 +2534,95 @@ class TextBlockExtractor(BaseExtractor):
 
 # Linker
 
+# Singleton symbols too common in prose to count as variable evidence
+_COMMON_SINGLETONS = frozenset("abcdeijkmnpqrstxyz")
+
+
+def _main_chapter(chapter_number: Optional[str]) -> Optional[str]:
+    """Leading chapter number ("9" for "9.2"), None when unknown."""
+    if not chapter_number or chapter_number == "Unknown":
+        return None
+    m = re.match(r'^\s*(\d+)', chapter_number)
+    return m.group(1) if m else None
+
+
+class _FormulaVariableIndex:
+    """
+    Inverted index of formula variables for variable-overlap linking.
+
+    Formulas are bucketed by (main chapter, page window); each bucket maps
+    lowercased variable symbols and meaning phrases to the formulas that
+    define them, with the overlap weight each contributes. A source segment
+    only looks at the buckets its chapter and page window can reach and
+    gets its candidate formulas and their overlap from lookups, instead of
+    scanning every variable of every formula.
+    """
+
+    def __init__(self, all_formulas: Dict[str, FormulaSegment], page_window: int = 40):
+        self.page_window = page_window
+        # fid -> (main chapter, page or None, equation number)
+        self.formulas: Dict[str, Tuple[Optional[str], Optional[int], Optional[str]]] = {}
+        # (main chapter, page bucket) -> symbol/phrase -> fid -> overlap weight
+        self.symbols: Dict[Tuple[Optional[str], Optional[int]], Dict[str, Dict[str, float]]] = defaultdict(dict)
+        self.phrases: Dict[Tuple[Optional[str], Optional[int]], Dict[str, Dict[str, float]]] = defaultdict(dict)
+        self.members: Dict[Tuple[Optional[str], Optional[int]], List[str]] = defaultdict(list)
+        self.chapters: Set[Optional[str]] = set()
+
+        for fid, formula in all_formulas.items():
+            page = int(formula.page_start) if getattr(formula, "page_start", None) else None
+            chapter = _main_chapter(getattr(formula, "chapter_number", None))
+            self.formulas[fid] = (chapter, page, formula.equation_number)
+            self.chapters.add(chapter)
+            bucket = (chapter, self._page_bucket(page))
+            self.members[bucket].append(fid)
+            for var in formula.variables:
+                sym = (var.symbol or "").strip().lower()
+                meaning = (var.meaning or "").strip().lower()
+                # Single-letter symbols are noisy; common ones never count
+                if sym and not (len(sym) == 1 and sym in _COMMON_SINGLETONS):
+                    weights = self.symbols[bucket].setdefault(sym, {})
+                    weights[fid] = weights.get(fid, 0.0) + (0.5 if len(sym) == 1 else 1.0)
+                if meaning and len(meaning) >= 4:
+                    weights = self.phrases[bucket].setdefault(meaning, {})
+                    weights[fid] = weights.get(fid, 0.0) + 1.5
+
+    def _page_bucket(self, page: Optional[int]) -> Optional[int]:
+        return page // self.page_window if page else None
+
+    def buckets(self, chapter: Optional[str], page: Optional[int], window: Optional[int] = None,
+                include_unpaged: bool = True) -> List[Tuple[Optional[str], Optional[int]]]:
+        """Buckets holding every formula that chapter/page constraints allow for a source on `page`."""
+        chapters = [chapter, None] if chapter else list(self.chapters)
+        window = self.page_window if window is None else window
+        if page:
+            page_buckets: List[Optional[int]] = list(range((page - window) // self.page_window,
+                                                           (page + window) // self.page_window + 1))
+        else:
+            page_buckets = sorted({b for _, b in self.members if b is not None})
+        if include_unpaged:
+            page_buckets.append(None)
+        return [(ch, b) for ch in dict.fromkeys(chapters) for b in page_buckets if (ch, b) in self.members]
+
+    def overlaps(self, chapter: Optional[str], page: Optional[int], source_tokens: Set[str],
+                 source_text: str) -> Dict[str, float]:
+        """Variable overlap per candidate formula (formulas with no overlap are omitted)."""
+        overlap: Dict[str, float] = defaultdict(float)
+        phrase_hits: Dict[str, bool] = {}
+        for bucket in self.buckets(chapter, page):
+            symbols = self.symbols.get(bucket, {})
+            for token in (source_tokens if len(source_tokens) < len(symbols) else symbols):
+                if token in symbols and token in source_tokens:
+                    for fid, weight in symbols[token].items():
+                        overlap[fid] += weight
+            for phrase, weights in self.phrases.get(bucket, {}).items():
+                if phrase not in phrase_hits:
+                    phrase_hits[phrase] = phrase in source_text
+                if phrase_hits[phrase]:
+                    for fid, weight in weights.items():
+                        overlap[fid] += weight
+        return overlap
+
+
 class Linker:
 
     def __init__(self, concept_linker: Optional[ConceptLinker] = None,
@@ -2496,6 +2650,7 @@ class Linker:
                 if seg.equation_number:
                     norm_num = self._normalize_eq_num(seg.equation_number)
                     formulas_by_eq_num[norm_num] = seg
+        variable_index = _FormulaVariableIndex(all_formulas)
 
         # 2. Link formula references
         for seg in segments:
@@ -2524,7 +2679,7 @@ class Linker:
                 
                 # Fallback: variable-overlap heuristic uses ALL formulas, top N by overlap (avoid one-formula hub)
                 if not seg.referenced_formula_ids:
-                    linked = self._heuristic_link_by_variables(seg, all_formulas, max_refs=3)
+                    linked = self._heuristic_link_by_variables(seg, all_formulas, max_refs=3, index=variable_index)
                     for fid in linked:
                         add_evidence(
                             seg.segment_id,
@@ -2788,41 +2943,35 @@ class Linker:
                         results.append((q, synthetic_solution))
                 return results
 
-            # Run chapter batches in parallel (IO-bound LLM work); keep all graph mutations
+            # All chapters are in flight at once; the shared LLM executor admits their calls
+            # up to the provider's concurrency / RPM / TPM budget. Keep all graph mutations
             # on the main thread to avoid race conditions on shared lists/dicts.
-            max_workers = 3
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_map = {
-                    executor.submit(_generate_for_chapter, ch, q_list): ch
-                    for ch, q_list in by_chapter.items()
-                }
-                for future in as_completed(future_map):
-                    ch = future_map[future]
+            for ch, future in run_pipelined(lambda ch: _generate_for_chapter(ch, by_chapter[ch]), list(by_chapter)):
+                try:
+                    chapter_results = future.result()
+                except Exception as e:
+                    # Fallback: if a parallel batch fails (e.g., retries exhausted / timeout),
+                    # retry that chapter sequentially so the overall run can continue.
+                    print(f"[SolutionGenerator] Parallel generation failed for chapter {ch}, "
+                          f"falling back to sequential. Error: {e}")
                     try:
-                        chapter_results = future.result()
-                    except Exception as e:
-                        # Fallback: if a parallel batch fails (e.g., rate limit / timeout),
-                        # retry that chapter sequentially so the overall run can continue.
-                        print(f"[SolutionGenerator] Parallel generation failed for chapter {ch}, "
-                              f"falling back to sequential. Error: {e}")
-                        try:
-                            chapter_results = _generate_for_chapter(ch, by_chapter.get(ch, []))
-                        except Exception as e2:
-                            print(f"[SolutionGenerator] Sequential fallback failed for chapter {ch}: {e2}")
-                            continue
+                        chapter_results = _generate_for_chapter(ch, by_chapter.get(ch, []))
+                    except Exception as e2:
+                        print(f"[SolutionGenerator] Sequential fallback failed for chapter {ch}: {e2}")
+                        continue
 
-                    for q, synthetic_solution in chapter_results:
-                        solutions.append(synthetic_solution)
-                        segments.append(synthetic_solution)
-                        q.solution_status = "synthetic"
-                        synthetic_solution.solution_for_question_id = q.segment_id
-                        synthetic_solution.link_confidence = synthetic_solution.validation_score or 0.0
-                        synthetic_solution.prev_segment_id = q.segment_id
-                        synthetic_solution.next_segment_id = q.next_segment_id
-                        if q.next_segment_id and q.next_segment_id in seg_by_id:
-                            seg_by_id[q.next_segment_id].prev_segment_id = synthetic_solution.segment_id
-                        q.next_segment_id = synthetic_solution.segment_id
-                        seg_by_id[synthetic_solution.segment_id] = synthetic_solution
+                for q, synthetic_solution in chapter_results:
+                    solutions.append(synthetic_solution)
+                    segments.append(synthetic_solution)
+                    q.solution_status = "synthetic"
+                    synthetic_solution.solution_for_question_id = q.segment_id
+                    synthetic_solution.link_confidence = synthetic_solution.validation_score or 0.0
+                    synthetic_solution.prev_segment_id = q.segment_id
+                    synthetic_solution.next_segment_id = q.next_segment_id
+                    if q.next_segment_id and q.next_segment_id in seg_by_id:
+                        seg_by_id[q.next_segment_id].prev_segment_id = synthetic_solution.segment_id
+                    q.next_segment_id = synthetic_solution.segment_id
+                    seg_by_id[synthetic_solution.segment_id] = synthetic_solution
     
     def _validate_and_create_solution(self, question: QuestionSegment, candidates: List[Dict[str, Any]],
                                        relevant_formulas: List[FormulaSegment]) -> Optional[SolutionSegment]:
@@ -3072,62 +3221,47 @@ class Linker:
         union = len(q_words | s_words)
         return intersection / union if union > 0 else 0.0
 
-    def _heuristic_link_by_variables(self, source_seg: SegmentBase, all_formulas: Dict[str, FormulaSegment], max_refs: int = 3):
-        """Link by variable overlap; add top max_refs by overlap count to avoid one-formula hub."""
+    def _heuristic_link_by_variables(self, source_seg: SegmentBase, all_formulas: Dict[str, FormulaSegment], max_refs: int = 3,
+                                     index: Optional[_FormulaVariableIndex] = None):
+        """
+        Link by variable overlap; add top max_refs by overlap count to avoid one-formula hub.
+        Candidates come from `index` (built from all_formulas when not given).
+        """
+        if index is None:
+            index = _FormulaVariableIndex(all_formulas)
         source_text = (source_seg.text_content or "").lower()
         if source_seg.context_before:
             source_text += " " + (source_seg.context_before or "").lower()
         if source_seg.context_after:
             source_text += " " + (source_seg.context_after or "").lower()
         source_page = getattr(source_seg, "page_start", None)
+        source_page = int(source_page) if source_page else None
+        source_id = getattr(source_seg, "segment_id", None)
 
-        def _main_ch(ch: Optional[str]) -> Optional[str]:
-            if not ch or ch == "Unknown":
-                return None
-            m = re.match(r'^\s*(\d+)', ch)
-            return m.group(1) if m else None
-
-        source_main_ch = _main_ch(getattr(source_seg, "chapter_number", None))
+        source_main_ch = _main_chapter(getattr(source_seg, "chapter_number", None))
         source_tokens = set(re.findall(r"\b[a-zA-Z][a-zA-Z0-9_]*\b", source_text))
         eq_ref_hint = bool(re.search(r'\b(?:eq\.?|equation)\b', source_text))
-        common_singletons = {"a", "b", "c", "d", "e", "i", "j", "k", "m", "n", "p", "q", "r", "s", "t", "x", "y", "z"}
 
         scored: List[Tuple[float, str]] = []
-        for fid, formula in all_formulas.items():
-            if fid == getattr(source_seg, "segment_id", None):
+        for fid, overlap in index.overlaps(source_main_ch, source_page, source_tokens, source_text).items():
+            if fid == source_id:
                 continue
+            form_main_ch, form_page, equation_number = index.formulas[fid]
 
             # Constrain by chapter/page proximity to avoid global formula hubs.
-            form_main_ch = _main_ch(getattr(formula, "chapter_number", None))
             if source_main_ch and form_main_ch and source_main_ch != form_main_ch:
                 continue
-            if source_page and getattr(formula, "page_start", None):
-                if abs(int(formula.page_start) - int(source_page)) > 40:
-                    continue
-
-            overlap = 0.0
-            for var in formula.variables:
-                sym = (var.symbol or "").strip().lower()
-                meaning = (var.meaning or "").strip().lower()
-                if sym:
-                    # Single-letter symbols are noisy; require token-level exact hit.
-                    if len(sym) == 1:
-                        if sym not in common_singletons and sym in source_tokens:
-                            overlap += 0.5
-                    else:
-                        if sym in source_tokens:
-                            overlap += 1.0
-                if meaning and len(meaning) >= 4 and meaning in source_text:
-                    overlap += 1.5
+            if source_page and form_page and abs(form_page - source_page) > 40:
+                continue
 
             # Require stronger evidence unless there is explicit equation reference cue.
-            if overlap < 1.5 and not (eq_ref_hint and formula.equation_number and overlap >= 1.0):
+            if overlap < 1.5 and not (eq_ref_hint and equation_number and overlap >= 1.0):
                 continue
 
             # Penalize long-distance links.
             dist_penalty = 0.0
-            if source_page and getattr(formula, "page_start", None):
-                dist = abs(int(formula.page_start) - int(source_page))
+            if source_page and form_page:
+                dist = abs(form_page - source_page)
                 dist_penalty = min(dist / 50.0, 0.8)
             score = overlap - dist_penalty
             if score > 0:
@@ -3143,16 +3277,16 @@ class Linker:
         # Conservative fallback for pedagogical blocks:
         # if no variable-overlap link is found, attach the nearest equation-labeled
         # formula in the same chapter window to preserve explain/example chains.
-        if not linked and isinstance(source_seg, (WorkedExampleSegment, DerivationSegment, CalculationSegment)):
+        if not linked and source_page and isinstance(source_seg, (WorkedExampleSegment, DerivationSegment, CalculationSegment)):
             nearby: List[Tuple[int, str]] = []
-            for fid, formula in all_formulas.items():
-                if fid == getattr(source_seg, "segment_id", None):
-                    continue
-                form_main_ch = _main_ch(getattr(formula, "chapter_number", None))
-                if source_main_ch and form_main_ch and source_main_ch != form_main_ch:
-                    continue
-                if source_page and getattr(formula, "page_start", None):
-                    dist = abs(int(formula.page_start) - int(source_page))
+            for bucket in index.buckets(source_main_ch, source_page, window=20, include_unpaged=False):
+                for fid in index.members[bucket]:
+                    if fid == source_id:
+                        continue
+                    form_main_ch, form_page, _ = index.formulas[fid]
+                    if source_main_ch and form_main_ch and source_main_ch != form_main_ch:
+                        continue
+                    dist = abs(form_page - source_page)
                     if dist <= 20:
                         nearby.append((dist, fid))
             nearby.sort(key=lambda x: (x[0], x[1]))
@@ -3356,28 +3490,19 @@ Return ONLY valid JSON."""
             
             return batch_results
 
-        # Parallel Execution
-        from concurrent.futures import ThreadPoolExecutor
+        # All batches are in flight at once; the shared LLM executor paces them
+        # to the provider's concurrency / RPM / TPM budget
         chunks = []
         for start in range(0, len(questions), max_per_batch):
             chunks.append((start, questions[start : start + max_per_batch]))
             
         results_map = {}
-        # Max concurrency 3
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_start = {
-                executor.submit(process_batch, start, chunk): start 
-                for start, chunk in chunks
-            }
-            for future in future_to_start:
-                start = future_to_start[future]
-                try:
-                    res = future.result()
-                    results_map[start] = res
-                except Exception as e:
-                    print(f"Batch {start} failed: {e}")
-                    chunk_size = len(next(c for s, c in chunks if s == start))
-                    results_map[start] = [[] for _ in range(chunk_size)]
+        for (start, chunk), future in run_pipelined(lambda c: process_batch(*c), chunks):
+            try:
+                results_map[start] = future.result()
+            except Exception as e:
+                print(f"Batch {start} failed: {e}")
+                results_map[start] = [[] for _ in range(len(chunk))]
 
         final_out = []
         for start, _ in chunks:
@@ -3678,6 +3803,58 @@ Return JSON with:
         return min(alignment, 1.0)
 
 
+# Parallel page extraction (map step of Pipeline.process_pdf)
+
+_worker_doc: Optional[fitz.Document] = None
+_worker_furniture: Optional[FurnitureDetector] = None
+
+
+def _init_page_worker(pdf_path: str, furniture_detector: FurnitureDetector) -> None:
+    """Worker process setup: its own fitz handle and the parent's furniture statistics."""
+    global _worker_doc, _worker_furniture
+    _worker_doc = fitz.open(pdf_path)
+    _worker_furniture = furniture_detector
+
+
+def _extract_page_shard(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Block extraction, furniture filtering and both extractors for pages
+    [start, end), without LLM calls, starting from the given TextBlockExtractor
+    state. task["formulas"] is "scan" (batch mode), "page" (llm off) or None
+    (the parent extracts formulas from the returned blocks).
+    """
+    formula_extractor = FormulaExtractor(llm_mode="off", use_lexicon=task["use_lexicon"])
+    text_extractor = TextBlockExtractor(
+        llm_mode="off",
+        reference_stub_types=task["reference_stub_types"],
+        allowlist=task["allowlist"],
+    )
+    text_extractor.set_state(task["entry_state"])
+    book_id, doc_uri = task["book_id"], task["doc_uri"]
+    pages = []
+    for page_idx in range(task["start"], task["end"]):
+        page_num = page_idx + 1
+        page = _worker_doc[page_idx]
+        page_height = page.rect.height
+        clean_blocks = [
+            b for b in page.get_text("blocks")
+            if not _worker_furniture.is_furniture(b, page_height)
+        ]
+        formulas: List[FormulaSegment] = []
+        if task["formulas"] == "scan":
+            formulas = formula_extractor.scan_page(page, page_num, book_id, clean_blocks, doc_uri)
+        elif task["formulas"] == "page":
+            formulas = formula_extractor.process_page(page, page_num, book_id, blocks=clean_blocks, doc_uri=doc_uri)
+        text_blocks = text_extractor.process_page(page, page_num, book_id, blocks=clean_blocks, doc_uri=doc_uri)
+        pages.append({
+            "page_num": page_num,
+            "blocks": clean_blocks if task["formulas"] is None else None,
+            "formulas": formulas,
+            "text": text_blocks,
+        })
+    return {"entry_state": task["entry_state"], "exit_state": text_extractor.get_state(), "pages": pages}
+
+
 # Pipeline
 
 class Pipeline:
@@ -3697,16 +3874,26 @@ class Pipeline:
                  reference_stub_types: Optional[Set[str]] = None,
                  enable_llm_disambiguation: bool = False,
                  llm_disambiguation_batch_size: int = 8,
-                 validate_top_n_only: Optional[int] = None):
+                 validate_top_n_only: Optional[int] = None,
+                 formula_store_path: Optional[str] = os.path.join(".cache", "formula_kb.db"),
+                 page_workers: int = 1,
+                 pages_per_shard: Optional[int] = None):
         """
         openrouter_model: Model name for OpenRouter.
         llm_backend: Provider for variable extraction/summary/worked_example.
         ollama_model: Model name for local Ollama.
         ollama_base_url: Ollama base URL.
         validate_top_n_only: If set (e.g. 1), validate only top N solution candidates per question (saves LLM time on full book).
+        formula_store_path: SQLite corpus-level formula knowledge base shared across books
+                            (verified variables/summaries/LaTeX by canonical key); None disables it.
+        page_workers: Worker processes for page extraction (block extraction, furniture filtering,
+                      formula/text extractors); 1 keeps the serial loop. Output is the same either way.
+        pages_per_shard: Contiguous pages per worker task (default: about 4 shards per worker).
         """
         self.llm_mode = llm_mode
         self.batch_size = batch_size
+        self.page_workers = max(1, page_workers)
+        self.pages_per_shard = pages_per_shard
         self.llm_backend = llm_backend
         self.use_variable_lexicon = use_variable_lexicon
         self.segment_type_allowlist = {t for t in segment_type_allowlist} if segment_type_allowlist else None
@@ -3776,7 +3963,8 @@ class Pipeline:
         self.formula_extractor = FormulaExtractor(
             llm_service=self.llm_service,
             llm_mode=self.llm_mode,
-            use_lexicon=self.use_variable_lexicon
+            use_lexicon=self.use_variable_lexicon,
+            formula_store=FormulaStore(formula_store_path) if formula_store_path and llm_mode != "off" else None
         )
         self.text_block_extractor = TextBlockExtractor(
             llm_service=self.llm_service,
@@ -3812,6 +4000,55 @@ class Pipeline:
         # Scan for furniture (globally, with sampling/caching)
         self.furniture_detector.scan_document(doc, pdf_path)
 
+        use_batch = (
+            self.batch_size is not None and self.batch_size > 0
+            and self.llm_mode != "off"
+            and hasattr(self.llm_service, "extract_variables_batch")
+        )
+        if self.page_workers > 1 and end_page - start_page > 1:
+            all_segments = self._extract_pages_parallel(doc, pdf_path, book_id, doc_uri,
+                                                        start_page, end_page, use_batch)
+        else:
+            all_segments = self._extract_pages(doc, book_id, doc_uri, start_page, end_page, use_batch)
+
+        print(f"Extracted {len(all_segments)} segments. Processing context and linking...")
+            
+        self.context_processor = ContextProcessor(
+            mode=self.context_processor.mode,
+            target_chapter=self.context_processor.target_chapter,
+            chapter_title_map=chapter_title_map
+        )
+        print("  [1/6] Context processing (heading paths, merges, adjacency)...")
+        all_segments = self.context_processor.process(all_segments)
+        if self.segment_type_allowlist:
+            print("  [2/6] Applying segment allowlist filter...")
+            all_segments = self._filter_segments_by_type(all_segments, self.segment_type_allowlist)
+            all_segments = self.context_processor.add_adjacency_links(all_segments)
+            print(f"        Filtered segments: {len(all_segments)}")
+        if self.enable_llm_disambiguation and self.llm_mode != "off":
+            print("  [3/6] LLM disambiguation (ambiguous segments only)...")
+            all_segments = self._llm_disambiguate_segments(all_segments)
+        print("  [4/6] Variable lexicon application (if enabled)...")
+        if self.use_variable_lexicon and self.llm_mode != "off":
+            self._apply_variable_lexicon(all_segments)
+        print("  [5/6] Linking segments (concepts, questions/solutions, edges)...")
+        all_segments, edges = self.linker.link_segments(all_segments)
+        print("  [6/6] Building chapter metadata...")
+        self.formula_extractor.report_llm_stats()
+        
+        # Detect solution presence and build chapter metadata
+        chapters = self._build_chapter_metadata(all_segments, chapter_title_map)
+            
+        return SegmentationOutput(
+            metadata={"source_pdf": pdf_path, "total_pages": len(doc)},
+            chapters=chapters,
+            segments=all_segments,
+            edges=edges
+        )
+
+    def _extract_pages(self, doc: fitz.Document, book_id: str, doc_uri: str,
+                       start_page: int, end_page: int, use_batch: bool) -> List[SegmentBase]:
+        """Serial page extraction: segments of all pages in page order, before context processing."""
         all_blocks_map: Dict[int, List[Tuple]] = {}
         # Pre-load only the requested pages for processing
         for i in range(start_page, end_page):
@@ -3832,11 +4069,6 @@ class Pipeline:
         
         all_segments: List[SegmentBase] = []
         total_pages = end_page - start_page
-        use_batch = (
-            self.batch_size is not None and self.batch_size > 0
-            and self.llm_mode != "off"
-            and hasattr(self.llm_service, "extract_variables_batch")
-        )
         if use_batch:
             print(f"Using batched variable extraction (batch_size={self.batch_size})...")
             formula_segments = self.formula_extractor.process_blocks_batch(
@@ -3857,41 +4089,96 @@ class Pipeline:
                 page, page_num, book_id, blocks=clean_blocks, doc_uri=doc_uri
             )
             all_segments.extend(text_blocks)
-        
-        print(f"Extracted {len(all_segments)} segments. Processing context and linking...")
-            
-        self.context_processor = ContextProcessor(
-            mode=self.context_processor.mode,
-            target_chapter=self.context_processor.target_chapter,
-            chapter_title_map=chapter_title_map
-        )
-        print("  [1/6] Context processing (heading paths, merges, adjacency)...")
-        all_segments = self.context_processor.process(all_segments)
-        if self.segment_type_allowlist:
-            print("  [2/6] Applying segment allowlist filter...")
-            all_segments = self._filter_segments_by_type(all_segments, self.segment_type_allowlist)
-            all_segments = self.context_processor.add_adjacency_links(all_segments)
-            print(f"        Filtered segments: {len(all_segments)}")
-        if self.enable_llm_disambiguation and self.llm_mode != "off":
-            print("  [3/6] LLM disambiguation (ambiguous segments only)...")
-            all_segments = self._llm_disambiguate_segments(all_segments)
-        print("  [4/6] Variable lexicon application (if enabled)...")
-        if self.use_variable_lexicon and self.llm_mode != "off":
-            self._apply_variable_lexicon(all_segments)
-        print("  [5/6] Linking segments (concepts, questions/solutions, edges)...")
-        all_segments, edges = self.linker.link_segments(all_segments)
-        print("  [6/6] Building chapter metadata...")
-        self.formula_extractor.report_llm_stats()
-        
-        # Detect solution presence and build chapter metadata
-        chapters = self._build_chapter_metadata(all_segments, chapter_title_map)
-            
-        return SegmentationOutput(
-            metadata={"source_pdf": pdf_path, "total_pages": len(doc)},
-            chapters=chapters,
-            segments=all_segments,
-            edges=edges
-        )
+        return all_segments
+
+    def _extract_pages_parallel(self, doc: fitz.Document, pdf_path: str, book_id: str, doc_uri: str,
+                                start_page: int, end_page: int, use_batch: bool) -> List[SegmentBase]:
+        """
+        Map/reduce variant of _extract_pages with the same output.
+
+        Map: contiguous page shards run in worker processes (_extract_page_shard),
+        each with its own fitz handle: block extraction, furniture filtering,
+        formula scanning and text block extraction, all without LLM calls.
+        TextBlockExtractor carries its section state (problem set / CFA /
+        concept check numbering) from page to page, so a shard is first run from
+        a guessed entry state. Shards whose guess differs from the previous
+        shard's exit state are re-run from it, all at once, until every entry
+        state matches; headings reset that state, so this rarely takes more
+        than two rounds.
+
+        Reduce (this process, page order): LLM formula enrichment (batched, or
+        per page from the workers' blocks) and worked-example structuring, so
+        LLM calls keep sharing this process's caches and rate limits.
+        """
+        total_pages = end_page - start_page
+        per_shard = self.pages_per_shard or max(1, -(-total_pages // (self.page_workers * 4)))
+        bounds = [(s, min(s + per_shard, end_page)) for s in range(start_page, end_page, per_shard)]
+        llm_on = self.llm_mode != "off"
+        formula_mode = "scan" if use_batch else (None if llm_on else "page")
+        text_extractor = self.text_block_extractor
+        base_task = {
+            "book_id": book_id,
+            "doc_uri": doc_uri,
+            "formulas": formula_mode,
+            "use_lexicon": self.use_variable_lexicon,
+            "reference_stub_types": text_extractor.reference_stub_types,
+            "allowlist": text_extractor.allowlist,
+        }
+        guesses = [text_extractor.get_state()] * len(bounds)
+        results: List[Dict[str, Any]] = [{} for _ in bounds]
+        pending = list(range(len(bounds)))
+        rounds = 0
+        print(f"Extracting {total_pages} pages in {len(bounds)} shards with {self.page_workers} workers...")
+        # spawn: this process already runs LLM executor and sqlite threads, which fork would copy mid-state
+        with ProcessPoolExecutor(
+            max_workers=min(self.page_workers, len(bounds)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_page_worker,
+            initargs=(pdf_path, self.furniture_detector),
+        ) as pool:
+            while pending:
+                rounds += 1
+                futures = {
+                    pool.submit(_extract_page_shard, {**base_task, "start": bounds[k][0], "end": bounds[k][1],
+                                                      "entry_state": guesses[k]}): k
+                    for k in pending
+                }
+                for future in as_completed(futures):
+                    k = futures[future]
+                    results[k] = future.result()
+                    print(f"  Extracted pages {bounds[k][0] + 1}-{bounds[k][1]} (round {rounds})")
+                pending = []
+                for k in range(1, len(bounds)):
+                    if results[k]["entry_state"] != results[k - 1]["exit_state"]:
+                        guesses[k] = results[k - 1]["exit_state"]
+                        pending.append(k)
+        text_extractor.set_state(results[-1]["exit_state"])
+        print(f"  Page extraction finished in {rounds} round(s)")
+
+        pages = [page for result in results for page in result["pages"]]
+        all_segments: List[SegmentBase] = []
+        if use_batch:
+            print(f"Using batched variable extraction (batch_size={self.batch_size})...")
+            all_segments.extend(self.formula_extractor.process_blocks_batch(
+                {}, doc, start_page, end_page, book_id, doc_uri=doc_uri, batch_size=self.batch_size,
+                scanned=[f for page in pages for f in page["formulas"]],
+            ))
+        for page in pages:
+            if formula_mode == "page":
+                all_segments.extend(page["formulas"])
+            elif formula_mode is None:
+                all_segments.extend(self.formula_extractor.process_page(
+                    doc[page["page_num"] - 1], page["page_num"], book_id, blocks=page["blocks"], doc_uri=doc_uri
+                ))
+            all_segments.extend(page["text"])
+
+        if llm_on and text_extractor.llm_service:
+            examples = [s for page in pages for s in page["text"] if isinstance(s, WorkedExampleSegment)]
+            for seg, future in run_pipelined(
+                lambda seg: text_extractor.llm_service.structure_worked_example(seg.text_content), examples
+            ):
+                text_extractor.apply_example_structure(seg, future.result())
+        return all_segments
 
     def _llm_disambiguate_segments(self, segments: List[SegmentBase]) -> List[SegmentBase]:
         """
@@ -0,0 +1,120 @@
+"""
+Benchmark ConceptLinker.link_concepts against a large synthetic taxonomy.
+
+Builds a taxonomy of --concepts rows (one- to three-word names, acronym forms
+like "Treasury Bills (TB)", tags) and segments whose caption/summary/OCR/nearby
+text mention a few concepts with OCR-style typos, checks that the indexed path
+returns the same links (ids, order, methods, confidences to 1e-9) as scoring
+every concept with _score_concept_match, and times both.
+
+Usage:
+    python benchmark_concept_linker.py [--concepts 3000] [--segments 10] [--repeat 1]
+"""
+
+import argparse
+import contextlib
+import io
+import math
+import random
+import time
+from typing import List
+
+import pandas as pd
+
+from pdf_image_segmentation import BoundingBox, ConceptLinker, OCRResult, VisualSegment, VisualType
+
+
+def synthetic_taxonomy(rng: random.Random, concepts: int, vocab: List[str]) -> pd.DataFrame:
+    common = vocab[:20]  # shared words make some single-word concepts "generic"
+    rows = []
+    for i in range(concepts):
+        words = [rng.choice(common if rng.random() < 0.3 else vocab) for _ in range(rng.choice([1, 1, 2, 2, 3]))]
+        name = " ".join(w.capitalize() for w in words)
+        acronym = "".join(w[0] for w in words).upper() + rng.choice("XYZ")
+        r = rng.random()
+        if r < 0.10:
+            name = f"{name} ({acronym})"
+        elif r < 0.15:
+            name = f"{acronym} ({name})"
+        rows.append({
+            "Level": rng.randint(1, 6),
+            "Concept": name,
+            "Tag(s)": ", ".join(rng.choice(vocab) for _ in range(rng.randint(0, 3))),
+            "Rationale": "",
+            "Page(s)": str(i // 10 + 1),
+        })
+    return pd.DataFrame(rows)
+
+
+def synthetic_segment(rng: random.Random, taxonomy: pd.DataFrame, vocab: List[str], n: int) -> VisualSegment:
+    def typo(word: str) -> str:
+        if len(word) > 4 and rng.random() < 0.3:
+            j = rng.randrange(len(word))
+            return word[:j] + rng.choice("xyz") + word[j + 1:]
+        return word
+
+    names = list(taxonomy["Concept"].sample(3, random_state=rng.randrange(1 << 30)))
+    summary = " ".join(typo(w) for w in " ".join(names + rng.sample(vocab, 10)).lower().split())
+    return VisualSegment(
+        segment_id=f"bench_{n}",
+        segment_type=VisualType.CHART,
+        book_id="bench",
+        page_no=n,
+        bbox=BoundingBox(0, 0, 100, 100, 612, 792),
+        caption_text=rng.choice(names) if rng.random() < 0.5 else None,
+        ocr_result=OCRResult(raw_text=" ".join(rng.sample(vocab, 15))),
+        summary=summary,
+        nearby_text=" ".join(rng.sample(vocab, 30)),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concepts", type=int, default=3000)
+    parser.add_argument("--segments", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocab = ["".join(rng.choice("abcdefghiklmnoprstuw") for _ in range(rng.randint(4, 10))) for _ in range(1500)]
+    taxonomy = synthetic_taxonomy(rng, args.concepts, vocab)
+    segments = [synthetic_segment(rng, taxonomy, vocab, n) for n in range(args.segments)]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        linker = ConceptLinker(taxonomy)
+        build_s = time.perf_counter() - start
+
+    def run(exhaustive: bool):
+        best, links = float("inf"), None
+        for _ in range(args.repeat):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                links = [linker.link_concepts(s, exhaustive=exhaustive) for s in segments]
+                best = min(best, time.perf_counter() - start)
+        return links, best / len(segments) * 1000
+
+    expected, exhaustive_ms = run(True)
+    actual, indexed_ms = run(False)
+
+    mismatches = 0
+    for want, got in zip(expected, actual):
+        same = [m["concept_id"] for m in want] == [m["concept_id"] for m in got] and all(
+            w["match_method"] == g["match_method"] and math.isclose(w["confidence"], g["confidence"], rel_tol=1e-9)
+            for w, g in zip(want, got)
+        )
+        mismatches += not same
+    print(f"Parity: {args.segments - mismatches}/{args.segments} segments identical "
+          f"({sum(len(m) for m in expected)} links)")
+
+    print(f"Concepts: {len(linker.concept_map)} (index built in {build_s:.2f} s), best of {args.repeat}")
+    print(f"  exhaustive:   {exhaustive_ms:8.2f} ms/segment")
+    print(f"  indexed:      {indexed_ms:8.2f} ms/segment")
+    print(f"  speedup:      {exhaustive_ms / indexed_ms:8.1f}x")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Shared image-analysis context for the OCRProcessor heuristics.
+
+The arrow, grid, colour, data-point, shape and chart-subtype detectors all
+used to convert the same crop to grayscale, run Canny and Hough on it, and so
+on, each on its own. `ImageFeatures` derives those views once per visual
+(lazily, so a detector that is never called costs nothing) and every detector
+reads from it.
+
+Fast mode: with `max_side` set, the working copy is downscaled so its longest
+side is at most `max_side` pixels before anything is derived. Detectors scale
+their pixel-size parameters (kernel lengths, Hough line lengths/gaps/votes,
+pixel count thresholds, blob areas) with `scale`, so they answer the same questions
+at a fraction of the CPU time. OCRProcessor.analysis_max_side (env
+SYNAPTA_ANALYSIS_MAX_SIDE) turns it on; None keeps full resolution.
+
+Besides PIL images, the context takes uint8 arrays (gray, RGB or RGBA), e.g.
+the zero-copy pixmap views from pixmap_arrays; an RGB array is used as is.
+"""
+
+from functools import cached_property
+from typing import Any, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Canny thresholds shared by every detector
+CANNY_LOW = 50
+CANNY_HIGH = 150
+
+
+class ImageFeatures:
+    """Downscaled RGB/gray/HSV views, Canny edges, Hough lines and contours of one visual"""
+
+    def __init__(self, image: Union[Image.Image, np.ndarray], max_side: Optional[int] = None):
+        rgb = self._as_rgb(image)
+        self.original_size: Tuple[int, int] = (rgb.shape[1], rgb.shape[0])
+        self.scale = 1.0
+        if max_side and max(self.original_size) > max_side:
+            self.scale = max_side / max(self.original_size)
+            size = (max(1, round(rgb.shape[1] * self.scale)), max(1, round(rgb.shape[0] * self.scale)))
+            rgb = cv2.resize(rgb, size, interpolation=cv2.INTER_AREA)
+        self.rgb = rgb
+
+    @staticmethod
+    def _as_rgb(image: Union[Image.Image, np.ndarray]) -> np.ndarray:
+        if not isinstance(image, np.ndarray):
+            return np.asarray(image.convert('RGB'))
+        if image.ndim == 2 or image.shape[2] == 1:
+            return cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
+        return image
+
+    @classmethod
+    def of(cls, image: Union[Image.Image, np.ndarray, "ImageFeatures"],
+           max_side: Optional[int] = None) -> "ImageFeatures":
+        """Reuse an existing context, or build one for a PIL image or array"""
+        return image if isinstance(image, cls) else cls(image, max_side)
+
+    @property
+    def width(self) -> int:
+        return self.rgb.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.rgb.shape[0]
+
+    def px(self, length: float) -> int:
+        """A length in original-image pixels, in working-image pixels"""
+        return max(1, int(round(length * self.scale)))
+
+    @cached_property
+    def gray(self) -> np.ndarray:
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+
+    @cached_property
+    def hsv(self) -> np.ndarray:
+        return cv2.cvtColor(self.rgb, cv2.COLOR_RGB2HSV)
+
+    @cached_property
+    def edges(self) -> np.ndarray:
+        return cv2.Canny(self.gray, CANNY_LOW, CANNY_HIGH)
+
+    @cached_property
+    def lines(self) -> Optional[np.ndarray]:
+        """Probabilistic Hough segments (50 votes, 30 px min length, 10 px gap at full resolution)"""
+        return cv2.HoughLinesP(self.edges, 1, np.pi/180, threshold=self.px(50),
+                               minLineLength=self.px(30), maxLineGap=self.px(10))
+
+    @cached_property
+    def contours(self) -> Any:
+        """Contour tree of the edge map"""
+        contours, _ = cv2.findContours(self.edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
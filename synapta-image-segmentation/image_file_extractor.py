@@ -1,44 +1,106 @@
 """
 Analyze a single image file using the Synapta visual pipeline (OCR + Mistral Vision).
 Returns a JSON-serializable dict similar to VisualSegment.to_dict().
+Use ocr_image_files() to OCR many files in batches up front and hand each
+result to analyze_image_file(); cluster_image_files() groups repeated crops so
+OCR/vision can run once per cluster.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
-import os
 from PIL import Image
 
 from pdf_image_segmentation import (
     OCRResult,
+    OCRProcessor,
     VisualSegment,
     VisualType,
     BoundingBox,
     MistralVisionAPI,
 )
+from ocr_worker_pool import get_ocr_pool
+from visual_dedup import PerceptualIndex
 
 
-_OCR = None
+_VISION: Optional[MistralVisionAPI] = None
 
 
-def _get_ocr() -> Any:
-    global _OCR
-    if _OCR is None:
-        # Ensure Paddle/PaddleX cache is writable
-        base = Path(__file__).resolve().parents[1] / "outputs" / "paddle_cache"
-        base.mkdir(parents=True, exist_ok=True)
-        os.environ["PADDLE_HOME"] = str(base)
-        os.environ["PADDLEX_HOME"] = str(base)
-        os.environ["PADDLEOCR_HOME"] = str(base)
-        os.environ["XDG_CACHE_HOME"] = str(base)
-        os.environ["HOME"] = str(base)
-        os.environ["PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK"] = "True"
+def _get_vision() -> MistralVisionAPI:
+    global _VISION
+    if _VISION is None:
+        _VISION = MistralVisionAPI()
+    return _VISION
+
+
+def vision_stats() -> Dict[str, int]:
+    """Request/cache/retry counters of the shared vision client"""
+    return dict(_VISION.client.stats) if _VISION is not None else {}
+
+
+def cluster_image_files(image_paths: List[str], max_distance: int = 4) -> Tuple[List[Optional[int]], Dict[str, Any]]:
+    """Perceptual-hash cluster id per path (None when unreadable) plus the dedup report."""
+    index = PerceptualIndex(max_distance=max_distance)
+    clusters: List[Optional[int]] = []
+    for image_path in image_paths:
         try:
-            from paddleocr import PaddleOCR
-            _OCR = PaddleOCR(use_angle_cls=True, lang="en")
+            with Image.open(image_path) as image:
+                clusters.append(index.assign(image)[0])
         except Exception:
-            _OCR = None
-    return _OCR
+            clusters.append(None)
+    return clusters, index.report()
+
+
+def analyze_visual(image_path: str, ocr_result: Optional[OCRResult] = None) -> Dict[str, Any]:
+    """Vision analysis of one image file (classification, metadata, summary)."""
+    image = Image.open(image_path).convert("RGB")
+    return _get_vision().analyze_visual_comprehensive(image, ocr_result or OCRResult(raw_text=""))
+
+
+def ocr_image_files(
+    image_paths: List[str],
+    batch_size: int = OCRProcessor.DEFAULT_BATCH_SIZE,
+) -> List[OCRResult]:
+    """Batched PaddleOCR over image files on the shared worker pool; one OCRResult per path (empty when unreadable).
+
+    Files are decoded `batch_size` at a time and each slice is submitted as
+    soon as it is read, so at most the pool's in-flight batches are held in
+    memory rather than every crop of the book.
+    """
+    results = [OCRResult(raw_text="", blocks=[], confidence=0.0) for _ in image_paths]
+    try:
+        pool = get_ocr_pool()
+    except Exception as e:
+        print(f"OCR failed: {e}")
+        return results
+    size = max(1, batch_size)
+    pending: List[Tuple[List[int], Any]] = []
+    for start in range(0, len(image_paths), size):
+        readable: List[int] = []
+        images: List[Image.Image] = []
+        for i in range(start, min(start + size, len(image_paths))):
+            try:
+                with Image.open(image_paths[i]) as image:
+                    images.append(image.convert("RGB"))
+                readable.append(i)
+            except Exception:
+                pass
+        if not images:
+            continue
+        try:
+            # Blocks while the pool already has max_pending batches in flight
+            pending.append((readable, pool.submit(images, batch_size)))
+        except Exception as e:
+            print(f"OCR failed: {e}")
+        del images
+
+    for readable, future in pending:
+        try:
+            for i, ocr_result in zip(readable, future.result()):
+                results[i] = ocr_result
+        except Exception as e:
+            print(f"OCR failed: {e}")
+    return results
 
 
 def analyze_image_file(
@@ -47,7 +109,15 @@ def analyze_image_file(
     page_no: int = 1,
     heading_path: Optional[str] = None,
     book_id: str = "book",
+    ocr_result: Optional[OCRResult] = None,
+    analysis: Optional[Dict[str, Any]] = None,
 ) -> Optional[Dict[str, Any]]:
+    """Analyze one image.
+
+    Pass `ocr_result` (from ocr_image_files) to skip the OCR step and
+    `analysis` (from analyze_visual, e.g. of a duplicate crop) to skip the
+    vision call; the segment still gets this image's own anchors.
+    """
     img_path = Path(image_path)
     if not img_path.exists():
         return None
@@ -55,20 +125,12 @@ def analyze_image_file(
     image = Image.open(img_path).convert("RGB")
 
     # OCR
-    ocr_engine = _get_ocr()
-    if ocr_engine:
-        try:
-            ocr_raw = ocr_engine.ocr(str(img_path), cls=True)
-            ocr_text, ocr_blocks = _flatten_ocr(ocr_raw)
-            ocr_result = OCRResult(raw_text=ocr_text, blocks=ocr_blocks, confidence=_avg_conf(ocr_blocks))
-        except Exception:
-            ocr_result = OCRResult(raw_text="", blocks=[], confidence=0.0)
-    else:
-        ocr_result = OCRResult(raw_text="", blocks=[], confidence=0.0)
+    if ocr_result is None:
+        ocr_result = OCRProcessor.process_image(image)
 
     # Vision analysis
-    vision = MistralVisionAPI()
-    analysis = vision.analyze_visual_comprehensive(image, ocr_result)
+    if analysis is None:
+        analysis = _get_vision().analyze_visual_comprehensive(image, ocr_result)
 
     # Build VisualSegment
     bbox = BoundingBox(0, 0, image.width, image.height, image.width, image.height)
@@ -97,29 +159,6 @@ def analyze_image_file(
     return segment.to_dict()
 
 
-def _flatten_ocr(ocr_raw) -> tuple[str, list]:
-    text_lines = []
-    blocks = []
-    if not ocr_raw:
-        return "", []
-    for item in ocr_raw:
-        if not item:
-            continue
-        for box, (txt, conf) in item:
-            text_lines.append(txt)
-            blocks.append({
-                "text": txt,
-                "confidence": float(conf) if conf is not None else 0.0,
-            })
-    return "\n".join(text_lines), blocks
-
-
-def _avg_conf(blocks) -> float:
-    if not blocks:
-        return 0.0
-    return sum(b.get("confidence", 0.0) for b in blocks) / max(len(blocks), 1)
-
-
 def _apply_metadata(segment: VisualSegment, meta: Dict[str, Any]) -> None:
     # pdf_image_segmentation expects type-specific data objects; we keep raw meta on to_dict output.
     # Use the metadata as-is by setting extracted_text_structured to keep info without deep parsing.
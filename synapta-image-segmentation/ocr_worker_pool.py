@@ -0,0 +1,173 @@
+"""
+Process pool of warm PaddleOCR workers.
+
+PaddleOCR holds its model in a class-level global, so a single process can
+only use one model instance. The pool starts N worker processes, each loading
+the model once, and sizes their intra-op thread pools (OMP/MKL/OpenBLAS,
+OpenCV, PaddleOCR `cpu_threads`) so that workers x threads matches the
+available cores instead of every process grabbing all of them.
+
+Batches are dispatched with back-pressure: at most `max_pending` batches are
+in flight, and submitting more blocks until one finishes.
+
+    pool = get_ocr_pool()
+    results = pool.process_images(images)   # one OCRResult per image, in order
+
+Configure the shared pool with SYNAPTA_OCR_WORKERS / SYNAPTA_OCR_THREADS.
+With a single worker OCR runs in-process.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+import atexit
+import multiprocessing
+import os
+import threading
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from pdf_image_segmentation import OCRProcessor, OCRResult
+
+# Intra-op threads per worker when neither workers nor threads are given
+DEFAULT_THREADS_PER_WORKER = 4
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def thread_budget(workers: Optional[int] = None, threads_per_worker: Optional[int] = None) -> Tuple[int, int]:
+    """(workers, threads_per_worker) with workers x threads ~= available cores"""
+    cores = available_cores()
+    if workers is None and threads_per_worker is None:
+        threads_per_worker = min(DEFAULT_THREADS_PER_WORKER, cores)
+    if workers is None:
+        workers = max(1, cores // threads_per_worker)
+    if threads_per_worker is None:
+        threads_per_worker = max(1, cores // workers)
+    return max(1, workers), max(1, threads_per_worker)
+
+
+def _limit_threads(threads: int) -> None:
+    """Cap this process's native thread pools; must run before the model loads"""
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+    except Exception:
+        pass
+    OCRProcessor.cpu_threads = threads
+
+
+def _init_worker(threads: int) -> None:
+    _limit_threads(threads)
+    try:
+        OCRProcessor.get_paddle_ocr()
+    except Exception as e:
+        # process_images() reports the failure per batch
+        print(f"OCR worker {os.getpid()}: model load failed: {e}")
+
+
+def _ocr_batch(images: List[np.ndarray], batch_size: int) -> List[OCRResult]:
+    return OCRProcessor.process_images(images, batch_size=batch_size)
+
+
+class OCRWorkerPool:
+    """Warm PaddleOCR worker processes with a bounded in-flight batch queue"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        threads_per_worker: Optional[int] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.workers, self.threads_per_worker = thread_budget(workers, threads_per_worker)
+        self.max_pending = max_pending or 2 * self.workers
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if self.workers > 1:
+            # spawn: the vision client's event-loop and HTTP threads are already running, which fork would copy mid-state
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.threads_per_worker,),
+            )
+        elif OCRProcessor._paddle_ocr is None:
+            # In-process: the model is not loaded yet, so its thread count can still be set
+            OCRProcessor.cpu_threads = self.threads_per_worker
+
+    def submit(self, images: List[Any], batch_size: int = OCRProcessor.DEFAULT_BATCH_SIZE) -> "Future[List[OCRResult]]":
+        """Queue one batch; blocks while `max_pending` batches are already in flight"""
+        if self._executor is None:
+            future: Future = Future()
+            try:
+                future.set_result(OCRProcessor.process_images(images, batch_size=batch_size))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._slots.acquire()
+        try:
+            future = self._executor.submit(_ocr_batch, [np.asarray(img) for img in images], batch_size)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def process_images(self, images: List[Any], batch_size: int = OCRProcessor.DEFAULT_BATCH_SIZE) -> List[OCRResult]:
+        """OCR many images across the workers; one OCRResult per image, in input order"""
+        results = [OCRResult(raw_text="", confidence=0.0) for _ in images]
+        if not images:
+            return results
+        if self._executor is None:
+            return OCRProcessor.process_images(images, batch_size=batch_size)
+
+        shapes = [(img.height, img.width) if isinstance(img, Image.Image) else np.asarray(img).shape[:2] for img in images]
+        pending = []
+        for batch in OCRProcessor.size_bucketed_batches(shapes, max(1, batch_size)):
+            pending.append((batch, self.submit([images[i] for i in batch], batch_size)))
+        for batch, future in pending:
+            try:
+                for i, ocr_result in zip(batch, future.result()):
+                    results[i] = ocr_result
+            except Exception as e:
+                print(f"OCR worker batch failed: {e}")
+        return results
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_shared_pool: Optional[OCRWorkerPool] = None
+_shared_lock = threading.Lock()
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def get_ocr_pool() -> OCRWorkerPool:
+    """Process-wide pool shared by the image enricher and VisualSegmentationPipeline"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = OCRWorkerPool(
+                workers=_env_int("SYNAPTA_OCR_WORKERS"),
+                threads_per_worker=_env_int("SYNAPTA_OCR_THREADS"),
+            )
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
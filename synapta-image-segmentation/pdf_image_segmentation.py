@@ -6,7 +6,7 @@ Uses Mistral's vision models for classification and summary generation
 import json
 import hashlib
 import re
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, fields, asdict
 from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 from enum import Enum
@@ -22,9 +22,16 @@ from collections import defaultdict
 import pandas as pd
 import numpy as np
 import cv2
-import requests
 import base64
 
+from vision_client import DEFAULT_BASE_URL, get_vision_client, image_digest
+from visual_dedup import PerceptualIndex
+from segment_journal import SegmentJournal
+from image_features import ImageFeatures
+from spatial_index import RectGrid, cluster_rects, rect_distance
+from visual_screen import VisualScreen
+from pixmap_arrays import attach_png, attached_png, pixmap_array, pixmap_image
+
 try:
     from sklearn.cluster import KMeans, DBSCAN
 except ImportError:
@@ -148,6 +155,12 @@ class MermaidRepresentation:
     extraction_notes: str = ""
 
 
+def _dataclass_from_dict(cls, data: Dict[str, Any]):
+    """Instance of dataclass `cls` from the keys of `data` that are its fields"""
+    names = {f.name for f in fields(cls)}
+    return cls(**{k: v for k, v in data.items() if k in names})
+
+
 @dataclass
 class VisualSegment:
     """Complete visual segment with all metadata"""
@@ -224,6 +237,34 @@ class VisualSegment:
         else:
             return obj
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "VisualSegment":
+        """Rebuild a segment from its to_dict() record (e.g. one replayed from the journal)"""
+        nested = {
+            'ocr_result': OCRResult,
+            'mermaid_repr': MermaidRepresentation,
+            'chart_data': ChartSpecificData,
+            'diagram_data': DiagramSpecificData,
+            'image_data': ImageSpecificData,
+            'figure_data': FigureSpecificData,
+        }
+        kwargs = {}
+        for f in fields(cls):
+            if f.name not in data:
+                continue
+            value = data[f.name]
+            if f.name in nested and isinstance(value, dict):
+                value = _dataclass_from_dict(nested[f.name], value)
+            kwargs[f.name] = value
+        try:
+            kwargs['segment_type'] = VisualType(data.get('segment_type'))
+        except ValueError:
+            kwargs['segment_type'] = VisualType.UNKNOWN
+        bbox = data.get('bbox')
+        # to_dict() adds width/height to the bbox; only the constructor fields are kept
+        kwargs['bbox'] = _dataclass_from_dict(BoundingBox, bbox) if isinstance(bbox, dict) else None
+        return cls(**kwargs)
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to JSON-serializable dict with type-specific data"""
         result = asdict(self)
@@ -300,15 +341,38 @@ class MistralVisionAPI:
     
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv('MISTRAL_API_KEY') or "aE9nzpmp8]WHHguJMTurCrDrICTfodaP"
-        self.base_url = "https://api.mistral.ai/v1/chat/completions"
+        self.base_url = os.getenv('MISTRAL_BASE_URL') or DEFAULT_BASE_URL
         # Pixtral is Mistral's vision model
         self.vision_model = "pixtral-12b-2409"
+        # Shared per process: concurrency/rate limits, retries and the response cache
+        self.client = get_vision_client(self.api_key, self.base_url, self.vision_model)
     
     def _encode_image(self, image: Image.Image) -> str:
-        """Encode PIL Image to base64"""
-        buffered = io.BytesIO()
-        image.save(buffered, format="PNG")
-        return base64.b64encode(buffered.getvalue()).decode()
+        """Encode PIL Image to base64 (reusing the PNG it was saved as, if any)"""
+        png = attached_png(image)
+        if png is None:
+            buffered = io.BytesIO()
+            image.save(buffered, format="PNG")
+            png = buffered.getvalue()
+        return base64.b64encode(png).decode()
+
+    @staticmethod
+    def _strip_json_fences(content: str) -> str:
+        """Remove markdown code fences around a JSON response"""
+        json_match = re.search(r'```json\s*(\{.*?\})\s*```', content, re.DOTALL)
+        if json_match:
+            return json_match.group(1)
+        if '```' in content:
+            return re.sub(r'```\w*\s*', '', content).replace('```', '').strip()
+        return content
+
+    @staticmethod
+    def _is_json_response(content: str) -> bool:
+        try:
+            json.loads(MistralVisionAPI._strip_json_fences(content))
+            return True
+        except ValueError:
+            return False
 
     def analyze_visual_comprehensive(self, image: Image.Image, ocr_result: OCRResult) -> Dict[str, Any]:
         """
@@ -326,8 +390,6 @@ class MistralVisionAPI:
             return self._fallback_analysis(ocr_result)
         
         try:
-            img_base64 = self._encode_image(image)
-            
             # Build OCR context
             ocr_context = ""
             if ocr_result and ocr_result.raw_text:
@@ -612,44 +674,22 @@ Example 5 - Plain screenshot with no special content:
 }}
 """
             
-            response = requests.post(
-                self.base_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.vision_model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": prompt},
-                                {
-                                    "type": "image_url",
-                                    "image_url": f"data:image/png;base64,{img_base64}"
-                                }
-                            ]
-                        }
-                    ],
-                    "max_tokens": 1500,
-                    "temperature": 0.2
-                },
-                timeout=45
+            content = self.client.complete(
+                prompt,
+                lambda: self._encode_image(image),
+                task="comprehensive",
+                image_hash=image_digest(image),
+                cache_if=self._is_json_response,
+                max_tokens=1500,
+                temperature=0.2,
+                timeout=45,
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content'].strip()
-                
+            if content is not None:
                 # Parse JSON response
                 try:
                     # Remove markdown code blocks if present
-                    json_match = re.search(r'```json\s*(\{.*?\})\s*```', content, re.DOTALL)
-                    if json_match:
-                        content = json_match.group(1)
-                    elif '```' in content:
-                        content = re.sub(r'```\w*\s*', '', content).replace('```', '').strip()
+                    content = self._strip_json_fences(content)
                     
                     data = json.loads(content)
                     
@@ -688,9 +728,6 @@ Example 5 - Plain screenshot with no special content:
                 except json.JSONDecodeError as e:
                     print(f"    Failed to parse Mistral response: {e}")
                     print(f"    Response content: {content[:300]}")
-                    
-            else:
-                print(f"    Mistral API error: {response.status_code}")
                 
         except Exception as e:
             print(f"    Mistral comprehensive analysis failed: {e}")
@@ -817,8 +854,6 @@ Example 5 - Plain screenshot with no special content:
             return None
         
         try:
-            img_base64 = self._encode_image(image)
-            
             ocr_context = ""
             if segment.ocr_result and segment.ocr_result.raw_text:
                 ocr_context = f"\n\n**Text detected in diagram:**\n{segment.ocr_result.raw_text[:500]}"
@@ -850,36 +885,18 @@ flowchart TD
 **Response format:**
 Provide ONLY the Mermaid code block, no additional explanation."""
 
-            response = requests.post(
-                self.base_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": self.vision_model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": prompt},
-                                {
-                                    "type": "image_url",
-                                    "image_url": f"data:image/png;base64,{img_base64}"
-                                }
-                            ]
-                        }
-                    ],
-                    "max_tokens": 800,
-                    "temperature": 0.2
-                },
-                timeout=30
+            content = self.client.complete(
+                prompt,
+                lambda: self._encode_image(image),
+                task="mermaid",
+                image_hash=image_digest(image),
+                cache_extra=segment.segment_type.value,
+                max_tokens=800,
+                temperature=0.2,
+                timeout=30,
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content'].strip()
-                
+            if content is not None:
                 # Extract Mermaid code from response
                 mermaid_match = re.search(r'```mermaid\s*(.*?)\s*```', content, re.DOTALL)
                 if mermaid_match:
@@ -920,8 +937,6 @@ Provide ONLY the Mermaid code block, no additional explanation."""
             }
         
         try:
-            img_base64 = self._encode_image(image)
-            
             # Build context
             ocr_context = ""
             if ocr_result and ocr_result.raw_text:
@@ -983,38 +998,18 @@ Provide ONLY the Mermaid code block, no additional explanation."""
 }}
 """
             
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": prompt},
-                        {
-                            "type": "image_url",
-                            "image_url": f"data:image/png;base64,{img_base64}"
-                        }
-                    ]
-                }
-            ]
-            
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers={
-                    "Content-Type": "application/json",
-                    "Authorization": f"Bearer {self.api_key}"
-                },
-                json={
-                    "model": self.vision_model,
-                    "messages": messages,
-                    "temperature": 0.1,
-                    "max_tokens": 2000
-                },
-                timeout=30
+            content = self.client.complete(
+                prompt,
+                lambda: self._encode_image(image),
+                task="calculations",
+                image_hash=image_digest(image),
+                cache_extra=nearby_text or "",
+                max_tokens=2000,
+                temperature=0.1,
+                timeout=30,
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                
+            if content is not None:
                 # Parse JSON response
                 json_match = re.search(r'\{.*\}', content, re.DOTALL)
                 if json_match:
@@ -1084,6 +1079,12 @@ class OCRProcessor:
     
     # Initialize PaddleOCR once (class-level)
     _paddle_ocr = None
+    # Intra-op CPU threads for the model; set by the OCR worker pool before the
+    # model is loaded (None keeps PaddleOCR's default)
+    cpu_threads: Optional[int] = None
+    # Longest side of the working copy the image heuristics run on (fast mode,
+    # see image_features); None analyses at full resolution
+    analysis_max_side: Optional[int] = int(os.environ.get("SYNAPTA_ANALYSIS_MAX_SIDE") or 0) or None
     
     @classmethod
     def get_paddle_ocr(cls):
@@ -1099,101 +1100,154 @@ class OCRProcessor:
             os.environ["HOME"] = str(base)
             os.environ["PADDLE_PDX_DISABLE_MODEL_SOURCE_CHECK"] = "True"
             from paddleocr import PaddleOCR
+            extra = {'cpu_threads': cls.cpu_threads} if cls.cpu_threads else {}
             cls._paddle_ocr = PaddleOCR(
                 use_textline_orientation=True, 
-                lang='en'            # Language: 'en' for English, 'ch' for Chinese
+                lang='en',           # Language: 'en' for English, 'ch' for Chinese
+                **extra
             )
         return cls._paddle_ocr
 
+    # Images whose sides fall in the same power-of-two band share a batch, so the
+    # detector pads each batch to a similar size instead of to the largest crop
+    DEFAULT_BATCH_SIZE = 8
+
     @staticmethod
-    def process_image(image: Image.Image) -> OCRResult:
+    def process_image(image: Any) -> OCRResult:
         """Run OCR and extract structured information using PaddleOCR 3.3.2"""
-        
+        return OCRProcessor.process_images([image], batch_size=1)[0]
+
+    @staticmethod
+    def process_images(images: List[Any], batch_size: int = DEFAULT_BATCH_SIZE) -> List[OCRResult]:
+        """Batched OCR over many crops (PIL images or numpy arrays).
+
+        Images are bucketed by size, each bucket is sent to PaddleOCR's
+        `predict()` `batch_size` images at a time, and one OCRResult is returned
+        per input image, in input order. A batch that fails is retried image by
+        image so one bad crop only empties its own result.
+        """
+        results: List[OCRResult] = [OCRResult(raw_text="", confidence=0.0) for _ in images]
+        if not images:
+            return results
+
         try:
-            # Get PaddleOCR instance
             ocr = OCRProcessor.get_paddle_ocr()
-            
-            # Convert PIL Image to numpy array
-            img_array = np.array(image)
-
-            # Validate image
-            if img_array is None or img_array.size == 0:
-                raise ValueError("Invalid or empty image")
-            
-            # Ensure image has correct dimensions
-            if len(img_array.shape) == 2:
-                # Grayscale to BGR
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
-            elif len(img_array.shape) == 3 and img_array.shape[2] == 1:
-                # Single channel to BGR
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
-            elif len(img_array.shape) == 3 and img_array.shape[2] == 4:
-                # RGBA to BGR
-                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
-            
-            # Run PaddleOCR using predict() method
-            # Returns a generator of Result objects
-            result_generator = ocr.predict(img_array)
-            
-            # Parse PaddleOCR 3.3.2 output
-            blocks = []
-            raw_text_parts = []
-            confidences = []
-            
-            # Iterate through results (generator yields Result objects)
-            for result_obj in result_generator:
-                # Access the json attribute to get the actual data
-                result_data = result_obj.json.get('res')
-                
-                # Extract dt_polys (detection polygons) and rec_texts (recognized texts)
-                dt_polys = result_data.get('dt_polys', [])
-                rec_texts = result_data.get('rec_texts', [])
-                rec_scores = result_data.get('rec_scores', [])
-                
-                # Process each detected text region
-                for i, (bbox_points, text, score) in enumerate(zip(dt_polys, rec_texts, rec_scores)):
-                    # bbox_points is a numpy array with shape (4, 2) - 4 corner points
-                    # Convert to [x0, y0, x1, y1] format
-                    if len(bbox_points) >= 4:
-                        x_coords = [point[0] for point in bbox_points]
-                        y_coords = [point[1] for point in bbox_points]
-                        
-                        bbox = [
-                            min(x_coords),  # x0 (left)
-                            min(y_coords),  # y0 (top)
-                            max(x_coords),  # x1 (right)
-                            max(y_coords)   # y1 (bottom)
-                        ]
-                        
-                        blocks.append({
-                            'text': text,
-                            'bbox': bbox,
-                            'confidence': score * 100  # Convert to percentage (0-100)
-                        })
-                        
-                        raw_text_parts.append(text)
-                        confidences.append(score * 100)
-            
-            # Combine all text with newlines
-            raw_text = '\n'.join(raw_text_parts)
-            
-            # Calculate average confidence
-            avg_confidence = np.mean(confidences) if confidences else 0.0
-            
         except Exception as e:
             print(f"PaddleOCR processing failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return OCRResult(raw_text="", confidence=0.0)
-        
+            return results
+
+        # Arrays (e.g. pixmap views from pixmap_arrays) go to PaddleOCR and the
+        # heuristics as they are, without a round trip through PIL
+        arrays: List[Optional[np.ndarray]] = []
+        for image in images:
+            try:
+                arrays.append(OCRProcessor._to_ocr_array(image))
+            except Exception as e:
+                print(f"PaddleOCR processing failed: {e}")
+                arrays.append(None)
+
+        shapes = [arr.shape[:2] if arr is not None else None for arr in arrays]
+        for batch in OCRProcessor.size_bucketed_batches(shapes, max(1, batch_size)):
+            try:
+                parsed = [OCRProcessor._parse_paddle_result(r) for r in ocr.predict([arrays[i] for i in batch])]
+                if len(parsed) != len(batch):
+                    raise ValueError(f"expected {len(batch)} OCR results, got {len(parsed)}")
+            except Exception:
+                if len(batch) == 1:
+                    print(f"PaddleOCR processing failed for image {batch[0]}")
+                    import traceback
+                    traceback.print_exc()
+                    continue
+                parsed = []
+                for i in batch:
+                    try:
+                        parsed.append(OCRProcessor._parse_paddle_result(next(iter(ocr.predict(arrays[i])))))
+                    except Exception as e:
+                        print(f"PaddleOCR processing failed for image {i}: {e}")
+                        parsed.append(None)
+            for i, blocks in zip(batch, parsed):
+                if blocks is not None:
+                    results[i] = OCRProcessor._build_ocr_result(images[i], blocks)
+
+        return results
+
+    @staticmethod
+    def _to_ocr_array(image: Any) -> np.ndarray:
+        """PIL image or array -> 3-channel numpy array as PaddleOCR expects it"""
+        img_array = np.asarray(image) if isinstance(image, np.ndarray) else np.array(image)
+
+        # Validate image
+        if img_array is None or img_array.size == 0:
+            raise ValueError("Invalid or empty image")
+
+        # Ensure image has correct dimensions
+        if len(img_array.shape) == 2:
+            # Grayscale to BGR
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
+        elif len(img_array.shape) == 3 and img_array.shape[2] == 1:
+            # Single channel to BGR
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_GRAY2BGR)
+        elif len(img_array.shape) == 3 and img_array.shape[2] == 4:
+            # RGBA to BGR
+            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGBA2BGR)
+        return img_array
+
+    @staticmethod
+    def size_bucketed_batches(shapes: List[Optional[Tuple[int, int]]], batch_size: int) -> List[List[int]]:
+        """Group image indices by (height, width) power-of-two band, then chunk each group"""
+        buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for i, shape in enumerate(shapes):
+            if shape is not None:
+                buckets[(int(shape[0]).bit_length(), int(shape[1]).bit_length())].append(i)
+        batches = []
+        for key in sorted(buckets):
+            indices = buckets[key]
+            for start in range(0, len(indices), batch_size):
+                batches.append(indices[start:start + batch_size])
+        return batches
+
+    @staticmethod
+    def _parse_paddle_result(result_obj) -> List[Dict[str, Any]]:
+        """PaddleOCR 3.3.2 Result object -> text blocks with [x0, y0, x1, y1] bboxes"""
+        # Access the json attribute to get the actual data
+        result_data = result_obj.json.get('res')
+
+        # Extract dt_polys (detection polygons) and rec_texts (recognized texts)
+        dt_polys = result_data.get('dt_polys', [])
+        rec_texts = result_data.get('rec_texts', [])
+        rec_scores = result_data.get('rec_scores', [])
+
+        blocks = []
+        for bbox_points, text, score in zip(dt_polys, rec_texts, rec_scores):
+            # bbox_points has shape (4, 2) - 4 corner points
+            if len(bbox_points) >= 4:
+                x_coords = [point[0] for point in bbox_points]
+                y_coords = [point[1] for point in bbox_points]
+                blocks.append({
+                    'text': text,
+                    'bbox': [min(x_coords), min(y_coords), max(x_coords), max(y_coords)],
+                    'confidence': score * 100  # Convert to percentage (0-100)
+                })
+        return blocks
+
+    @staticmethod
+    def _build_ocr_result(image: Any, blocks: List[Dict[str, Any]]) -> OCRResult:
+        """Attach the chart/diagram text heuristics to parsed OCR blocks"""
+        # Combine all text with newlines
+        raw_text = '\n'.join(b['text'] for b in blocks)
+
+        # Calculate average confidence
+        avg_confidence = np.mean([b['confidence'] for b in blocks]) if blocks else 0.0
+
         # Detect chart-specific elements (using existing helper methods)
         axis_labels = OCRProcessor._detect_axis_labels(raw_text, blocks)
         legend_items = OCRProcessor._detect_legend(raw_text)
-        
+
         # Detect diagram elements (using existing helper methods)
         node_texts = OCRProcessor._detect_nodes(blocks)
-        arrow_count = OCRProcessor._count_arrows(image)
-        
+        features = OCRProcessor.image_features(image)
+        arrow_count = OCRProcessor._count_arrows(features)
+
         return OCRResult(
             raw_text=raw_text,
             blocks=blocks,
@@ -1203,7 +1257,16 @@ class OCRProcessor:
             node_texts=node_texts,
             detected_arrows=arrow_count
         )
-    
+
+    @staticmethod
+    def image_features(image: Any) -> ImageFeatures:
+        """
+        Analysis context shared by the image heuristics below (built once per
+        visual). The heuristics take this context; a PIL image or array still
+        works and gets a context of its own.
+        """
+        return ImageFeatures.of(image, max_side=OCRProcessor.analysis_max_side)
+
     @staticmethod
     def extract_structured_text(ocr_result: OCRResult, segment_type: VisualType) -> Dict[str, List[str]]:
         """Extract structured text fields for search and linking"""
@@ -1328,14 +1391,10 @@ class OCRProcessor:
         return nodes
     
     @staticmethod
-    def _count_arrows(image: Image.Image) -> int:
+    def _count_arrows(image: ImageFeatures) -> int:
         """Count arrow-like shapes (simplified detection)"""
-        img_array = np.array(image.convert('L'))
-        edges = cv2.Canny(img_array, 50, 150)
-        
         # Detect lines
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50,
-                               minLineLength=30, maxLineGap=10)
+        lines = OCRProcessor.image_features(image).lines
         
         # Rough estimate: count diagonal lines as potential arrows
         if lines is None:
@@ -1351,11 +1410,11 @@ class OCRProcessor:
         return min(arrow_count // 3, 20)  # Normalize
 
     @staticmethod
-    def _detect_chart_subtype(image: Image.Image, ocr_result: OCRResult) -> Optional[str]:
+    def _detect_chart_subtype(image: ImageFeatures, ocr_result: OCRResult) -> Optional[str]:
         """Multi-signal chart type detection with strict thresholds"""
         text = ocr_result.raw_text.lower() if ocr_result else ""
-        img_array = np.array(image.convert('RGB'))
-        gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
+        features = OCRProcessor.image_features(image)
+        gray = features.gray
         height, width = gray.shape
         
         scores = defaultdict(float)
@@ -1373,15 +1432,15 @@ class OCRProcessor:
             scores['line'] += 3.0
         
         # SIGNAL 2: Visual features
-        edges = cv2.Canny(gray, 50, 150)
+        edges = features.edges
         
         # Detect VERTICAL bars (BAR CHARTS) - check this FIRST
-        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(20, height // 20)))
+        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(features.px(20), height // 20)))
         v_detect = cv2.morphologyEx(edges, cv2.MORPH_OPEN, v_kernel, iterations=2)
         v_pixels = np.sum(v_detect > 0)
         
         # Detect HORIZONTAL continuous lines (LINE CHARTS)
-        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(20, width // 20), 1))
+        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(features.px(20), width // 20), 1))
         h_detect = cv2.morphologyEx(edges, cv2.MORPH_OPEN, h_kernel, iterations=2)
         h_pixels = np.sum(h_detect > 0)
         
@@ -1394,11 +1453,11 @@ class OCRProcessor:
             scores['line'] += 2.5
             
             # Check for continuous lines
-            lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, 
-                                minLineLength=width//4, maxLineGap=20)
+            lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=features.px(50), 
+                                minLineLength=width//4, maxLineGap=features.px(20))
             if lines is not None:
                 horizontal_long_lines = sum(1 for line in lines 
-                                        if abs(line[0][3] - line[0][1]) < 10 
+                                        if abs(line[0][3] - line[0][1]) < features.px(10) 
                                         and abs(line[0][2] - line[0][0]) > width * 0.2)
                 if horizontal_long_lines >= 1:
                     scores['line'] += 1.5
@@ -1426,7 +1485,7 @@ class OCRProcessor:
                 dp=1, 
                 minDist=int(min(width, height) * 0.3),  # Circles must be very far apart
                 param1=50, 
-                param2=50,    # Even higher threshold
+                param2=features.px(50),    # Even higher threshold
                 minRadius=int(min(width, height) * 0.2),  # Large circles only
                 maxRadius=int(min(width, height) * 0.45)
             )
@@ -1554,14 +1613,14 @@ class OCRProcessor:
         return ranges
     
     @staticmethod
-    def _detect_grid(image: Image.Image) -> bool:
+    def _detect_grid(image: ImageFeatures) -> bool:
         """Morphological grid detection"""
-        img_array = np.array(image.convert('L'))
-        edges = cv2.Canny(img_array, 50, 150)
+        features = OCRProcessor.image_features(image)
+        edges = features.edges
         
         # Detect horizontal and vertical lines separately
-        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (25, 1))
-        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 25))
+        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (features.px(25), 1))
+        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, features.px(25)))
         
         h_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, h_kernel, iterations=2)
         v_lines = cv2.morphologyEx(edges, cv2.MORPH_OPEN, v_kernel, iterations=2)
@@ -1571,20 +1630,21 @@ class OCRProcessor:
         v_count = np.sum(v_lines > 0)
         
         # Grid has substantial lines in both directions
-        return h_count > 300 and v_count > 300
+        min_count = 300 * features.scale
+        return h_count > min_count and v_count > min_count
 
     @staticmethod
-    def _extract_dominant_colors(image: Image.Image, n_colors: int = 5) -> List[str]:
+    def _extract_dominant_colors(image: ImageFeatures, n_colors: int = 5) -> List[str]:
         """K-means clustering on non-background pixels"""
-        img = image.convert('RGB')
-        img_array = np.array(img)
-        hsv = cv2.cvtColor(img_array, cv2.COLOR_RGB2HSV)
+        features = OCRProcessor.image_features(image)
+        img_array = features.rgb
+        hsv = features.hsv
         
         # Mask: exclude whites, blacks, grays
         mask = (hsv[:,:,1] > 30) & (hsv[:,:,2] > 40) & (hsv[:,:,2] < 240)
         pixels = img_array[mask].reshape(-1, 3)
         
-        if len(pixels) < 100:
+        if len(pixels) < 100 * features.scale ** 2:
             return []
         
         # Downsample for performance
@@ -1604,27 +1664,27 @@ class OCRProcessor:
             return []
     
     @staticmethod
-    def _estimate_data_points(image: Image.Image) -> int:
+    def _estimate_data_points(image: ImageFeatures) -> int:
         """Type-aware data point counting"""
-        img_array = np.array(image.convert('L'))
-        edges = cv2.Canny(img_array, 50, 150)
+        features = OCRProcessor.image_features(image)
+        area_scale = features.scale ** 2
         
         # Try blob detection for scatter-like patterns
         try:
             params = cv2.SimpleBlobDetector_Params()
             params.filterByArea = True
-            params.minArea = 10
-            params.maxArea = 150
+            params.minArea = 10 * area_scale
+            params.maxArea = 150 * area_scale
             detector = cv2.SimpleBlobDetector_create(params)
-            keypoints = detector.detect(img_array)
+            keypoints = detector.detect(features.gray)
             if len(keypoints) > 5:
                 return len(keypoints)
         except:
             pass
         
         # Fallback: edge density
-        edge_pixels = np.sum(edges > 0)
-        return min(edge_pixels // 150, 500)
+        edge_pixels = np.sum(features.edges > 0)
+        return min(int(edge_pixels // (150 * features.scale)), 500)
 
     @staticmethod
     def _extract_tick_labels(ocr_result: OCRResult) -> Dict[str, List[str]]:
@@ -1703,12 +1763,10 @@ class OCRProcessor:
         return nodes[:50]  # Limit
     
     @staticmethod
-    def _extract_connections(image: Image.Image) -> List[Dict[str, Any]]:
+    def _extract_connections(image: ImageFeatures) -> List[Dict[str, Any]]:
         """Extract connections between nodes"""
         # Simplified: just count lines
-        img_array = np.array(image.convert('L'))
-        edges = cv2.Canny(img_array, 50, 150)
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=50, minLineLength=30, maxLineGap=10)
+        lines = OCRProcessor.image_features(image).lines
         
         connections = []
         if lines is not None:
@@ -1761,17 +1819,11 @@ class OCRProcessor:
             return 'free_form'
     
     @staticmethod
-    def _detect_shapes(image: Image.Image) -> Dict[str, int]:
+    def _detect_shapes(image: ImageFeatures) -> Dict[str, int]:
         """Detect common shapes in diagram"""
         shapes = {'rectangles': 0, 'circles': 0, 'diamonds': 0}
         
-        img_array = np.array(image.convert('L'))
-        edges = cv2.Canny(img_array, 50, 150)
-        
-        # Find contours
-        contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-        
-        for contour in contours:
+        for contour in OCRProcessor.image_features(image).contours:
             approx = cv2.approxPolyDP(contour, 0.04 * cv2.arcLength(contour, True), True)
             
             if len(approx) == 4:
@@ -1785,7 +1837,7 @@ class OCRProcessor:
         return shapes
     
     @staticmethod
-    def _detect_decision_points(image: Image.Image, ocr_result: OCRResult) -> bool:
+    def _detect_decision_points(image: ImageFeatures, ocr_result: OCRResult) -> bool:
         """Detect decision points in flowchart"""
         text = ocr_result.raw_text.lower() if ocr_result else ""
         
@@ -1799,7 +1851,7 @@ class OCRProcessor:
         return has_keywords or has_diamonds
     
     @staticmethod
-    def _detect_image_subtype(image: Image.Image, ocr_result: OCRResult) -> Optional[str]:
+    def _detect_image_subtype(image: ImageFeatures, ocr_result: OCRResult) -> Optional[str]:
         """Detect image subtype"""
         # Check text density
         text_length = len(ocr_result.raw_text) if ocr_result else 0
@@ -1811,8 +1863,7 @@ class OCRProcessor:
             return 'screenshot'
         else:
             # Likely photo or illustration
-            img_array = np.array(image.convert('L'))
-            variance = np.var(img_array)
+            variance = np.var(OCRProcessor.image_features(image).gray)
             
             if variance > 1500:
                 return 'photo'
@@ -1820,7 +1871,7 @@ class OCRProcessor:
                 return 'illustration'
     
     @staticmethod
-    def _detect_embedded_table(image: Image.Image, ocr_result: OCRResult) -> bool:
+    def _detect_embedded_table(image: ImageFeatures, ocr_result: OCRResult) -> bool:
         """Detect if image contains an embedded table"""
         if not ocr_result or not ocr_result.raw_text:
             return False
@@ -1876,6 +1927,7 @@ class ConceptLinker:
         
         self._build_concept_index()
         self._compute_term_statistics()
+        self._build_match_index()
     
     def _build_concept_index(self):
         """Build search index with normalized terms and aliases"""
@@ -2101,7 +2153,7 @@ class ConceptLinker:
         
         return f"concept_{normalized}_{index:03d}"
     
-    def link_concepts(self, segment: VisualSegment) -> List[Dict[str, Any]]:
+    def link_concepts(self, segment: VisualSegment, exhaustive: bool = False) -> List[Dict[str, Any]]:
         """
         Link segment to concepts using multi-signal matching.
         
@@ -2111,6 +2163,10 @@ class ConceptLinker:
         3. Fuzzy matching for near-matches
         4. Contextual expansion (nearby text)
         
+        Only concepts sharing a term with the segment are scored (see
+        _score_candidates); `exhaustive=True` scores every concept with
+        _score_concept_match instead and returns the same ranking.
+        
         Returns ranked list of concept matches with calibrated confidence.
         """
         # Collect all searchable text with context weighting
@@ -2118,19 +2174,19 @@ class ConceptLinker:
         
         # Extract terms from search context
         search_terms = self._extract_terms(search_context['combined_text'])
-
-        print('Search Terms:', search_terms)
         
-        # Score all concepts
+        # Score concepts
         scored_matches = []
-        
-        for concept_id, concept_data in self.concept_map.items():
-            match_score = self._score_concept_match(
+        if exhaustive:
+            scored = ((concept_data, self._score_concept_match(
                 search_terms=search_terms,
                 search_context=search_context,
                 concept_data=concept_data
-            )
-            
+            )) for concept_data in self.concept_map.values())
+        else:
+            scored = self._score_candidates(search_terms, search_context)
+        
+        for concept_data, match_score in scored:
             if match_score['total_score'] > 0.5:  # Minimum threshold
                 scored_matches.append({
                     'concept_id': concept_data['concept_id'],
@@ -2172,14 +2228,224 @@ class ConceptLinker:
         scored_matches = list(deduplicated_matches.values())
         scored_matches.sort(key=lambda x: x['confidence'], reverse=True)
 
-        # Log results
         print(f"Found {len(scored_matches)} concept links (after deduplication)")
-
-        for match in scored_matches:
-            print(f"  - {match['concept_name']} ({match['confidence']:.3f}, {match['match_method']})")
         
         return scored_matches
     
+    def _build_match_index(self):
+        """
+        Precompute everything link_concepts needs per concept:
+        - sparse TF-IDF concept vectors as term postings (inverted index
+          term -> concepts and weights), plus their L2 norms
+        - IDF-weighted term-overlap postings and each concept's max overlap score
+        - compiled exact-phrase patterns and fuzzy-match inputs
+        """
+        self._entries = list(self.concept_map.values())
+        n = len(self._entries)
+        cosine_postings = defaultdict(lambda: ([], []))
+        overlap_postings = defaultdict(lambda: ([], []))
+        self._concept_norms = np.zeros(n)
+        self._overlap_max = np.zeros(n)
+        self._exact_patterns = []
+        self._fuzzy_inputs = []
+        
+        for i, concept_data in enumerate(self._entries):
+            concept_vector = self._build_concept_tfidf_vector(concept_data)
+            self._concept_norms[i] = np.sqrt(sum(v**2 for v in concept_vector.values()))
+            for term, weight in concept_vector.items():
+                cosine_postings[term][0].append(i)
+                cosine_postings[term][1].append(weight)
+            
+            primary_terms = concept_data['primary_terms']
+            for term in primary_terms:
+                overlap_postings[term][0].append(i)
+                overlap_postings[term][1].append(1.0 * self._compute_idf(term))
+                self._overlap_max[i] += 1.0 * self._compute_idf(term)
+            for term in concept_data['normalized_terms'] - primary_terms:
+                overlap_postings[term][0].append(i)
+                overlap_postings[term][1].append(0.5 * self._compute_idf(term))
+            
+            self._exact_patterns.append(self._compile_exact_patterns(concept_data['concept_name']))
+            self._fuzzy_inputs.append(self._fuzzy_match_inputs(concept_data['concept_name']))
+        
+        self._cosine_postings = {t: (np.array(idx), np.array(w)) for t, (idx, w) in cosine_postings.items()}
+        self._overlap_postings = {t: (np.array(idx), np.array(w)) for t, (idx, w) in overlap_postings.items()}
+    
+    def _compile_exact_patterns(self, concept_name: str) -> List[Tuple[float, Any]]:
+        """(score, compiled whole-phrase pattern) per name/alias/acronym, best score first"""
+        parsed = self._parse_concept_name(concept_name)
+        candidates = set()
+        candidates.add(concept_name)
+        candidates.add(parsed.get("main", ""))
+        candidates |= set(parsed.get("aliases", set()))
+        candidates |= set(parsed.get("acronyms", set()))
+        
+        best_by_phrase = {}
+        for c in candidates:
+            c_norm = self._normalize_text(c)
+            if not c_norm:
+                continue
+            # Same scoring as _score_exact_match
+            if len(c_norm.split()) >= 2 or re.fullmatch(r"[a-z]{2,10}(-[a-z]{1,10})?s?", c_norm):
+                score = 1.0
+            else:
+                score = 0.7
+            best_by_phrase[c_norm] = max(score, best_by_phrase.get(c_norm, 0.0))
+        
+        patterns = []
+        for c_norm, score in best_by_phrase.items():
+            # Same pattern as _contains_whole_phrase
+            escaped = re.escape(c_norm).replace(r"\-", r"[-\s]")
+            patterns.append((score, re.compile(rf"(?<!\w){escaped}(?!\w)", flags=re.IGNORECASE)))
+        patterns.sort(key=lambda p: -p[0])
+        return patterns
+    
+    def _fuzzy_match_inputs(self, concept_name: str) -> Optional[Dict[str, Any]]:
+        """Normalized acronyms/main terms for _fuzzy_score (None if fuzzy matching is off for the concept)"""
+        parsed = self._parse_concept_name(concept_name)
+        main_terms = list(self._extract_terms(parsed.get("main", concept_name)))
+        if len(main_terms) == 1 and self._is_generic_single_term(main_terms[0]):
+            return None
+        acronyms = [self._normalize_text(ac) for ac in parsed.get("acronyms", set())]
+        terms = [self._normalize_text(t) for t in main_terms]
+        return {
+            'acronyms': [a for a in acronyms if a],
+            'terms': [t.replace("-", "") for t in terms if t],
+            'n_main_terms': len(main_terms),
+        }
+    
+    def _score_candidates(self, search_terms: set, search_context: Dict):
+        """
+        Yield (concept_data, match_score) for every concept that can pass the
+        link threshold, in taxonomy order, with the same scores as
+        _score_concept_match.
+        
+        Exact phrase, fuzzy and context signals together cap at 45/100, so a
+        concept needs cosine or term-overlap credit, i.e. a shared term. Both
+        are computed for all concepts at once as sparse products over the term
+        postings and only concepts with a nonzero score are scored further;
+        fuzzy matching only runs where it could still lift the total past the
+        threshold.
+        """
+        n = len(self._entries)
+        
+        # SIGNAL 2 for all concepts: sparse TF-IDF (concepts x terms) . search vector
+        search_vector = self._build_tfidf_vector(search_context)
+        search_norm = np.sqrt(sum(v**2 for v in search_vector.values()))
+        cosine = np.zeros(n)
+        if search_norm > 0:
+            hits = [(self._cosine_postings[t], q) for t, q in search_vector.items() if t in self._cosine_postings]
+            if hits:
+                idx = np.concatenate([p[0] for p, _ in hits])
+                vals = np.concatenate([p[1] * q for p, q in hits])
+                dots = np.bincount(idx, weights=vals, minlength=n)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    cosine = np.where(self._concept_norms > 0, dots / (search_norm * self._concept_norms), 0.0)
+                cosine = np.clip(cosine, 0.0, 1.0)
+        
+        # SIGNAL 3 for all concepts: IDF-weighted overlap postings . search term indicator
+        overlap = np.zeros(n)
+        hits = [self._overlap_postings[t] for t in search_terms if t in self._overlap_postings]
+        if hits:
+            sums = np.bincount(np.concatenate([p[0] for p in hits]),
+                               weights=np.concatenate([p[1] for p in hits]), minlength=n)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                overlap = np.where(self._overlap_max > 0, np.minimum(sums / self._overlap_max, 1.0), 0.0)
+        
+        candidates = np.flatnonzero((cosine > 0) | (overlap > 0))
+        if len(candidates) == 0:
+            return
+        
+        text_norm = self._normalize_text(search_context['combined_text'])
+        words = sorted(set(re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)?", text_norm))) if text_norm else []
+        lowered = {k: search_context[k].lower() for k in ('caption', 'summary', 'nearby')}
+        
+        for i in candidates:
+            concept_data = self._entries[i]
+            
+            if self._should_gate_generic_single_term(concept_data, search_context):
+                continue
+            
+            exact_score = 0.0
+            if text_norm:
+                for score, pattern in self._exact_patterns[i]:
+                    if pattern.search(text_norm):
+                        exact_score = score
+                        break
+            
+            concept_name = concept_data['concept_name'].lower()
+            context_score = 0.0
+            if concept_name in lowered['caption']:
+                context_score += 0.5
+            if concept_name in lowered['summary']:
+                context_score += 0.3
+            if concept_name in lowered['nearby']:
+                context_score += 0.2
+            
+            score_breakdown = {
+                'exact_phrase': exact_score * 30,
+                'cosine_similarity': float(cosine[i]) * 30,
+                'term_overlap': float(overlap[i]) * 25,
+                'fuzzy_match': 0.0,
+                'context_bonus': min(context_score, 1.0) * 5
+            }
+            # Fuzzy adds at most 10 points; skip it when the total cannot pass 0.5
+            if sum(score_breakdown.values()) + 10 <= 50 - 1e-9:
+                continue
+            score_breakdown['fuzzy_match'] = self._fuzzy_score(self._fuzzy_inputs[i], words) * 10
+            
+            total_score = sum(score_breakdown.values()) / 100.0
+            max_signal = max(score_breakdown, key=score_breakdown.get)
+            method_map = {
+                'exact_phrase': 'exact_phrase_match',
+                'cosine_similarity': 'cosine_similarity',
+                'term_overlap': 'term_overlap',
+                'fuzzy_match': 'fuzzy_match',
+                'context_bonus': 'context_match'
+            }
+            yield concept_data, {
+                'total_score': min(total_score, 1.0),
+                'method': method_map[max_signal],
+                'details': score_breakdown
+            }
+    
+    def _fuzzy_score(self, inputs: Optional[Dict[str, Any]], words: List[str]) -> float:
+        """_score_fuzzy_match on precomputed inputs; skips pairs that cannot reach 0.88 similarity"""
+        if inputs is None or not words:
+            return 0.0
+        
+        best = 0.0
+        for ac_n in inputs['acronyms']:
+            for w in words:
+                best = max(best, self._similarity_at_least(ac_n, w, 0.88))
+        
+        term_hits = 0
+        stripped_words = [w.replace("-", "") for w in words]
+        for t in inputs['terms']:
+            if any(self._similarity_at_least(t, w, 0.88) for w in stripped_words):
+                term_hits += 1
+        
+        if inputs['n_main_terms'] >= 2 and term_hits >= 2:
+            best = max(best, 0.9)
+        elif inputs['n_main_terms'] == 1 and term_hits == 1:
+            best = max(best, 0.82)
+        
+        return best if best >= 0.8 else 0.0
+    
+    @staticmethod
+    def _similarity_at_least(s1: str, s2: str, threshold: float) -> float:
+        """_string_similarity(s1, s2) if it is >= threshold, else 0.0"""
+        if s1 == s2:
+            return 1.0
+        # Upper bound of SequenceMatcher.ratio() from the lengths alone
+        if 2.0 * min(len(s1), len(s2)) / (len(s1) + len(s2)) < threshold:
+            return 0.0
+        matcher = SequenceMatcher(None, s1, s2)
+        if matcher.quick_ratio() < threshold:
+            return 0.0
+        ratio = matcher.ratio()
+        return ratio if ratio >= threshold else 0.0
+    
     def _build_search_context(self, segment: VisualSegment) -> Dict[str, Any]:
         """
         Build weighted search context from segment.
@@ -2706,7 +2972,9 @@ class VisualSegmentationPipeline:
     def __init__(self, book_id: str, pdf_path: str, 
                  taxonomy_path: Optional[str] = None,
                  output_dir: str = "./output",
-                 use_mermaid: bool = True):
+                 use_mermaid: bool = True,
+                 resume: bool = True,
+                 screen: bool = True):
         self.book_id = book_id
         self.pdf_path = pdf_path
         self.output_dir = Path(output_dir)
@@ -2725,8 +2993,25 @@ class VisualSegmentationPipeline:
             self.concept_linker = ConceptLinker(taxonomy_df)
         
         self.segments: List[VisualSegment] = []
+        # Repeated visuals (icons, badges, banners) are OCR'd/analyzed once per
+        # perceptual-hash cluster; results are shared by every member
+        self.dedup_index = PerceptualIndex()
+        self._segment_cluster: Dict[str, int] = {}
+        self._cluster_results: Dict[int, Dict[str, Any]] = {}
+        # Current page's crops kept in memory as (PIL image, pixel array or None),
+        # so OCR and analysis do not decode the saved PNGs again
+        self._renders: Dict[str, Tuple[Image.Image, Optional[np.ndarray]]] = {}
         # Initialize JSON file path
         self.output_json = self.output_dir / f"{self.book_id}_visual_segments.json"
+        # Segments are journaled as they finish; _save_results() turns the
+        # journal into output_json. With `resume`, a journal left by an
+        # interrupted run is replayed and its finished pages are skipped.
+        self.resume = resume
+        self.journal = SegmentJournal(self.output_dir / f"{self.book_id}_visual_segments.jsonl")
+        # Low-resolution-first cascade: candidates are checked on a thumbnail
+        # and only rendered at full resolution (then OCR'd and analyzed) if
+        # they pass; screen=False processes every candidate
+        self.screen = VisualScreen() if screen else None
     
     def process(self) -> List[VisualSegment]:
         """
@@ -2735,39 +3020,69 @@ class VisualSegmentationPipeline:
         """
         print(f"Processing PDF: {self.pdf_path}")
         
-        # Initialize JSON file with empty structure
-        self._initialize_json_file()
+        # Open the segment journal (replaying an interrupted run's journal)
+        recovered = self.journal.open(resume=self.resume)
+        if recovered or self.journal.pages_done:
+            print(f"Resuming from {self.journal.path}: {recovered} segments, "
+                  f"{len(self.journal.pages_done)} pages already done")
+        # Segments finished before the interruption are part of the result too,
+        # so the return value matches what _save_results() writes
+        for record in self.journal.records if recovered else []:
+            try:
+                self.segments.append(VisualSegment.from_dict(record))
+            except Exception as e:
+                print(f"    ✗ Could not restore journaled segment {record.get('segment_id')}: {e}")
         
         doc = fitz.open(self.pdf_path)
+        completed = False
         
         try:
             for page_num in range(len(doc)):
+                if page_num in self.journal.pages_done:
+                    continue
                 print(f"Processing page {page_num + 1}/{len(doc)}...")
                 page = doc[page_num]
                 
-                # Extract images using PyMuPDF
-                page_segments = self._extract_images_from_page(page, page_num)
+                # Extract images using PyMuPDF (skipping segments journaled before a crash)
+                page_segments = [
+                    seg for seg in self._extract_images_from_page(page, page_num)
+                    if seg.segment_id not in self.journal
+                ]
+                
+                # OCR the page's crops together on the shared worker pool
+                self._ocr_segments(page_segments)
                 
                 # Process each segment
                 for segment in page_segments:
                     try:
                         self._process_segment(segment, page, doc)
                         self.segments.append(segment)
-                        # Append segment to JSON file incrementally
-                        self._append_segment_to_json(segment)
-                        print(f"    ✓ Saved segment {segment.segment_id} to JSON")
+                        # Append segment to the journal incrementally
+                        if self._append_segment_to_journal(segment):
+                            print(f"    ✓ Saved segment {segment.segment_id} to journal")
                     except Exception as e:
                         print(f"    ✗ Error processing segment: {e}")
                         import traceback
                         traceback.print_exc()
                         # Continue with next segment even if one fails
                         continue
+                
+                self._renders.clear()
+                self.journal.mark_page_done(page_num)
+            completed = True
         finally:
             doc.close()
-            # Final save to ensure everything is up to date
-            self._save_results()
+            # Final save; an interrupted run keeps its journal for resuming
+            self._save_results(completed=completed)
         
+        dedup = self.dedup_index.report()
         print(f"\nExtraction complete! Found {len(self.segments)} visual elements.")
+        print(f"Deduplication: {dedup['images']} crops in {dedup['clusters']} clusters "
+              f"(dedup ratio {dedup['dedup_ratio']:.1%})")
+        if self.screen is not None:
+            screening = self.screen.report()
+            print(f"Screening: {screening['passed']}/{screening['screened']} candidates passed, "
+                  f"skipped {screening['skipped_by_reason']}")
         return self.segments
 
     def _extract_images_from_page(self, page: fitz.Page, page_num: int) -> List[VisualSegment]:
@@ -2785,14 +3100,17 @@ class VisualSegmentationPipeline:
         
         for idx, region in enumerate(caption_regions):
             try:
-                image, image_bytes = self._render_region(page, region['bbox'])
+                if not self._passes_screen(page, region['bbox']):
+                    continue
+                image, pixmap = self._render_region(page, region['bbox'])
                 if image is None:
                     continue
                 
+                # Encoded once, for the file; the bytes also name the segment
+                image_bytes = pixmap.tobytes("png")
                 segment_id = self._generate_segment_id(page_num, region['bbox'], image_bytes)
-                image_filename = f"{segment_id}.png"
-                image_path = self.output_dir / image_filename
-                image.save(image_path)
+                image_path = self._save_image(segment_id, image, image_bytes)
+                self._renders[segment_id] = (image, pixmap_array(pixmap))
                 
                 segment = VisualSegment(
                     segment_id=segment_id,
@@ -2895,8 +3213,12 @@ class VisualSegmentationPipeline:
             if validation_score < 0.5:  # Threshold for keeping
                 continue
             
+            if not self._passes_screen(page, bbox, image):
+                continue
+            
             # Try to find caption nearby (even if caption-based detection missed it)
             caption_text = self._find_caption_near_bbox(page, bbox)
+            png, pixels = None, None
             
             # If caption found, expand bbox to include it
             if caption_text:
@@ -2913,14 +3235,15 @@ class VisualSegmentationPipeline:
                             page_height=bbox.page_height
                         )
                         # Re-render with caption
-                        image, image_bytes = self._render_region(page, bbox)
+                        image, pixmap = self._render_region(page, bbox)
+                        png = image_bytes = pixmap.tobytes("png")
+                        pixels = pixmap_array(pixmap)
                         break
             
             # Generate segment
             segment_id = self._generate_segment_id(page_num, bbox, image_bytes)
-            image_filename = f"{segment_id}.png"
-            image_path = self.output_dir / image_filename
-            image.save(image_path)
+            image_path = self._save_image(segment_id, image, png)
+            self._renders[segment_id] = (image, pixels)
             
             segment = VisualSegment(
                 segment_id=segment_id,
@@ -2995,7 +3318,7 @@ class VisualSegmentationPipeline:
             notes.append("has_caption")
         
         # Check 6: Image content analysis (simple)
-        img_array = np.array(image.convert('L'))
+        img_array = np.asarray(image.convert('L'))
         variance = np.var(img_array)
         
         if variance < 10:  # Nearly uniform color (likely decoration)
@@ -3078,8 +3401,8 @@ class VisualSegmentationPipeline:
         # Factor 3: Check if embedded is actual raster image (photos prefer embedded)
         if embedded.extraction_method == 'embedded_image':
             # Check if it's photo-like
-            img = Image.open(embedded.image_path)
-            img_array = np.array(img.convert('L'))
+            img, _ = self._rendered(embedded)
+            img_array = np.asarray(img.convert('L'))
             variance = np.var(img_array)
             
             if variance > 1000:  # Photo-like
@@ -3121,10 +3444,14 @@ class VisualSegmentationPipeline:
         """
         visual_regions = []
         page_rect = page.rect
+        # Accepted regions by position in visual_regions, for overlap lookups
+        region_index = RectGrid(bounds=(page_rect.x0, page_rect.y0, page_rect.x1, page_rect.y1))
         
         # Strategy 1: Caption-based detection
         caption_regions = self._detect_by_captions(page, page_rect)
-        visual_regions.extend(caption_regions)
+        for region in caption_regions:
+            region_index.insert(len(visual_regions), self._bbox_tuple(region['bbox']))
+            visual_regions.append(region)
         
         # Strategy 2: Non-text block detection (for visuals without clear captions)
         drawing_regions = self._detect_by_drawings(page, page_rect)
@@ -3133,7 +3460,7 @@ class VisualSegmentationPipeline:
         # Also check if drawing region contains a caption to avoid duplicates
         for draw_region in drawing_regions:
             # Check overlap with caption-detected regions
-            if self._overlaps_with_existing(draw_region['bbox'], visual_regions):
+            if self._overlaps_with_existing(draw_region['bbox'], visual_regions, region_index):
                 continue
             
             # Check if this drawing region contains any of the detected captions
@@ -3151,6 +3478,7 @@ class VisualSegmentationPipeline:
                         break
             
             if not contains_caption:
+                region_index.insert(len(visual_regions), self._bbox_tuple(draw_region['bbox']))
                 visual_regions.append(draw_region)
         
         return visual_regions
@@ -3570,67 +3898,53 @@ class VisualSegmentationPipeline:
                          distance_threshold: float = 100) -> List[List[Dict]]:
         """
         Cluster nearby drawings into groups (likely parts of same figure).
+        
+        Drawings closer than `distance_threshold` are joined transitively
+        (union-find over grid neighbour queries, see spatial_index), so the
+        cost grows about linearly with the number of drawings on the page.
         """
         if not drawings:
             return []
         
-        # Simple clustering: group drawings that are close to each other
-        clusters = []
-        used = set()
+        rects = [self._rect_tuple(d['rect']) for d in drawings]
+        groups = cluster_rects(rects, distance_threshold,
+                               bounds=(page_rect.x0, page_rect.y0, page_rect.x1, page_rect.y1))
         
-        for i, draw1 in enumerate(drawings):
-            if i in used:
-                continue
-            
-            cluster = [draw1]
-            used.add(i)
-            
-            # Find nearby drawings
-            for j, draw2 in enumerate(drawings):
-                if j in used or j == i:
-                    continue
-                
-                # Calculate distance between drawings
-                dist = self._drawing_distance(draw1['rect'], draw2['rect'])
-                
-                if dist < distance_threshold:
-                    cluster.append(draw2)
-                    used.add(j)
-            
-            # Only keep clusters with substantial content
-            if len(cluster) >= 3:  # At least 3 drawing elements
-                clusters.append(cluster)
-        
-        return clusters
+        # Only keep clusters with substantial content
+        return [[drawings[i] for i in group] for group in groups
+                if len(group) >= 3]  # At least 3 drawing elements
+    
+    @staticmethod
+    def _rect_tuple(rect) -> Tuple[float, float, float, float]:
+        """(x0, y0, x1, y1) of a fitz.Rect or a sequence"""
+        if hasattr(rect, 'x0'):
+            return (rect.x0, rect.y0, rect.x1, rect.y1)
+        return tuple(rect[:4])
+    
+    @staticmethod
+    def _bbox_tuple(bbox: BoundingBox) -> Tuple[float, float, float, float]:
+        return (bbox.x0, bbox.y0, bbox.x1, bbox.y1)
     
     def _drawing_distance(self, rect1: fitz.Rect, rect2: fitz.Rect) -> float:
         """Calculate minimum distance between two rectangles"""
-        # Convert to list if Rect object
-        if hasattr(rect1, 'x0'):
-            r1 = [rect1.x0, rect1.y0, rect1.x1, rect1.y1]
-        else:
-            r1 = rect1
+        return rect_distance(self._rect_tuple(rect1), self._rect_tuple(rect2))
+    
+    def _overlaps_with_existing(self, bbox: BoundingBox, 
+                                existing_regions: List[Dict],
+                                index: Optional[RectGrid] = None) -> bool:
+        """
+        Check if bbox significantly overlaps with existing regions.
         
-        if hasattr(rect2, 'x0'):
-            r2 = [rect2.x0, rect2.y0, rect2.x1, rect2.y1]
+        With `index` (a RectGrid keyed by position in existing_regions), only
+        regions sharing a grid cell with bbox are compared; anything else
+        cannot overlap it.
+        """
+        if index is not None:
+            candidates = [existing_regions[k] for k in sorted(index.query(self._bbox_tuple(bbox)))]
         else:
-            r2 = rect2
+            candidates = existing_regions
         
-        # Check if rectangles overlap
-        if (r1[0] <= r2[2] and r1[2] >= r2[0] and 
-            r1[1] <= r2[3] and r1[3] >= r2[1]):
-            return 0
-        
-        # Calculate minimum distance
-        dx = max(0, max(r1[0] - r2[2], r2[0] - r1[2]))
-        dy = max(0, max(r1[1] - r2[3], r2[1] - r1[3]))
-        
-        return (dx**2 + dy**2)**0.5
-    
-    def _overlaps_with_existing(self, bbox: BoundingBox, 
-                                existing_regions: List[Dict]) -> bool:
-        """Check if bbox significantly overlaps with existing regions"""
-        for region in existing_regions:
+        for region in candidates:
             existing_bbox = region['bbox']
             
             # Calculate overlap
@@ -3646,10 +3960,11 @@ class VisualSegmentationPipeline:
         return False
     
     def _render_region(self, page: fitz.Page, bbox: BoundingBox, 
-                      dpi: int = 150) -> Tuple[Optional[Image.Image], Optional[bytes]]:
+                      dpi: int = 150) -> Tuple[Optional[Image.Image], Optional[fitz.Pixmap]]:
         """
         Render a specific region of the page to an image.
         This captures vector graphics, text, and everything in that region.
+        Returns the image and its pixmap (see pixmap_arrays for array views).
         """
         # Create a clip rectangle for the region
         clip_rect = fitz.Rect(bbox.x0, bbox.y0, bbox.x1, bbox.y1)
@@ -3660,27 +3975,136 @@ class VisualSegmentationPipeline:
         
         pixmap = page.get_pixmap(matrix=mat, clip=clip_rect)
         
-        # Convert pixmap to PIL Image
-        img_data = pixmap.tobytes("png")
-        image = Image.open(io.BytesIO(img_data))
+        # PIL Image over the pixmap samples (no PNG encode/decode)
+        image = pixmap_image(pixmap)
+        
+        return image, pixmap
+
+    def _save_image(self, segment_id: str, image: Image.Image, png: Optional[bytes] = None) -> Path:
+        """Write a segment's crop as <segment_id>.png (encoding it unless `png` is given)"""
+        if png is None:
+            buffered = io.BytesIO()
+            image.save(buffered, format="PNG")
+            png = buffered.getvalue()
+        image_path = self.output_dir / f"{segment_id}.png"
+        image_path.write_bytes(png)
+        # The vision request sends these bytes instead of encoding the image again
+        attach_png(image, png)
+        return image_path
+
+    def _rendered(self, segment: VisualSegment) -> Tuple[Image.Image, Optional[np.ndarray]]:
+        """(image, pixel array or None) of a segment's crop: the in-memory render if
+        it is still held, else the saved file"""
+        if segment.segment_id in self._renders:
+            return self._renders[segment.segment_id]
+        return Image.open(segment.image_path), None
+    
+    def _passes_screen(self, page: fitz.Page, bbox: BoundingBox,
+                       image: Optional[Image.Image] = None) -> bool:
+        """
+        Cheap first stage of the cascade (see visual_screen): check a
+        thumbnail of the region, rendered at the screen's thumbnail dpi or
+        downscaled from an already decoded `image`.
+        """
+        if self.screen is None:
+            return True
+        scale = self.screen.thumb_dpi / 72
+        try:
+            if image is not None:
+                size = (max(1, round((bbox.x1 - bbox.x0) * scale)),
+                        max(1, round((bbox.y1 - bbox.y0) * scale)))
+                thumb = image.convert('L')
+                thumb.thumbnail(size)
+                gray = np.asarray(thumb)
+            else:
+                clip_rect = fitz.Rect(bbox.x0, bbox.y0, bbox.x1, bbox.y1)
+                pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip_rect,
+                                         colorspace=fitz.csGRAY, alpha=False)
+                gray = pixmap_array(pixmap)
+        except Exception as e:
+            # A failed thumbnail must not cost the visual; let the full render decide
+            print(f"    Warning: screening thumbnail failed: {e}")
+            return True
         
-        return image, img_data
+        passed, reason, metrics = self.screen.check(gray, self._text_coverage(page, bbox))
+        if not passed:
+            details = ", ".join(f"{k}={v:.3f}" for k, v in metrics.items())
+            print(f"    Skipping {reason} region at ({bbox.x0:.0f}, {bbox.y0:.0f}) {details}")
+        return passed
     
+    def _text_coverage(self, page: fitz.Page, bbox: BoundingBox) -> float:
+        """Fraction of the region covered by words of the PDF text layer"""
+        area = bbox.area()
+        if area <= 0:
+            return 0.0
+        covered = 0.0
+        clip_rect = fitz.Rect(bbox.x0, bbox.y0, bbox.x1, bbox.y1)
+        for x0, y0, x1, y1, *_ in page.get_text("words", clip=clip_rect):
+            covered += max(0.0, min(x1, bbox.x1) - max(x0, bbox.x0)) * max(0.0, min(y1, bbox.y1) - max(y0, bbox.y0))
+        return min(covered / area, 1.0)
+    
+    def _ocr_segments(self, segments: List[VisualSegment]):
+        """Fill `ocr_result` for a batch of segments via the shared OCR worker pool.
+
+        Each crop is assigned to a perceptual-hash cluster first; only crops
+        starting a new cluster are OCR'd, the rest reuse their cluster's result.
+        """
+        todo = [seg for seg in segments if seg.ocr_result is None and seg.image_path]
+        new_clusters: Dict[int, VisualSegment] = {}
+        for seg in todo:
+            try:
+                image, _ = self._rendered(seg)
+                cluster, _ = self.dedup_index.assign(image)
+            except Exception:
+                continue
+            self._segment_cluster[seg.segment_id] = cluster
+            cached = self._cluster_results.setdefault(cluster, {})
+            if 'ocr_result' not in cached:
+                new_clusters.setdefault(cluster, seg)
+
+        if new_clusters:
+            try:
+                from ocr_worker_pool import get_ocr_pool
+                images = []
+                for seg in new_clusters.values():
+                    image, pixels = self._rendered(seg)
+                    images.append(pixels if pixels is not None else image.convert('RGB'))
+                print(f"    Running OCR on {len(images)} image(s)...")
+                for cluster, ocr_result in zip(new_clusters, get_ocr_pool().process_images(images)):
+                    self._cluster_results[cluster]['ocr_result'] = ocr_result
+            except Exception as e:
+                # _process_segment falls back to in-process OCR per segment
+                print(f"    OCR pool unavailable: {e}")
+
+        for seg in todo:
+            cached = self._cluster_results.get(self._segment_cluster.get(seg.segment_id), {})
+            if 'ocr_result' in cached:
+                seg.ocr_result = cached['ocr_result']
+
     def _process_segment(self, segment: VisualSegment, page: fitz.Page, doc: fitz.Document):
         """Process a single visual segment with ONE API call"""
         
-        image = Image.open(segment.image_path)
+        image, pixels = self._rendered(segment)
+        
+        # STEP 1: Run OCR (usually already done for the whole page by _ocr_segments)
+        if segment.ocr_result is None:
+            print(f"    Running OCR...")
+            segment.ocr_result = OCRProcessor.process_image(pixels if pixels is not None else image)
         
-        # STEP 1: Run OCR
-        print(f"    Running OCR...")
-        segment.ocr_result = OCRProcessor.process_image(image)
+        # Shared with earlier crops of the same visual (see _ocr_segments)
+        cached = self._cluster_results.get(self._segment_cluster.get(segment.segment_id), {})
         
         # STEP 2: Single comprehensive API call (classification + metadata + summary)
-        print(f"    Analyzing with Mistral API (comprehensive)...")
-        analysis_result = self.mistral_api.analyze_visual_comprehensive(
-            image, 
-            segment.ocr_result
-        )
+        analysis_result = cached.get('analysis')
+        if analysis_result is None:
+            print(f"    Analyzing with Mistral API (comprehensive)...")
+            analysis_result = self.mistral_api.analyze_visual_comprehensive(
+                image, 
+                segment.ocr_result
+            )
+            cached['analysis'] = analysis_result
+        else:
+            print(f"    Reusing analysis of a duplicate visual")
         
         # STEP 3: Apply results to segment
         segment.segment_type = analysis_result['visual_type']
@@ -3734,8 +4158,10 @@ class VisualSegmentationPipeline:
         
         # STEP 6: Mermaid extraction (optional - still separate call if needed)
         if self.use_mermaid and segment.segment_type in [VisualType.DIAGRAM, VisualType.FLOWCHART]:
-            print(f"    Extracting Mermaid representation...")
-            segment.mermaid_repr = self.mistral_api.extract_mermaid_representation(image, segment)
+            if 'mermaid' not in cached:
+                print(f"    Extracting Mermaid representation...")
+                cached['mermaid'] = self.mistral_api.extract_mermaid_representation(image, segment)
+            segment.mermaid_repr = cached['mermaid']
             if segment.mermaid_repr and segment.mermaid_repr.mermaid_code:
                 print(f"    → Mermaid extraction successful")
         
@@ -3859,78 +4285,27 @@ class VisualSegmentationPipeline:
         
         return " ".join(nearby_text)[:500]  # Limit length
     
-    def _initialize_json_file(self):
-        """Initialize JSON file with empty structure"""
-        results = {
-            'book_id': self.book_id,
-            'pdf_path': self.pdf_path,
-            'total_segments': 0,
-            'segments': []
-        }
-        
-        with open(self.output_json, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
-        
-        print(f"Initialized JSON file: {self.output_json}")
-    
-    def _append_segment_to_json(self, segment: VisualSegment):
-        """
-        Append a single segment to the JSON file incrementally.
-        Reads existing file, adds segment, and writes back.
-        """
+    def _append_segment_to_journal(self, segment: VisualSegment) -> bool:
+        """Append a single segment to the journal; False if its ID was already saved"""
         try:
-            # Read existing JSON file
-            if self.output_json.exists():
-                with open(self.output_json, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-            else:
-                # If file doesn't exist, initialize it
-                results = {
-                    'book_id': self.book_id,
-                    'pdf_path': self.pdf_path,
-                    'total_segments': 0,
-                    'segments': []
-                }
-            
-            # Check if segment already exists (avoid duplicates)
-            segment_ids = [s.get('segment_id') for s in results.get('segments', [])]
-            if segment.segment_id not in segment_ids:
-                # Add new segment
-                results['segments'].append(segment.to_dict())
-                results['total_segments'] = len(results['segments'])
-                
-                # Write back to file
-                with open(self.output_json, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
+            return self.journal.append(segment.to_dict())
         except Exception as e:
-            print(f"    Warning: Failed to append segment to JSON: {e}")
+            print(f"    Warning: Failed to append segment to journal: {e}")
             import traceback
             traceback.print_exc()
+            return False
     
-    def _save_results(self):
-        """Save segmentation results to JSON (final update)"""
+    def _save_results(self, completed: bool = True):
+        """Write the journaled segments to JSON (final update)"""
         try:
-            # Read existing JSON file
-            if self.output_json.exists():
-                with open(self.output_json, 'r', encoding='utf-8') as f:
-                    results = json.load(f)
-            else:
-                results = {
-                    'book_id': self.book_id,
-                    'pdf_path': self.pdf_path,
-                    'total_segments': 0,
-                    'segments': []
-                }
-            
-            # Update with all segments (in case any were missed)
-            results['total_segments'] = len(self.segments)
-            results['segments'] = [seg.to_dict() for seg in self.segments]
-            
-            # Write final version
-            with open(self.output_json, 'w', encoding='utf-8') as f:
-                json.dump(results, f, indent=2, ensure_ascii=False)
+            header = {'book_id': self.book_id, 'pdf_path': self.pdf_path}
+            if self.screen is not None:
+                header['screening'] = self.screen.report()
+            self.journal.finalize(self.output_json, header, remove_journal=completed)
             
             print(f"\nFinal results saved to: {self.output_json}")
+            if not completed:
+                print(f"Run incomplete; resume from journal: {self.journal.path}")
             
             # Also create a summary CSV
             self._save_summary_csv()
@@ -3943,17 +4318,19 @@ class VisualSegmentationPipeline:
         """Create summary CSV for easy review"""
         summary_data = []
         
-        for seg in self.segments:
+        # Journal records cover resumed segments too, not just this run's
+        for seg in self.journal.records:
+            ocr_result = seg.get('ocr_result') or {}
             summary_data.append({
-                'segment_id': seg.segment_id,
-                'page': seg.page_no,
-                'type': seg.segment_type.value,
-                'confidence': f"{seg.classification_confidence:.2f}",
-                'figure_number': seg.figure_number or '',
-                'caption': seg.caption_text[:100] if seg.caption_text else '',
-                'ocr_text': seg.ocr_result.raw_text[:100] if seg.ocr_result else '',
-                'linked_concepts': len(seg.linked_concept_ids),
-                'summary': seg.summary[:100] if seg.summary else ''
+                'segment_id': seg.get('segment_id'),
+                'page': seg.get('page_no'),
+                'type': seg.get('segment_type'),
+                'confidence': f"{seg.get('classification_confidence') or 0.0:.2f}",
+                'figure_number': seg.get('figure_number') or '',
+                'caption': (seg.get('caption_text') or '')[:100],
+                'ocr_text': (ocr_result.get('raw_text') or '')[:100],
+                'linked_concepts': len(seg.get('linked_concept_ids') or []),
+                'summary': (seg.get('summary') or '')[:100]
             })
         
         df = pd.DataFrame(summary_data)
@@ -0,0 +1,91 @@
+"""
+Zero-copy NumPy views of PyMuPDF pixmaps.
+
+A rendered region used to go pixmap -> PNG bytes -> PIL decode -> np.array,
+i.e. a full PNG encode and decode plus two copies per visual. `pixmap_array`
+exposes `pixmap.samples` as an (h, w, n) uint8 array instead, without copying:
+rows follow the pixmap stride and channels its colorspace (1 gray, 3 RGB,
+4 CMYK, plus alpha if the pixmap has one). The array holds a reference to the
+pixmap, so it stays valid after the pixmap variable goes out of scope.
+Writes to the array go to the pixmap.
+
+`pixmap_image` wraps the same samples for code that needs a PIL image. A
+render is PNG-encoded only when its file is written; `attach_png` keeps those
+bytes on the PIL image so the vision request can send them instead of
+encoding the image again.
+"""
+
+from typing import Any, Optional
+
+import numpy as np
+from PIL import Image
+
+# image.info key holding (mode, size, PNG bytes) of the file an image was saved as
+PNG_INFO_KEY = "synapta_png"
+
+
+class _Samples:
+    """Array interface over the pixmap's sample buffer; keeps the pixmap alive"""
+
+    def __init__(self, pixmap: Any):
+        self.pixmap = pixmap
+        self.__array_interface__ = {
+            "version": 3,
+            "typestr": "|u1",
+            "shape": (pixmap.height, pixmap.stride),
+            "data": (pixmap.samples_ptr, False),
+        }
+
+
+def _samples(pixmap: Any) -> np.ndarray:
+    """(height, stride) bytes of the pixmap"""
+    if pixmap.height == 0 or pixmap.stride == 0:
+        return np.zeros((pixmap.height, pixmap.stride), dtype=np.uint8)
+    if hasattr(type(pixmap), "samples_ptr"):
+        return np.asarray(_Samples(pixmap))
+    # Older PyMuPDF without samples_ptr: one copy of the samples
+    return np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.stride)
+
+
+def pixmap_mode(pixmap: Any) -> str:
+    """PIL mode matching the pixmap's channel layout"""
+    colors = pixmap.n - pixmap.alpha
+    mode = {1: "L", 3: "RGB", 4: "CMYK"}.get(colors)
+    if pixmap.alpha:
+        mode = {"L": "LA", "RGB": "RGBA"}.get(mode)
+    if mode is None:
+        raise ValueError(f"Unsupported pixmap layout: n={pixmap.n}, alpha={pixmap.alpha}")
+    return mode
+
+
+def pixmap_array(pixmap: Any) -> np.ndarray:
+    """(h, w, n) uint8 view of the pixmap samples; (h, w) for single-channel pixmaps"""
+    rows = _samples(pixmap)[:, :pixmap.width * pixmap.n]
+    array = rows.reshape(pixmap.height, pixmap.width, pixmap.n)
+    return array[:, :, 0] if pixmap.n == 1 else array
+
+
+def pixmap_image(pixmap: Any) -> Image.Image:
+    """PIL image over the pixmap samples.
+
+    L, RGBA and CMYK pixmaps are mapped without copying (the image is then
+    read-only); for the other modes PIL unpacks the rows once.
+    """
+    mode = pixmap_mode(pixmap)
+    return Image.frombuffer(mode, (pixmap.width, pixmap.height), _samples(pixmap),
+                            "raw", mode, pixmap.stride, 1)
+
+
+def attach_png(image: Image.Image, png: bytes) -> None:
+    """Remember the PNG bytes `image` was persisted as"""
+    image.info[PNG_INFO_KEY] = (image.mode, image.size, png)
+
+
+def attached_png(image: Image.Image) -> Optional[bytes]:
+    """PNG bytes from attach_png, if they still describe `image`.
+
+    PIL copies `info` to converted and cropped images, so mode and size are
+    checked before the bytes are reused.
+    """
+    mode, size, png = image.info.get(PNG_INFO_KEY, (None, None, None))
+    return png if (mode, size) == (image.mode, image.size) else None
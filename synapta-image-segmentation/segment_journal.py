@@ -0,0 +1,116 @@
+"""
+Append-only JSON Lines journal of finished visual segments.
+
+VisualSegmentationPipeline appends one line per segment (plus one marker line
+per finished page) instead of rewriting the whole output JSON after every
+segment. Lines are flushed immediately and fsynced in batches. Segment IDs are
+kept in memory for duplicate checks. `finalize()` writes the usual
+`<book>_visual_segments.json` layout from the journal; a run that dies before
+that leaves the journal behind, and the next run resumes from it.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, List, Set
+import json
+import os
+import time
+
+
+class SegmentJournal:
+    """JSONL journal: segment records plus {"page_done": n} markers"""
+
+    def __init__(self, path: Path, fsync_every: int = 16, fsync_seconds: float = 2.0):
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self.segment_ids: Set[str] = set()
+        self.pages_done: Set[int] = set()
+        self._records: List[Dict[str, Any]] = []
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def open(self, resume: bool = True) -> int:
+        """Open for appending; with `resume`, replay an existing journal first.
+
+        Returns the number of segments recovered. A torn last line (crash in
+        the middle of a write) is cut off before appending.
+        """
+        if resume and self.path.exists():
+            good_bytes = 0
+            with open(self.path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_bytes += len(line)
+                    self._replay(record)
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+        return len(self._records)
+
+    def _replay(self, record: Dict[str, Any]) -> None:
+        if "page_done" in record:
+            self.pages_done.add(record["page_done"])
+        elif record.get("segment_id") not in self.segment_ids:
+            self.segment_ids.add(record.get("segment_id"))
+            self._records.append(record)
+
+    def __contains__(self, segment_id: str) -> bool:
+        return segment_id in self.segment_ids
+
+    def append(self, record: Dict[str, Any]) -> bool:
+        """Journal one segment dict; False (nothing written) if its ID is already in"""
+        segment_id = record.get("segment_id")
+        if segment_id in self.segment_ids:
+            return False
+        self._write(record)
+        self.segment_ids.add(segment_id)
+        self._records.append(record)
+        return True
+
+    def mark_page_done(self, page_num: int) -> None:
+        self._write({"page_done": page_num})
+        self.pages_done.add(page_num)
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._file is not None and self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return list(self._records)
+
+    def finalize(self, output_json: Path, header: Dict[str, Any], remove_journal: bool = True) -> None:
+        """Write header + all journaled segments as one JSON document (atomically)"""
+        self.close()
+        results = dict(header)
+        results["total_segments"] = len(self._records)
+        results["segments"] = self._records
+        output_json = Path(output_json)
+        tmp = output_json.with_suffix(output_json.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, output_json)
+        if remove_journal:
+            self.path.unlink(missing_ok=True)
+
@@ -0,0 +1,163 @@
+"""
+Uniform-grid spatial index for page rectangles, plus union-find clustering.
+
+Chart-heavy pages carry thousands of vector drawings. Comparing every drawing
+with every other one is quadratic; with the rectangles bucketed into grid
+cells of about the neighbour distance, a query only looks at the few cells
+around a rectangle, so clustering a page is close to linear in the number of
+drawings.
+
+Rectangles are (x0, y0, x1, y1) tuples in page points.
+"""
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+Rect = Tuple[float, float, float, float]
+
+
+def rect_distance(r1: Sequence[float], r2: Sequence[float]) -> float:
+    """Minimum distance between two rectangles (0 when they touch or overlap)"""
+    if r1[0] <= r2[2] and r1[2] >= r2[0] and r1[1] <= r2[3] and r1[3] >= r2[1]:
+        return 0
+    dx = max(0, max(r1[0] - r2[2], r2[0] - r1[2]))
+    dy = max(0, max(r1[1] - r2[3], r2[1] - r1[3]))
+    return (dx**2 + dy**2)**0.5
+
+
+class RectGrid:
+    """Rectangles bucketed by the grid cells they cover.
+
+    With `bounds` (e.g. the page rect), cell indices are clamped to it, so
+    huge or off-page rectangles land in the border cells instead of spanning
+    an unbounded number of cells. Clamping keeps overlapping cell ranges
+    overlapping, so queries still return every candidate.
+    """
+
+    def __init__(self, cell_size: float = 100.0, bounds: Optional[Sequence[float]] = None):
+        self.cell_size = max(float(cell_size), 1.0)
+        self._limits = None
+        if bounds is not None:
+            self._limits = (int(bounds[0] // self.cell_size), int(bounds[1] // self.cell_size),
+                            int(bounds[2] // self.cell_size), int(bounds[3] // self.cell_size))
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self.rects: Dict[int, Rect] = {}
+
+    def cells(self, rect: Sequence[float], pad: float = 0.0, clamp: bool = True) -> Iterable[Tuple[int, int]]:
+        """Cells covered by `rect` grown by `pad`; with clamp=False, only the
+        in-bounds cells the rectangle really touches"""
+        size = self.cell_size
+        cx0, cy0 = int((rect[0] - pad) // size), int((rect[1] - pad) // size)
+        cx1, cy1 = int((rect[2] + pad) // size), int((rect[3] + pad) // size)
+        if self._limits is not None and not clamp:
+            lx0, ly0, lx1, ly1 = self._limits
+            cx0, cx1 = max(cx0, lx0), min(cx1, lx1)
+            cy0, cy1 = max(cy0, ly0), min(cy1, ly1)
+        elif self._limits is not None:
+            lx0, ly0, lx1, ly1 = self._limits
+            cx0, cx1 = min(max(cx0, lx0), lx1), min(max(cx1, lx0), lx1)
+            cy0, cy1 = min(max(cy0, ly0), ly1), min(max(cy1, ly0), ly1)
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                yield cx, cy
+
+    def insert(self, key: int, rect: Sequence[float]) -> None:
+        self.rects[key] = tuple(rect)
+        for cell in self.cells(rect):
+            self._cells.setdefault(cell, []).append(key)
+
+    def members(self, cell: Tuple[int, int]) -> List[int]:
+        return self._cells.get(cell, [])
+
+    def query(self, rect: Sequence[float], pad: float = 0.0) -> Set[int]:
+        """Keys of rectangles sharing a grid cell with `rect` grown by `pad`.
+
+        A superset of the rectangles within `pad` of `rect`; callers filter
+        with the exact test.
+        """
+        found: Set[int] = set()
+        for cell in self.cells(rect, pad):
+            found.update(self._cells.get(cell, ()))
+        return found
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path halving and union by size"""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if self.size[ra] < self.size[rb]:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.size[ra] += self.size[rb]
+        return True
+
+
+def cluster_rects(rects: Sequence[Sequence[float]], distance_threshold: float,
+                  bounds: Optional[Sequence[float]] = None) -> List[List[int]]:
+    """Single-linkage clusters of rectangles closer than `distance_threshold`.
+
+    Returns lists of input indices, each in input order, clusters ordered by
+    their first member. Inverted rectangles are normalized first.
+    """
+    rects = [(min(r[0], r[2]), min(r[1], r[3]), max(r[0], r[2]), max(r[1], r[3])) for r in rects]
+    # Cells of half the threshold: two rectangles touching the same cell are
+    # at most 0.71 * threshold apart, so they join without a distance test and
+    # every cell's directly touching members form one set.
+    grid = RectGrid(cell_size=distance_threshold / 2, bounds=bounds)
+    sets = UnionFind(len(rects))
+    # cell -> a member such that every member of the cell is in its set.
+    # Sets only merge, so anything already in that set can skip the cell.
+    settled: Dict[Tuple[int, int], int] = {}
+    touching: Dict[Tuple[int, int], int] = {}  # cell -> one member really touching it
+    join_touching = grid.cell_size * 2 ** 0.5 < distance_threshold
+    find, placed = sets.find, grid.rects
+    for i, rect in enumerate(rects):
+        for cell in grid.cells(rect, pad=distance_threshold):
+            members = grid.members(cell)
+            hint = settled.get(cell)
+            if not members or (hint is not None and find(hint) == find(i)):
+                continue
+            root = find(i)
+            uniform = True
+            for j in members:
+                if find(j) == root:
+                    continue
+                if rect_distance(rect, placed[j]) < distance_threshold:
+                    sets.union(i, j)
+                    root = find(i)
+                else:
+                    uniform = False
+            if uniform:
+                settled[cell] = i
+
+        grid.insert(i, rect)
+        for cell in (grid.cells(rect, clamp=False) if join_touching else ()):
+            if cell in touching:
+                sets.union(i, touching[cell])
+            else:
+                touching[cell] = i
+        # Clamped-in (off-bounds) rectangles and new members may unsettle cells
+        for cell in grid.cells(rect):
+            hint = settled.get(cell)
+            if hint is None and len(grid.members(cell)) == 1:
+                settled[cell] = i
+            elif hint is not None and find(hint) != find(i):
+                del settled[cell]
+
+    clusters: Dict[int, List[int]] = {}
+    for i in range(len(rects)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
@@ -0,0 +1,266 @@
+"""
+Rate-limited, cached client for the Mistral chat-completions (vision) endpoint.
+
+One client per (api key, endpoint, model) is shared across the process. It owns
+an asyncio event loop on a background thread. Every request from any thread is
+scheduled on that loop, so the limits are global:
+
+- a semaphore caps concurrent requests (SYNAPTA_VISION_CONCURRENCY)
+- a token bucket caps the request rate (SYNAPTA_VISION_RPS)
+- 429/5xx responses and connection errors are retried with full-jitter
+  exponential backoff (Retry-After is honoured)
+- HTTP goes through one pooled requests.Session (keep-alive connection reuse)
+- successful responses are stored on disk, keyed by task + image content hash +
+  PROMPT_VERSION + model, so a re-run does not pay for the same image again
+
+Point MISTRAL_BASE_URL at a local stub server to exercise it offline.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Bump when a prompt template changes so cached responses are not reused
+PROMPT_VERSION = "1"
+
+DEFAULT_BASE_URL = "https://api.mistral.ai/v1/chat/completions"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def image_digest(image: Any) -> str:
+    """Content hash of a PIL image (mode, size and raw pixels)"""
+    h = hashlib.sha256(f"{image.mode}:{image.size}".encode())
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class ResponseCache:
+    """One JSON file per key; writes are atomic, failures only count as misses"""
+
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        except Exception:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(self.cache_dir / f"{key}.json", "r", encoding="utf-8") as f:
+                return json.load(f).get("content")
+        except Exception:
+            return None
+
+    def set(self, key: str, content: str) -> None:
+        path = self.cache_dir / f"{key}.json"
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"content": content}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except Exception:
+            pass
+
+
+class VisionClient:
+    """Shared, rate-limited chat-completions client (see module docstring)"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = DEFAULT_BASE_URL,
+        model: str = "pixtral-12b-2409",
+        max_concurrency: int = 4,
+        requests_per_second: float = 1.0,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        cache_dir: Optional[Path] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.cache = ResponseCache(cache_dir) if cache_dir else None
+        self.stats: Dict[str, int] = {"requests": 0, "cache_hits": 0, "retries": 0, "failures": 0}
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._http = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="vision-http")
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="vision-client", daemon=True).start()
+        # Loop-bound primitives are created on the client loop
+        self._semaphore, self._bucket = asyncio.run_coroutine_threadsafe(self._make_limits(), self._loop).result()
+
+    async def _make_limits(self) -> Tuple[asyncio.Semaphore, TokenBucket]:
+        return asyncio.Semaphore(self.max_concurrency), TokenBucket(self.requests_per_second)
+
+    def cache_key(self, task: str, image_hash: str, extra: str = "") -> str:
+        raw = "::".join((task, image_hash, PROMPT_VERSION, self.model, extra))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def complete(self, prompt: str, encode_image: Callable[[], str], **kwargs: Any) -> Optional[str]:
+        """Blocking call from any thread; see `acomplete` for the arguments"""
+        future = asyncio.run_coroutine_threadsafe(self.acomplete(prompt, encode_image, **kwargs), self._loop)
+        return future.result()
+
+    async def acomplete(
+        self,
+        prompt: str,
+        encode_image: Callable[[], str],
+        *,
+        task: str,
+        image_hash: str,
+        cache_extra: str = "",
+        cache_if: Optional[Callable[[str], bool]] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.2,
+        timeout: float = 45,
+    ) -> Optional[str]:
+        """Message content for one image + prompt, or None when the request failed.
+
+        `encode_image` returns the base64 PNG and is only called on a cache miss.
+        `cache_extra` is added to the cache key for prompts that carry context
+        not derived from the image itself; `cache_if` can reject responses that
+        should not be cached (e.g. unparseable ones).
+        """
+        key = self.cache_key(task, image_hash, cache_extra)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                return cached
+
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            img_base64 = await loop.run_in_executor(self._http, encode_image)
+            payload = {
+                "model": self.model,
+                "messages": [
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": prompt},
+                            {"type": "image_url", "image_url": f"data:image/png;base64,{img_base64}"},
+                        ],
+                    }
+                ],
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            }
+            for attempt in range(self.max_retries + 1):
+                await self._bucket.acquire()
+                self.stats["requests"] += 1
+                retry_after = None
+                try:
+                    response = await loop.run_in_executor(self._http, self._post, payload, timeout)
+                except requests.RequestException as e:
+                    print(f"    Mistral API request failed: {e}")
+                else:
+                    if response.status_code == 200:
+                        content = response.json()["choices"][0]["message"]["content"].strip()
+                        if self.cache is not None and (cache_if is None or cache_if(content)):
+                            self.cache.set(key, content)
+                        return content
+                    print(f"    Mistral API error: {response.status_code}")
+                    if response.status_code not in RETRY_STATUSES:
+                        break
+                    retry_after = _retry_after_seconds(response)
+                if attempt < self.max_retries:
+                    self.stats["retries"] += 1
+                    delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                    await asyncio.sleep(max(delay, retry_after or 0))
+
+        self.stats["failures"] += 1
+        return None
+
+    def _post(self, payload: Dict[str, Any], timeout: float) -> requests.Response:
+        return self._session.post(
+            self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+            timeout=timeout,
+        )
+
+
+def _retry_after_seconds(response: requests.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+_clients: Dict[Tuple[str, str, str], VisionClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_vision_client(api_key: str, base_url: str, model: str) -> VisionClient:
+    """Process-wide client per (api key, endpoint, model), configured from the environment"""
+    with _clients_lock:
+        client = _clients.get((api_key, base_url, model))
+        if client is None:
+            cache_dir = None
+            if os.environ.get("SYNAPTA_VISION_CACHE", "1") != "0":
+                default_dir = Path(__file__).resolve().parents[1] / "outputs" / ".cache" / "vision"
+                cache_dir = Path(os.environ.get("SYNAPTA_VISION_CACHE_DIR") or default_dir)
+            client = VisionClient(
+                api_key,
+                base_url=base_url,
+                model=model,
+                max_concurrency=int(_env_float("SYNAPTA_VISION_CONCURRENCY", 4)),
+                requests_per_second=_env_float("SYNAPTA_VISION_RPS", 1.0),
+                cache_dir=cache_dir,
+            )
+            _clients[(api_key, base_url, model)] = client
+        return client
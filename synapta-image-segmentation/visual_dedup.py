@@ -0,0 +1,133 @@
+"""
+Perceptual-hash deduplication of repeated visuals.
+
+Textbooks repeat the same icons, badges and banners on many pages. Each crop
+gets a 64-bit DCT perceptual hash; a crop whose hash is within
+`max_distance` bits of an earlier cluster representative (and whose aspect
+ratio matches) is a candidate for that cluster. Visuals that share a
+template (same-style tables or charts whose digits or labels differ) can
+hash within a few bits of each other. A candidate therefore joins only if it
+also has the representative's pixel size and matches it on a larger gray
+thumbnail. OCR and vision analysis run once per cluster and the result is
+fanned out to every member.
+
+Lookups use multi-index hashing: the hash is split into max_distance + 1
+bands, and two hashes within max_distance bits must agree exactly on at least
+one band (pigeonhole), so only representatives sharing a band are compared.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+HASH_BITS = 64
+
+# Pixel check of a hash match against the representative: gray thumbnail of at
+# most VERIFY_SIZE px per side; mean and largest absolute gray-level difference
+VERIFY_SIZE = 128
+VERIFY_MAX_MEAN_DIFF = 2.0
+VERIFY_MAX_PEAK_DIFF = 12
+
+
+def perceptual_hash(image: Image.Image) -> int:
+    """64-bit pHash: signs of the 8x8 low-frequency DCT block vs its median"""
+    gray = np.asarray(image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float32)
+    low = cv2.dct(gray)[:8, :8].flatten()
+    bits = low > np.median(low[1:])  # DC term excluded from the median
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def verification_thumbnail(image: Image.Image) -> np.ndarray:
+    size = (min(image.width, VERIFY_SIZE), min(image.height, VERIFY_SIZE))
+    return np.asarray(image.convert("L").resize(size, Image.BILINEAR), dtype=np.uint8)
+
+
+def same_visual(a: np.ndarray, b: np.ndarray) -> bool:
+    """Thumbnails (of equally sized crops) close enough to share OCR text and analysis"""
+    if a.shape != b.shape:
+        return False
+    diff = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    return float(diff.mean()) <= VERIFY_MAX_MEAN_DIFF and int(diff.max()) <= VERIFY_MAX_PEAK_DIFF
+
+
+class PerceptualIndex:
+    """Online leader clustering of crops by perceptual hash + aspect ratio.
+
+    Every member is within `max_distance` bits of its cluster's representative
+    (the first crop seen), so clusters cannot drift through chains of
+    slightly different images. It also has the representative's pixel size
+    and passes same_visual(). A hash match that fails this check starts its
+    own cluster and is counted as `verify_rejected`.
+    """
+
+    def __init__(self, max_distance: int = 4, aspect_tolerance: float = 0.05):
+        self.max_distance = max_distance
+        self.aspect_tolerance = aspect_tolerance
+        self.n_bands = max_distance + 1
+        self._band_bits = [
+            (HASH_BITS * i // self.n_bands, HASH_BITS * (i + 1) // self.n_bands) for i in range(self.n_bands)
+        ]
+        self._bands: List[Dict[int, List[int]]] = [{} for _ in range(self.n_bands)]
+        self._reps: List[Tuple[int, float]] = []  # (hash, aspect) per cluster
+        self._rep_pixels: List[Tuple[Tuple[int, int], np.ndarray]] = []  # (size, thumbnail) per cluster
+        self.members: List[int] = []  # cluster size per cluster
+        self.verify_rejected = 0
+
+    def _band_values(self, h: int) -> List[int]:
+        return [(h >> lo) & ((1 << (hi - lo)) - 1) for lo, hi in self._band_bits]
+
+    def find(self, h: int, aspect: float) -> Optional[int]:
+        """Cluster id of the first matching representative, or None"""
+        candidates = self.candidates(h, aspect)
+        return candidates[0] if candidates else None
+
+    def candidates(self, h: int, aspect: float) -> List[int]:
+        """Clusters whose representative matches the hash and aspect ratio, oldest first"""
+        found = set()
+        for band, value in zip(self._bands, self._band_values(h)):
+            for cluster in band.get(value, ()):
+                rep_hash, rep_aspect = self._reps[cluster]
+                if abs(aspect - rep_aspect) > self.aspect_tolerance * max(aspect, rep_aspect):
+                    continue
+                if hamming(h, rep_hash) <= self.max_distance:
+                    found.add(cluster)
+        return sorted(found)
+
+    def assign(self, image: Image.Image) -> Tuple[int, bool]:
+        """(cluster id, is_new_cluster) for a crop"""
+        h = perceptual_hash(image)
+        aspect = image.width / max(image.height, 1)
+        thumbnail = verification_thumbnail(image)
+        candidates = self.candidates(h, aspect)
+        for cluster in candidates:
+            size, rep_thumbnail = self._rep_pixels[cluster]
+            if size == image.size and same_visual(thumbnail, rep_thumbnail):
+                self.members[cluster] += 1
+                return cluster, False
+        if candidates:
+            self.verify_rejected += 1
+        cluster = len(self._reps)
+        self._reps.append((h, aspect))
+        self._rep_pixels.append((image.size, thumbnail))
+        self.members.append(1)
+        for band, value in zip(self._bands, self._band_values(h)):
+            band.setdefault(value, []).append(cluster)
+        return cluster, True
+
+    def report(self) -> Dict[str, Any]:
+        images = sum(self.members)
+        clusters = len(self.members)
+        return {
+            "images": images,
+            "clusters": clusters,
+            "duplicates": images - clusters,
+            "dedup_ratio": round((images - clusters) / images, 4) if images else 0.0,
+            "largest_cluster": max(self.members) if self.members else 0,
+            "verify_rejected": self.verify_rejected,
+        }
@@ -0,0 +1,101 @@
+"""
+Low-resolution-first screen for candidate visuals.
+
+Rendering a region at full resolution, OCR'ing it and sending it to the vision
+model is the expensive part of the pipeline. Before that, each candidate is
+rendered as a small grayscale thumbnail (`thumb_dpi`) and checked with cheap
+heuristics:
+
+- blank:      almost no pixels differ from the background (`min_ink_ratio`)
+- decorative: too few edges for any text, lines or shapes (`min_edge_density`),
+              e.g. flat fills, gradients, rules and banners
+- text_block: the PDF text layer covers most of the region
+              (`max_text_coverage`), i.e. a paragraph, not a figure
+
+Only candidates that pass are re-rendered at full resolution. `report()`
+returns the thresholds with pass/skip counts per reason, so the thresholds can
+be tuned against accuracy on a given book.
+"""
+
+from typing import Any, Dict, Tuple
+import time
+
+import numpy as np
+
+# Gray-level difference that counts as ink / as an edge between neighbours
+INK_DELTA = 24
+EDGE_DELTA = 32
+
+
+class VisualScreen:
+    """Thumbnail heuristics deciding which candidate visuals are worth full processing"""
+
+    def __init__(
+        self,
+        thumb_dpi: int = 36,
+        min_ink_ratio: float = 0.01,
+        min_edge_density: float = 0.004,
+        max_text_coverage: float = 0.6,
+        min_thumb_side: int = 8,
+    ):
+        self.thumb_dpi = thumb_dpi
+        self.min_ink_ratio = min_ink_ratio
+        self.min_edge_density = min_edge_density
+        self.max_text_coverage = max_text_coverage
+        self.min_thumb_side = min_thumb_side
+        self.passed = 0
+        self.skipped: Dict[str, int] = {}
+        self.seconds = 0.0
+
+    @staticmethod
+    def measure(gray: np.ndarray) -> Dict[str, float]:
+        """Ink ratio (vs. the most common gray level) and edge density of a thumbnail"""
+        gray = gray.astype(np.int16)
+        background = int(np.bincount(gray.ravel(), minlength=256).argmax())
+        ink_ratio = float(np.mean(np.abs(gray - background) > INK_DELTA))
+        edges = np.zeros(gray.shape, dtype=bool)
+        edges[:, 1:] |= np.abs(np.diff(gray, axis=1)) > EDGE_DELTA
+        edges[1:, :] |= np.abs(np.diff(gray, axis=0)) > EDGE_DELTA
+        return {'ink_ratio': ink_ratio, 'edge_density': float(edges.mean())}
+
+    def check(self, gray: np.ndarray, text_coverage: float = 0.0) -> Tuple[bool, str, Dict[str, float]]:
+        """(passed, reason, metrics) for a grayscale thumbnail of the region"""
+        started = time.perf_counter()
+        if min(gray.shape[:2]) < self.min_thumb_side:
+            passed, reason, metrics = False, 'too_small', {}
+        else:
+            metrics = self.measure(gray)
+            metrics['text_coverage'] = text_coverage
+            if metrics['ink_ratio'] < self.min_ink_ratio:
+                passed, reason = False, 'blank'
+            elif metrics['edge_density'] < self.min_edge_density:
+                passed, reason = False, 'decorative'
+            elif text_coverage > self.max_text_coverage:
+                passed, reason = False, 'text_block'
+            else:
+                passed, reason = True, 'passed'
+        if passed:
+            self.passed += 1
+        else:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        self.seconds += time.perf_counter() - started
+        return passed, reason, metrics
+
+    def report(self) -> Dict[str, Any]:
+        skipped = sum(self.skipped.values())
+        screened = self.passed + skipped
+        return {
+            'thresholds': {
+                'thumb_dpi': self.thumb_dpi,
+                'min_ink_ratio': self.min_ink_ratio,
+                'min_edge_density': self.min_edge_density,
+                'max_text_coverage': self.max_text_coverage,
+                'min_thumb_side': self.min_thumb_side,
+            },
+            'screened': screened,
+            'passed': self.passed,
+            'skipped': skipped,
+            'skipped_by_reason': dict(self.skipped),
+            'skip_ratio': round(skipped / screened, 4) if screened else 0.0,
+            'screen_seconds': round(self.seconds, 3),
+        }
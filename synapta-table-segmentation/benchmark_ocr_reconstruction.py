@@ -0,0 +1,235 @@
+"""
+Benchmark OCR table reconstruction on dense synthetic financial tables.
+
+Builds `pytesseract.image_to_data`-shaped dicts for 40x15 tables (jittered word
+boxes, multi-word labels, low-confidence noise), checks that the vectorized
+engine in ocr_table_reconstruction returns exactly the same cells/cell_bboxes
+as the previous per-word loop implementation, and times both.
+
+Usage:
+    python benchmark_ocr_reconstruction.py [--tables 50] [--rows 40] [--cols 15] [--repeat 3]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ocr_table_reconstruction import ocr_words_to_table
+
+
+def legacy_ocr_words_to_table(
+    ocr_data: Dict[str, List[Any]],
+    page_width: float,
+    page_height: float,
+    image_width: int,
+    image_height: int,
+) -> Optional[Dict[str, Any]]:
+    """Reference: the per-word loop implementation the engine replaced"""
+    words = []
+    scale_x = page_width / image_width if image_width else 1.0
+    scale_y = page_height / image_height if image_height else 1.0
+
+    for i, text in enumerate(ocr_data.get("text", [])):
+        if not text or not text.strip():
+            continue
+        conf = ocr_data.get("conf", [None])[i]
+        try:
+            conf_val = float(conf)
+        except (TypeError, ValueError):
+            conf_val = -1
+        if conf_val != -1 and conf_val < 40:
+            continue
+        x = ocr_data["left"][i]
+        y = ocr_data["top"][i]
+        w = ocr_data["width"][i]
+        h = ocr_data["height"][i]
+        x0 = x * scale_x
+        y0 = y * scale_y
+        x1 = (x + w) * scale_x
+        y1 = (y + h) * scale_y
+        words.append({
+            "text": text.strip(),
+            "x0": x0, "y0": y0, "x1": x1, "y1": y1,
+            "yc": (y0 + y1) / 2,
+            "xc": (x0 + x1) / 2,
+            "w": (x1 - x0),
+            "h": (y1 - y0),
+        })
+
+    if len(words) < 5:
+        return None
+
+    words.sort(key=lambda w: w["yc"])
+    heights = [w["h"] for w in words]
+    median_h = np.median(heights) if heights else 8
+    row_threshold = max(4.0, median_h * 0.6)
+    rows = []
+    current_row = []
+    current_y = None
+
+    for word in words:
+        if current_y is None or abs(word["yc"] - current_y) <= row_threshold:
+            current_row.append(word)
+            current_y = word["yc"] if current_y is None else (current_y + word["yc"]) / 2
+        else:
+            rows.append(current_row)
+            current_row = [word]
+            current_y = word["yc"]
+    if current_row:
+        rows.append(current_row)
+
+    if len(rows) < 2:
+        return None
+
+    x_positions = [w["x0"] for w in words]
+    median_w = np.median([w["w"] for w in words]) if words else 10
+    col_threshold = max(8.0, median_w * 1.2)
+    col_centers: List[float] = []
+    for x in sorted(x_positions):
+        placed = False
+        for i, center in enumerate(col_centers):
+            if abs(x - center) <= col_threshold:
+                col_centers[i] = (center + x) / 2
+                placed = True
+                break
+        if not placed:
+            col_centers.append(x)
+
+    col_centers = sorted(col_centers)
+    if len(col_centers) < 1:
+        return None
+
+    cells = []
+    cell_bboxes = []
+    for row in rows:
+        row_cells = [""] * len(col_centers)
+        row_bboxes = [None] * len(col_centers)
+        row.sort(key=lambda w: w["xc"])
+        for word in row:
+            col_idx = min(range(len(col_centers)), key=lambda i: abs(word["x0"] - col_centers[i]))
+            if row_cells[col_idx]:
+                row_cells[col_idx] += " " + word["text"]
+            else:
+                row_cells[col_idx] = word["text"]
+            bbox = row_bboxes[col_idx]
+            if bbox is None:
+                row_bboxes[col_idx] = (word["x0"], word["y0"], word["x1"], word["y1"])
+            else:
+                x0, y0, x1, y1 = bbox
+                row_bboxes[col_idx] = (
+                    min(x0, word["x0"]), min(y0, word["y0"]),
+                    max(x1, word["x1"]), max(y1, word["y1"])
+                )
+        cells.append(row_cells)
+        cell_bboxes.append(row_bboxes)
+
+    avg_filled = np.mean([sum(1 for c in row if c.strip()) for row in cells])
+    if avg_filled < 1.5:
+        return None
+
+    non_empty_rows = sum(1 for row in cells if any(c.strip() for c in row))
+    if non_empty_rows < 2:
+        return None
+
+    all_bboxes = [b for row in cell_bboxes for b in row if b]
+    if not all_bboxes:
+        return None
+    x0 = min(b[0] for b in all_bboxes)
+    y0 = min(b[1] for b in all_bboxes)
+    x1 = max(b[2] for b in all_bboxes)
+    y1 = max(b[3] for b in all_bboxes)
+
+    return {
+        "cells": cells,
+        "cell_bboxes": cell_bboxes,
+        "bbox": (x0, y0, x1, y1)
+    }
+
+
+def synthetic_financial_table(rng: random.Random, rows: int, cols: int) -> Dict[str, List[Any]]:
+    """Tesseract-style word dict for a dense numeric table with a label column"""
+    data: Dict[str, List[Any]] = {k: [] for k in ("text", "conf", "left", "top", "width", "height")}
+
+    def add(text: str, conf: Any, left: int, top: int, width: int, height: int) -> None:
+        data["text"].append(text)
+        data["conf"].append(conf)
+        data["left"].append(left)
+        data["top"].append(top)
+        data["width"].append(width)
+        data["height"].append(height)
+
+    labels = ["Net income", "Total assets", "Cash flow", "Dividends paid", "EPS", "Book value"]
+    row_pitch, label_width, col_pitch = 34, 220, 110
+    for r in range(rows):
+        top = 40 + r * row_pitch
+        # Tesseract emits empty block/line entries between words
+        add("", "-1", 0, top, 0, 0)
+        label_words = (labels[r % len(labels)] if r else "Year").split()
+        left = 20
+        for word in label_words:
+            width = 12 * len(word)
+            add(word, str(rng.randint(70, 96)), left + rng.randint(-2, 2), top + rng.randint(-2, 2), width, 22)
+            left += width + 10
+        for c in range(cols):
+            left = 20 + label_width + c * col_pitch + rng.randint(-3, 3)
+            if r == 0:
+                text = str(2010 + c)
+            elif rng.random() < 0.05:
+                text = "—"
+            else:
+                text = f"{rng.uniform(-5000, 50000):,.{rng.choice((0, 1, 2))}f}"
+                if rng.random() < 0.1:
+                    text = f"({text})"
+            add(text, str(rng.randint(55, 97)), left, top + rng.randint(-3, 3), 11 * len(text), 22)
+        # Low-confidence specks that must be filtered out
+        if rng.random() < 0.3:
+            add("~", str(rng.randint(0, 30)), rng.randint(0, 1800), top, 6, 6)
+    return data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=40)
+    parser.add_argument("--cols", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tables = [synthetic_financial_table(rng, args.rows, args.cols) for _ in range(args.tables)]
+    # 200 dpi render of a letter page -> page points
+    page_size = (612.0, 792.0, 1700, 2200)
+
+    mismatches = 0
+    for data in tables:
+        expected = legacy_ocr_words_to_table(data, *page_size)
+        actual = ocr_words_to_table(data, *page_size)
+        if expected != actual:
+            mismatches += 1
+    print(f"Parity: {args.tables - mismatches}/{args.tables} tables identical")
+
+    def timed(fn) -> float:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for data in tables:
+                fn(data, *page_size)
+            best = min(best, time.perf_counter() - start)
+        return best / len(tables) * 1000
+
+    legacy_ms = timed(legacy_ocr_words_to_table)
+    vectorized_ms = timed(ocr_words_to_table)
+    print(f"Tables: {args.tables} x ({args.rows} rows x {args.cols} cols), best of {args.repeat}")
+    print(f"  legacy loop:  {legacy_ms:8.2f} ms/table")
+    print(f"  vectorized:   {vectorized_ms:8.2f} ms/table")
+    print(f"  speedup:      {legacy_ms / vectorized_ms:8.1f}x")
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Concept index for table-to-concept linking.
+
+Built once per taxonomy: a row-normalized sentence-transformers embedding matrix
+(persisted under `.cache/` next to the taxonomy file, keyed by the file hash and
+model name) plus a keyword automaton over concept names/keywords. Linking a
+batch of tables is then one batched encode, one matrix product and a top-k
+selection, instead of re-embedding the whole taxonomy for every table.
+"""
+
+from collections import deque
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+SEMANTIC_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: every (case-insensitive) pattern occurring in a text, in one scan"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern.lower())
+        self._build_failure_links()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = nxt
+        self._output[state].add(pattern)
+
+    def _build_failure_links(self) -> None:
+        # Depth-1 states fail back to the root; deeper states follow their parent's failure chain
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._output[nxt] |= self._output[self._fail[nxt]]
+
+    def find(self, text: str) -> Set[str]:
+        """Return the set of (lowercased) patterns found anywhere in `text`"""
+        found: Set[str] = set()
+        state = 0
+        for ch in text.lower():
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._output[state]:
+                found |= self._output[state]
+        return found
+
+
+def _concept_text(concept_info: Dict[str, Any]) -> str:
+    return f"{concept_info.get('name', '')} {concept_info.get('description', '')} {' '.join(concept_info.get('keywords', []))}"
+
+
+def taxonomy_hash(concept_taxonomy: Dict[str, Any], taxonomy_path: Optional[Path] = None) -> str:
+    """Hash of the taxonomy file bytes (or of its canonical JSON when there is no file)"""
+    if taxonomy_path is not None and Path(taxonomy_path).exists():
+        blob = Path(taxonomy_path).read_bytes()
+    else:
+        blob = json.dumps(concept_taxonomy, sort_keys=True).encode("utf-8")
+    return hashlib.md5(blob).hexdigest()
+
+
+class ConceptIndex:
+    """Precomputed keyword + embedding lookup over one concept taxonomy"""
+
+    def __init__(
+        self,
+        concept_taxonomy: Dict[str, Any],
+        embeddings: Optional[np.ndarray] = None,
+        model: Any = None,
+    ):
+        self.concept_ids: List[str] = list(concept_taxonomy.keys())
+        self.names: List[str] = [concept_taxonomy[c].get('name', '') for c in self.concept_ids]
+        self.keywords: List[List[str]] = [list(concept_taxonomy[c].get('keywords', [])) for c in self.concept_ids]
+        self.embeddings = embeddings  # (n_concepts, dim), rows L2-normalized
+        self._model = model
+
+        # pattern -> concepts using it, so a text scan maps straight to concept matches
+        self._concepts_by_pattern: Dict[str, List[int]] = {}
+        # Concepts with an empty keyword/name always "match" it (empty substring)
+        self._always_matched: List[int] = []
+        for idx, (keywords, name) in enumerate(zip(self.keywords, self.names)):
+            for kw in keywords + [name]:
+                if not kw:
+                    self._always_matched.append(idx)
+                else:
+                    self._concepts_by_pattern.setdefault(kw.lower(), []).append(idx)
+        self.automaton = KeywordAutomaton(self._concepts_by_pattern.keys())
+
+    @classmethod
+    def load_or_build(
+        cls,
+        concept_taxonomy: Dict[str, Any],
+        taxonomy_path: Optional[Path] = None,
+        cache_dir: Optional[Path] = None,
+    ) -> "ConceptIndex":
+        """Load the embedding matrix from the on-disk cache, or build and persist it"""
+        if cache_dir is None:
+            base = Path(taxonomy_path).parent if taxonomy_path else Path(".")
+            cache_dir = base / ".cache"
+        key = hashlib.md5(f"{taxonomy_hash(concept_taxonomy, taxonomy_path)}::{SEMANTIC_MODEL_NAME}".encode()).hexdigest()
+        cache_file = Path(cache_dir) / f"concept_index_{key}.npz"
+        concept_ids = list(concept_taxonomy.keys())
+
+        if cache_file.exists():
+            try:
+                with np.load(cache_file, allow_pickle=False) as cached:
+                    if cached["concept_ids"].tolist() == concept_ids:
+                        print(f"ConceptIndex: Loaded {len(concept_ids)} concept embeddings from cache")
+                        return cls(concept_taxonomy, embeddings=cached["embeddings"])
+            except Exception as e:
+                print(f"ConceptIndex: Cache read failed: {e}")
+
+        model = None
+        embeddings = None
+        try:
+            model = _load_semantic_model()
+            if concept_ids:
+                raw = model.encode(
+                    [_concept_text(concept_taxonomy[c]) for c in concept_ids],
+                    convert_to_numpy=True,
+                )
+                embeddings = _normalize_rows(np.asarray(raw, dtype=np.float32))
+        except ImportError:
+            # sentence-transformers not available, keyword matching only
+            pass
+        except Exception as e:
+            print(f"ConceptIndex: Could not embed concepts: {e}")
+
+        if embeddings is not None:
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                np.savez(cache_file, embeddings=embeddings, concept_ids=np.array(concept_ids))
+                print(f"ConceptIndex: Cached {len(concept_ids)} concept embeddings to {cache_file}")
+            except Exception as e:
+                print(f"ConceptIndex: Cache write failed: {e}")
+
+        return cls(concept_taxonomy, embeddings=embeddings, model=model)
+
+    def keyword_matches(self, text: str) -> List[Tuple[str, float, List[str]]]:
+        """(concept_id, score, matched keywords) for every concept with a keyword in `text`"""
+        found = self.automaton.find(text)
+        hit_concepts = set(self._always_matched)
+        for pattern in found:
+            hit_concepts.update(self._concepts_by_pattern[pattern])
+
+        results = []
+        for idx in sorted(hit_concepts):
+            keywords = self.keywords[idx]
+            matches = [kw for kw in keywords + [self.names[idx]] if not kw or kw.lower() in found]
+            if matches:
+                # Score based on number of keyword matches
+                score = min(1.0, len(matches) / max(len(keywords), 1))
+                results.append((self.concept_ids[idx], score, matches))
+        return results
+
+    def semantic_matches(
+        self,
+        texts: List[str],
+        threshold: float = 0.3,
+        top_k: int = 5,
+        batch_size: int = 64,
+    ) -> List[List[Tuple[str, float]]]:
+        """Top-k (concept_id, cosine) per text above `threshold`; empty lists without embeddings"""
+        results: List[List[Tuple[str, float]]] = [[] for _ in texts]
+        if self.embeddings is None or not len(self.embeddings) or not texts:
+            return results
+        try:
+            if self._model is None:
+                self._model = _load_semantic_model()
+        except Exception:
+            return results
+
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            query = _normalize_rows(np.asarray(self._model.encode(batch, convert_to_numpy=True), dtype=np.float32))
+            similarities = query @ self.embeddings.T  # (batch, n_concepts)
+            for offset, row in enumerate(similarities):
+                candidates = np.flatnonzero(row >= threshold)
+                if len(candidates) > top_k:
+                    candidates = candidates[np.argpartition(-row[candidates], top_k - 1)[:top_k]]
+                ranked = sorted(candidates.tolist(), key=lambda i: (-row[i], i))
+                results[start + offset] = [(self.concept_ids[i], float(row[i])) for i in ranked]
+        return results
+
+
+def _load_semantic_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(SEMANTIC_MODEL_NAME)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
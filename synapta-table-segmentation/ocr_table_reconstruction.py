@@ -0,0 +1,192 @@
+"""
+Rebuild a row/column cell grid from Tesseract word boxes.
+
+Shared by the PDF page OCR fallback (TableExtractorImpl) and the cropped-image
+extractor (table_image_extractor). Word boxes are handled as NumPy arrays:
+rows are clustered by y-center and columns by x0, words are assigned to cells
+in bulk, and the per-cell text/bboxes are built from the grouped arrays.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Words below this Tesseract confidence are dropped (-1 means "no confidence")
+MIN_WORD_CONFIDENCE = 40
+
+
+def ocr_data_to_arrays(
+    ocr_data: Dict[str, List[Any]],
+    page_width: float,
+    page_height: float,
+    image_width: int,
+    image_height: int,
+) -> Tuple[List[str], np.ndarray]:
+    """Convert `pytesseract.image_to_data(..., output_type=DICT)` to word texts + boxes.
+
+    Returns the kept (stripped) word texts and an (n, 4) float array of
+    x0, y0, x1, y1 boxes scaled from image pixels to page coordinates.
+    """
+    texts = ocr_data.get("text", [])
+    confs = ocr_data.get("conf", [None])
+    keep: List[int] = []
+    words: List[str] = []
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            continue
+        try:
+            conf_val = float(confs[i])
+        except (TypeError, ValueError, IndexError):
+            conf_val = -1
+        if conf_val != -1 and conf_val < MIN_WORD_CONFIDENCE:
+            continue
+        keep.append(i)
+        words.append(text.strip())
+
+    if not keep:
+        return words, np.empty((0, 4), dtype=float)
+
+    idx = np.asarray(keep)
+    left = np.asarray(ocr_data["left"], dtype=float)[idx]
+    top = np.asarray(ocr_data["top"], dtype=float)[idx]
+    width = np.asarray(ocr_data["width"], dtype=float)[idx]
+    height = np.asarray(ocr_data["height"], dtype=float)[idx]
+
+    scale_x = page_width / image_width if image_width else 1.0
+    scale_y = page_height / image_height if image_height else 1.0
+    boxes = np.column_stack((
+        left * scale_x,
+        top * scale_y,
+        (left + width) * scale_x,
+        (top + height) * scale_y,
+    ))
+    return words, boxes
+
+
+def cluster_1d(values: np.ndarray, threshold: float) -> np.ndarray:
+    """Label already-sorted values by running-center clustering.
+
+    A value joins the current cluster when it is within `threshold` of the
+    cluster's running center (updated as `(center + value) / 2`), otherwise it
+    starts a new cluster. Since the values are sorted, a gap larger than the
+    threshold always starts a cluster and a gap-free run whose total span fits
+    within the threshold never breaks, so the sequential walk is only needed
+    inside the (rare) wide runs.
+    """
+    n = len(values)
+    labels = np.zeros(n, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    starts = np.zeros(n, dtype=bool)
+    starts[0] = True
+    starts[1:] = np.diff(values) > threshold
+
+    run_bounds = np.flatnonzero(starts).tolist() + [n]
+    for run_start, run_end in zip(run_bounds[:-1], run_bounds[1:]):
+        if values[run_end - 1] - values[run_start] <= threshold:
+            continue
+        center = values[run_start]
+        for i in range(run_start + 1, run_end):
+            value = values[i]
+            if abs(value - center) <= threshold:
+                center = (center + value) / 2
+            else:
+                starts[i] = True
+                center = value
+
+    return np.cumsum(starts) - 1
+
+
+def ocr_words_to_table(
+    ocr_data: Dict[str, List[Any]],
+    page_width: float,
+    page_height: float,
+    image_width: int,
+    image_height: int,
+) -> Optional[Dict[str, Any]]:
+    """Convert OCR words to a table-like structure when alignment is detected"""
+    words, boxes = ocr_data_to_arrays(ocr_data, page_width, page_height, image_width, image_height)
+
+    # Require at least 5 words for OCR table detection (more lenient)
+    if len(words) < 5:
+        return None
+
+    x0, y0, x1, y1 = boxes.T
+    yc = (y0 + y1) / 2
+    xc = (x0 + x1) / 2
+
+    # Cluster words into rows by y-center proximity
+    by_y = np.argsort(yc, kind="stable")
+    median_h = np.median(y1 - y0)
+    row_threshold = max(4.0, median_h * 0.6)
+    row_of = np.empty(len(words), dtype=np.int64)
+    row_of[by_y] = cluster_1d(yc[by_y], row_threshold)
+    n_rows = int(row_of.max()) + 1
+
+    # Require at least 2 rows (more lenient for OCR)
+    if n_rows < 2:
+        return None
+
+    # Cluster columns by x0 alignment
+    x_sorted = np.sort(x0)
+    median_w = np.median(x1 - x0)
+    col_threshold = max(8.0, median_w * 1.2)  # More lenient column detection
+    col_labels = cluster_1d(x_sorted, col_threshold)
+    n_cols = int(col_labels[-1]) + 1
+    col_centers = np.empty(n_cols, dtype=float)
+    # Running center of each column: replay the (center + x) / 2 update per cluster
+    col_starts = np.flatnonzero(np.diff(col_labels)) + 1
+    for col_idx, col_values in enumerate(np.split(x_sorted, col_starts)):
+        center = col_values[0]
+        for x in col_values[1:]:
+            center = (center + x) / 2
+        col_centers[col_idx] = center
+
+    # Assign every word to its nearest column center (first center wins ties)
+    col_of = np.abs(x0[:, None] - col_centers[None, :]).argmin(axis=1)
+
+    # Group words by cell, left-to-right by x-center inside a row
+    order = by_y[np.lexsort((xc[by_y], row_of[by_y]))]
+    cell_of = row_of[order] * n_cols + col_of[order]
+
+    n_cells = n_rows * n_cols
+    cell_x0 = np.full(n_cells, np.inf)
+    cell_y0 = np.full(n_cells, np.inf)
+    cell_x1 = np.full(n_cells, -np.inf)
+    cell_y1 = np.full(n_cells, -np.inf)
+    np.minimum.at(cell_x0, cell_of, x0[order])
+    np.minimum.at(cell_y0, cell_of, y0[order])
+    np.maximum.at(cell_x1, cell_of, x1[order])
+    np.maximum.at(cell_y1, cell_of, y1[order])
+
+    cell_words: List[List[str]] = [[] for _ in range(n_cells)]
+    for cell, word_idx in zip(cell_of.tolist(), order.tolist()):
+        cell_words[cell].append(words[word_idx])
+
+    filled = np.isfinite(cell_x0)
+    cell_box_rows = np.column_stack((cell_x0, cell_y0, cell_x1, cell_y1)).tolist()
+    cells = []
+    cell_bboxes = []
+    for r in range(n_rows):
+        row_slice = range(r * n_cols, (r + 1) * n_cols)
+        cells.append([" ".join(cell_words[c]) for c in row_slice])
+        cell_bboxes.append([tuple(cell_box_rows[c]) if filled[c] else None for c in row_slice])
+
+    # Check if we have enough filled cells (more lenient for OCR)
+    filled_per_row = filled.reshape(n_rows, n_cols).sum(axis=1)
+    if np.mean(filled_per_row) < 1.5:  # More lenient threshold
+        return None
+
+    # Additional check: ensure we have at least some structure
+    if int((filled_per_row > 0).sum()) < 2:
+        return None
+
+    return {
+        "cells": cells,
+        "cell_bboxes": cell_bboxes,
+        "bbox": (
+            float(cell_x0[filled].min()), float(cell_y0[filled].min()),
+            float(cell_x1[filled].max()), float(cell_y1[filled].max()),
+        ),
+    }
@@ -4,11 +4,12 @@ Implementation of table extraction using pdfplumber, camelot, and fallback metho
 
 import pdfplumber
 import pymupdf
-import numpy as np
 import pandas as pd
 from typing import List, Dict, Optional, Tuple, Any, Set
 import re
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Optional dependencies
@@ -47,85 +48,212 @@ except ImportError:
     OCR_AVAILABLE = False
     pytesseract = None
     Image = None
+# Document-level reference index shared with Segmentation_pipeline.reference_extractor
+# (loaded by file path so the pipeline package and its heavy imports are not pulled in)
+try:
+    import importlib.util
+    _ref_spec = importlib.util.spec_from_file_location(
+        "_synapta_reference_extractor",
+        Path(__file__).resolve().parents[1] / "Segmentation_pipeline" / "reference_extractor.py",
+    )
+    _ref_module = importlib.util.module_from_spec(_ref_spec)
+    _ref_spec.loader.exec_module(_ref_module)
+    ReferenceIndex = _ref_module.ReferenceIndex
+    REFERENCE_INDEX_AVAILABLE = True
+except Exception:
+    REFERENCE_INDEX_AVAILABLE = False
+    ReferenceIndex = None
 from table_segment import (
     TableSegment, TableExtractor, CellMeta, CellType, FormulaCell,
     DerivedColumn, TableLink, LinkType, SourceAnchor, generate_segment_id,
     normalize_cell_value, detect_cell_type
 )
+from ocr_table_reconstruction import ocr_words_to_table
+from concept_index import ConceptIndex
+
+# Word fields kept from pdfplumber.extract_words() for caption/keyword checks
+_WORD_KEYS = ("text", "x0", "x1", "top", "bottom")
+
+
+def _classify_page(text_length: int, lines: List[Dict], has_images: bool) -> str:
+    """Classify a page as 'text', 'grid', 'image' or 'unknown'"""
+    # Count horizontal and vertical lines (grid indicators)
+    horizontal_lines = sum(1 for line in lines if abs(line['y1'] - line['y0']) < 2)
+    vertical_lines = sum(1 for line in lines if abs(line['x1'] - line['x0']) < 2)
+    total_lines = len(lines)
+
+    # 1. If page has substantial text (>200 chars), it's text-based
+    if text_length > 200:
+        return 'text'
+
+    # 2. If page has many lines forming a grid (10+ lines, mix of horizontal/vertical), it's grid-based
+    if total_lines >= 10 and horizontal_lines >= 3 and vertical_lines >= 3:
+        return 'grid'
+
+    # 3. If page has images but minimal text (<50 chars), it's image-based
+    if has_images and text_length < 50:
+        return 'image'
+
+    # 4. If page has some text (50-200 chars) and some lines, could be grid or text
+    if text_length >= 50 and total_lines >= 5:
+        # Prefer grid if more lines, otherwise text
+        if total_lines >= 15:
+            return 'grid'
+        return 'text'
+
+    # 5. If minimal text and no clear structure, likely image-based
+    if text_length < 50:
+        return 'image'
+
+    # Default: unknown, will try all methods
+    return 'unknown'
+
+
+def _pdfplumber_table_cells(table_obj) -> Tuple[List[List[str]], List[List[Any]]]:
+    """Read the cell matrix (and bboxes when available) from a pdfplumber table"""
+    cells = []
+    cell_bboxes = []
+
+    # Use extract() method which returns list of lists
+    extracted = table_obj.extract()
+    if extracted:
+        for row in extracted:
+            row_cells = []
+            row_bboxes = []
+            for cell in row:
+                # Handle None, string, or other types
+                if cell is None:
+                    text = ""
+                else:
+                    text = str(cell).strip()
+                row_cells.append(text)
+                row_bboxes.append(None)  # extract() doesn't provide bbox
+            cells.append(row_cells)
+            cell_bboxes.append(row_bboxes)
+    else:
+        # Fallback: try rows.cells
+        for row in table_obj.rows:
+            row_cells = []
+            row_bboxes = []
+            for cell in row.cells:
+                # Handle both cell objects and tuples
+                if isinstance(cell, tuple):
+                    text = str(cell[0]).strip() if cell and len(cell) > 0 and cell[0] else ""
+                    bbox = cell[1] if len(cell) > 1 else None
+                elif hasattr(cell, 'text'):
+                    text = cell.text.strip() if cell.text else ""
+                    bbox = cell.bbox if hasattr(cell, 'bbox') else None
+                else:
+                    text = str(cell).strip() if cell else ""
+                    bbox = None
+                row_cells.append(text)
+                row_bboxes.append(bbox)
+            cells.append(row_cells)
+            cell_bboxes.append(row_bboxes)
+
+    return cells, cell_bboxes
+
+
+def _scan_pages(pdf_path: str, page_numbers: List[int]) -> List[Dict[str, Any]]:
+    """Visit each page once: text, page type and candidate pdfplumber table regions.
+
+    Runs in a worker process, so everything returned is plain picklable data
+    (no pdfplumber page/table objects).
+    """
+    results = []
+    doc = None
+    try:
+        doc = pymupdf.open(pdf_path)
+    except Exception:
+        doc = None
+
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num in page_numbers:
+            page = pdf.pages[page_num - 1]
+            entry = {'page': page_num, 'text': "", 'page_type': 'unknown', 'regions': []}
+            try:
+                text = page.extract_text() or ""
+                entry['text'] = text
+
+                has_images = False
+                if doc is not None and page_num <= len(doc):
+                    try:
+                        has_images = len(doc[page_num - 1].get_images()) > 0
+                    except Exception:
+                        pass
+                entry['page_type'] = _classify_page(len(text.strip()), page.lines, has_images)
+
+                # Detect tables by finding aligned columns
+                tables_on_page = page.find_tables()
+                words = None
+                for table in tables_on_page:
+                    if words is None:
+                        words = [
+                            {key: word.get(key) for key in _WORD_KEYS}
+                            for word in page.extract_words()
+                        ]
+                    region = {
+                        'page': page_num,
+                        'bbox': tuple(table.bbox),
+                        'extractor': 'pdfplumber',
+                        'words': words,
+                    }
+                    try:
+                        region['cells'], region['cell_bboxes'] = _pdfplumber_table_cells(table)
+                    except Exception as e:
+                        region['cell_error'] = str(e)
+                    entry['regions'].append(region)
+            except Exception as e:
+                print(f"  Page {page_num}: scan error - {e}")
+            finally:
+                # Release pdfplumber's per-page object cache
+                page.flush_cache()
+            results.append(entry)
+
+    if doc is not None:
+        doc.close()
+    return results
 
 
 class TableExtractorImpl(TableExtractor):
     """Concrete implementation of table extraction"""
     
-    def __init__(self, pdf_path: str, use_ocr: bool = False, page_range: Optional[Tuple[int, int]] = None):
+    def __init__(
+        self,
+        pdf_path: str,
+        use_ocr: bool = False,
+        page_range: Optional[Tuple[int, int]] = None,
+        max_workers: Optional[int] = None,
+    ):
         super().__init__(pdf_path, use_ocr)
         self.pdf_doc = None
         self.pages_text = []
         self.page_range = page_range  # (start_page, end_page) inclusive, 1-indexed
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.document_text = ""
         self.page_text_by_number: Dict[int, str] = {}
+        self.page_types: Dict[int, str] = {}  # page_num -> 'text', 'grid', 'image', 'unknown'
+        self._pdfplumber_regions: List[Dict] = []
         self.concept_taxonomy: Dict[str, Any] = {}
-        self._load_document_text()
+        self.concept_taxonomy_path: Optional[Path] = None
+        self._concept_index: Optional[ConceptIndex] = None
+        self._concept_index_source: Optional[int] = None
+        self._reference_index = None
+        self._reference_index_source: Optional[int] = None
+        self._scan_document()
         self.concept_taxonomy = self._load_concept_taxonomy()
         
     def extract_all_tables(self) -> List[TableSegment]:
         """Extract all tables from PDF using smart detection to choose best method per page"""
         self.tables = []
         
-        # Step 1: Detect page types for all pages (smart detection)
+        # Step 1: Page types were detected for every page during the document scan
         print("\nAnalyzing page types to choose best extraction method...")
-        page_types = {}  # page_num -> 'text', 'grid', 'image', 'unknown'
-        text_pages = []
-        grid_pages = []
-        image_pages = []
-        unknown_pages = []
-        
-        try:
-            import pdfplumber
-            with pdfplumber.open(self.pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                if self.page_range:
-                    start_page, end_page = self.page_range
-                else:
-                    start_page, end_page = 1, total_pages
-                
-                pages_to_check = min(100, end_page - start_page + 1)  # Sample first 100 pages for detection
-                print(f"  Sampling {pages_to_check} pages for type detection...")
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    if page_num < start_page or page_num > end_page:
-                        continue
-                    if page_num > start_page + pages_to_check - 1:
-                        # For remaining pages, use pattern from detected pages
-                        break
-                    
-                    page_type = self._detect_page_type(page_num, page)
-                    page_types[page_num] = page_type
-                    
-                    if page_type == 'text':
-                        text_pages.append(page_num)
-                    elif page_type == 'grid':
-                        grid_pages.append(page_num)
-                    elif page_type == 'image':
-                        image_pages.append(page_num)
-                    else:
-                        unknown_pages.append(page_num)
-                
-                # For pages beyond sample, use most common type or 'text' as default
-                most_common_type = 'text'
-                if len(text_pages) > len(grid_pages) and len(text_pages) > len(image_pages):
-                    most_common_type = 'text'
-                elif len(grid_pages) > len(image_pages):
-                    most_common_type = 'grid'
-                else:
-                    most_common_type = 'image'
-                
-                print(f"  Detected: {len(text_pages)} text-based, {len(grid_pages)} grid-based, {len(image_pages)} image-based, {len(unknown_pages)} unknown")
-                print(f"  Using '{most_common_type}' as default for remaining pages")
-        except Exception as e:
-            print(f"  Warning: Page type detection failed: {e}")
-            print(f"  Falling back to standard extraction methods")
-            page_types = {}
+        text_pages = [p for p, t in self.page_types.items() if t == 'text']
+        grid_pages = [p for p, t in self.page_types.items() if t == 'grid']
+        image_pages = [p for p, t in self.page_types.items() if t == 'image']
+        unknown_pages = [p for p, t in self.page_types.items() if t == 'unknown']
+        print(f"  Detected: {len(text_pages)} text-based, {len(grid_pages)} grid-based, {len(image_pages)} image-based, {len(unknown_pages)} unknown")
         
         # Step 2: Extract tables using appropriate method based on page type
         pdfplumber_tables = []
@@ -202,26 +330,63 @@ class TableExtractorImpl(TableExtractor):
         if skipped_count > 0:
             print(f"\nSkipped {skipped_count} invalid/error tables, kept {len(self.tables)} valid tables")
         
+        # Concept and cross-reference linking for the kept tables (concepts in one batch)
+        self._link_tables(self.tables)
+        
         return self.tables
 
-    def _load_document_text(self) -> None:
-        """Load full document text for reference linking"""
+    def _scan_document(self) -> None:
+        """Single pass over the PDF: page text, page types and pdfplumber table regions.
+
+        Pages are sharded into contiguous ranges across worker processes; each
+        worker opens its own pdfplumber/pymupdf handles and visits every page once.
+        """
         try:
             with pdfplumber.open(self.pdf_path) as pdf:
-                texts = []
-                for page_num, page in enumerate(pdf.pages, 1):
-                    if self.page_range:
-                        start_page, end_page = self.page_range
-                        if page_num < start_page or page_num > end_page:
-                            continue
-                    page_text = page.extract_text() or ""
-                    self.page_text_by_number[page_num] = page_text
-                    texts.append(page_text)
-                self.document_text = "\n".join(texts)
+                total_pages = len(pdf.pages)
         except Exception as e:
-            print(f"Warning: could not load document text: {e}")
+            print(f"Warning: could not open PDF for scanning: {e}")
             self.document_text = ""
             self.page_text_by_number = {}
+            return
+
+        print(f"PDF has {total_pages} total pages")
+        if self.page_range:
+            start_page, end_page = self.page_range
+            start_page, end_page = max(1, start_page), min(total_pages, end_page)
+        else:
+            start_page, end_page = 1, total_pages
+        page_numbers = list(range(start_page, end_page + 1))
+        if not page_numbers:
+            return
+
+        workers = max(1, min(self.max_workers, len(page_numbers)))
+        # Several shards per worker so one slow (table-heavy) range doesn't stall the pool
+        shard_count = min(len(page_numbers), workers * 4)
+        shard_size = -(-len(page_numbers) // shard_count)
+        shards = [page_numbers[i:i + shard_size] for i in range(0, len(page_numbers), shard_size)]
+
+        print(f"Scanning {len(page_numbers)} pages in {len(shards)} shard(s) with {workers} worker(s)...")
+        scanned: List[Dict[str, Any]] = []
+        if workers > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for shard_result in executor.map(_scan_pages, [self.pdf_path] * len(shards), shards):
+                        scanned.extend(shard_result)
+                        print(f"  Progress: {len(scanned)}/{len(page_numbers)} pages scanned...")
+            except Exception as e:
+                print(f"  Warning: parallel page scan failed ({e}), falling back to a single process")
+                scanned = []
+        if not scanned:
+            for shard in shards:
+                scanned.extend(_scan_pages(self.pdf_path, shard))
+                print(f"  Progress: {len(scanned)}/{len(page_numbers)} pages scanned...")
+
+        scanned.sort(key=lambda entry: entry['page'])
+        self.page_text_by_number = {entry['page']: entry['text'] for entry in scanned}
+        self.document_text = "\n".join(entry['text'] for entry in scanned)
+        self.page_types = {entry['page']: entry['page_type'] for entry in scanned}
+        self._pdfplumber_regions = [region for entry in scanned for region in entry['regions']]
 
     def _load_concept_taxonomy(self) -> Dict[str, Any]:
         """Load concept taxonomy from a local JSON file if present"""
@@ -234,15 +399,25 @@ class TableExtractorImpl(TableExtractor):
             if candidate.exists():
                 try:
                     with open(candidate, "r", encoding="utf-8") as f:
-                        return json.load(f)
+                        taxonomy = json.load(f)
+                    self.concept_taxonomy_path = candidate
+                    return taxonomy
                 except Exception as e:
                     print(f"Warning: could not load concept taxonomy from {candidate}: {e}")
                     return {}
         return {}
+
+    def _get_concept_index(self, concept_taxonomy: Dict) -> ConceptIndex:
+        """Concept index for a taxonomy, built (or loaded from disk) once per taxonomy"""
+        if self._concept_index is None or self._concept_index_source != id(concept_taxonomy):
+            taxonomy_path = self.concept_taxonomy_path if concept_taxonomy is self.concept_taxonomy else None
+            self._concept_index = ConceptIndex.load_or_build(concept_taxonomy, taxonomy_path=taxonomy_path)
+            self._concept_index_source = id(concept_taxonomy)
+        return self._concept_index
     
-    def _has_table_keyword(self, page_obj, table_bbox) -> bool:
+    def _has_table_keyword(self, words: Optional[List[Dict]], table_bbox) -> bool:
         """Check if 'Table' keyword exists near the table (above or below)"""
-        if not table_bbox or not page_obj:
+        if not table_bbox or not words:
             return False
         
         x0, y0, x1, y1 = table_bbox
@@ -250,10 +425,6 @@ class TableExtractorImpl(TableExtractor):
         table_center_x = (x0 + x1) / 2
         
         try:
-            words = page_obj.extract_words()
-            if not words:
-                return False
-            
             # Look for "Table" keyword above or below the table
             for word in words:
                 word_text = word.get('text', '').strip()
@@ -279,75 +450,9 @@ class TableExtractorImpl(TableExtractor):
         except Exception:
             return False
     
-    def _detect_page_type(self, page_num: int, page_obj) -> str:
-        """Detect page type to determine best extraction method
-        
-        Returns:
-            'text' - Page has extractable text (use pdfplumber/tabula)
-            'grid' - Page has grid lines/borders (use camelot)
-            'image' - Page is mostly image-based (use OCR)
-            'unknown' - Couldn't determine, try all methods
-        """
-        try:
-            # Check 1: Extract text to see if page has text content
-            text = page_obj.extract_text() or ""
-            text_length = len(text.strip())
-            
-            # Check 2: Look for lines/rectangles (indicating grid structure)
-            lines = page_obj.lines
-            rects = page_obj.rects
-            
-            # Count horizontal and vertical lines (grid indicators)
-            horizontal_lines = sum(1 for line in lines if abs(line['y1'] - line['y0']) < 2)
-            vertical_lines = sum(1 for line in lines if abs(line['x1'] - line['x0']) < 2)
-            total_lines = len(lines)
-            
-            # Check 3: Look for images (using pymupdf for better image detection)
-            has_images = False
-            try:
-                doc = pymupdf.open(self.pdf_path)
-                if page_num <= len(doc):
-                    page_pymupdf = doc[page_num - 1]
-                    image_list = page_pymupdf.get_images()
-                    has_images = len(image_list) > 0
-                    doc.close()
-            except Exception:
-                pass
-            
-            # Decision logic:
-            # 1. If page has substantial text (>200 chars), it's text-based
-            if text_length > 200:
-                return 'text'
-            
-            # 2. If page has many lines forming a grid (10+ lines, mix of horizontal/vertical), it's grid-based
-            if total_lines >= 10 and horizontal_lines >= 3 and vertical_lines >= 3:
-                return 'grid'
-            
-            # 3. If page has images but minimal text (<50 chars), it's image-based
-            if has_images and text_length < 50:
-                return 'image'
-            
-            # 4. If page has some text (50-200 chars) and some lines, could be grid or text
-            if text_length >= 50 and total_lines >= 5:
-                # Prefer grid if more lines, otherwise text
-                if total_lines >= 15:
-                    return 'grid'
-                return 'text'
-            
-            # 5. If minimal text and no clear structure, likely image-based
-            if text_length < 50:
-                return 'image'
-            
-            # Default: unknown, will try all methods
-            return 'unknown'
-            
-        except Exception as e:
-            # If detection fails, return unknown
-            return 'unknown'
-    
-    def _has_figure_or_chart_keyword(self, page_obj, table_bbox, caption: str = "") -> bool:
+    def _has_figure_or_chart_keyword(self, words: Optional[List[Dict]], table_bbox, caption: str = "") -> bool:
         """Check if 'Figure' or 'Chart' keyword exists near the table - indicates it's NOT a table"""
-        if not table_bbox or not page_obj:
+        if not table_bbox or not words:
             # Check caption if provided
             if caption:
                 caption_lower = caption.lower()
@@ -366,10 +471,6 @@ class TableExtractorImpl(TableExtractor):
                 if any(keyword in caption_lower for keyword in ['figure', 'chart', 'graph', 'diagram']):
                     return True
             
-            words = page_obj.extract_words()
-            if not words:
-                return False
-            
             # Look for "Figure", "Chart", "Graph", "Diagram" keywords above or below the table
             for word in words:
                 word_text = word.get('text', '').strip()
@@ -402,10 +503,10 @@ class TableExtractorImpl(TableExtractor):
         # CRITICAL CHECK: Reject anything labeled as "Figure", "Chart", "Graph", or "Diagram"
         # These are visualizations, not tables
         if region and region.get('extractor') == 'pdfplumber':
-            page_obj = region.get('page_obj')
+            words = region.get('words')
             table_bbox = region.get('bbox')
-            if page_obj and table_bbox:
-                has_figure_keyword = self._has_figure_or_chart_keyword(page_obj, table_bbox, table.caption)
+            if words and table_bbox:
+                has_figure_keyword = self._has_figure_or_chart_keyword(words, table_bbox, table.caption)
                 if has_figure_keyword:
                     return False, "labeled as Figure/Chart/Graph/Diagram (not a table)"
         
@@ -418,10 +519,10 @@ class TableExtractorImpl(TableExtractor):
         # CRITICAL CHECK: Look for "Table" keyword near the table
         # This helps filter out MCQ boxes, text blocks, and other false positives
         if region and region.get('extractor') == 'pdfplumber':
-            page_obj = region.get('page_obj')
+            words = region.get('words')
             table_bbox = region.get('bbox')
-            if page_obj and table_bbox:
-                has_table_keyword = self._has_table_keyword(page_obj, table_bbox)
+            if words and table_bbox:
+                has_table_keyword = self._has_table_keyword(words, table_bbox)
                 if not has_table_keyword:
                     # Allow exception: if table has strong structure indicators, it might still be valid
                     # But prioritize tables with "Table" keyword
@@ -464,10 +565,10 @@ class TableExtractorImpl(TableExtractor):
         # CRITICAL: Check for "Table" keyword - this is the main filter for MCQ boxes
         has_table_keyword = False
         if region and region.get('extractor') == 'pdfplumber':
-            page_obj = region.get('page_obj')
+            words = region.get('words')
             table_bbox = region.get('bbox')
-            if page_obj and table_bbox:
-                has_table_keyword = self._has_table_keyword(page_obj, table_bbox)
+            if words and table_bbox:
+                has_table_keyword = self._has_table_keyword(words, table_bbox)
         
         # If no "Table" keyword found, require stronger evidence it's a real table
         if not has_table_keyword:
@@ -538,53 +639,14 @@ class TableExtractorImpl(TableExtractor):
         return False, "insufficient structure and no 'Table' keyword"
     
     def _extract_with_pdfplumber(self) -> List[Dict]:
-        """Extract tables using pdfplumber"""
-        tables = []
-        try:
-            with pdfplumber.open(self.pdf_path) as pdf:
-                total_pages = len(pdf.pages)
-                print(f"PDF has {total_pages} total pages")
-                
-                pages_checked = 0
-                total_pages_in_range = len(pdf.pages)
-                if self.page_range:
-                    start_page, end_page = self.page_range
-                    total_pages_in_range = end_page - start_page + 1
-                
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Apply page range filter
-                    if self.page_range:
-                        start_page, end_page = self.page_range
-                        if page_num < start_page or page_num > end_page:
-                            continue
-                    
-                    pages_checked += 1
-                    # Show progress every 50 pages
-                    if pages_checked % 50 == 0 or pages_checked == total_pages_in_range:
-                        print(f"  Progress: {pages_checked}/{total_pages_in_range} pages checked...")
-                    
-                    # Detect tables by finding aligned columns
-                    tables_on_page = page.find_tables()
-                    
-                    if len(tables_on_page) > 0:
-                        print(f"  Page {page_num}: Found {len(tables_on_page)} table(s)")
-                    
-                    for table in tables_on_page:
-                        bbox = table.bbox
-                        tables.append({
-                            'page': page_num,
-                            'bbox': bbox,
-                            'extractor': 'pdfplumber',
-                            'table_obj': table,
-                            'page_obj': page
-                        })
-                
-                print(f"Checked {pages_checked} pages in range, found {len(tables)} table regions via pdfplumber")
-        except Exception as e:
-            print(f"pdfplumber extraction error: {e}")
-            import traceback
-            traceback.print_exc()
-        
+        """Table regions found by pdfplumber during the document scan"""
+        tables = list(self._pdfplumber_regions)
+        pages_with_tables: Dict[int, int] = {}
+        for region in tables:
+            pages_with_tables[region['page']] = pages_with_tables.get(region['page'], 0) + 1
+        for page_num, count in sorted(pages_with_tables.items()):
+            print(f"  Page {page_num}: Found {count} table(s)")
+        print(f"Checked {len(self.page_types)} pages in range, found {len(tables)} table regions via pdfplumber")
         return tables
     
     def _extract_with_camelot(self, pages_to_skip: Set[int] = None, specific_pages: Set[int] = None) -> List[Dict]:
@@ -771,7 +833,7 @@ class TableExtractorImpl(TableExtractor):
 
                     # Run OCR
                     ocr_data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-                    table_data = self._ocr_words_to_table(ocr_data, page.rect.width, page.rect.height, pix.width, pix.height)
+                    table_data = ocr_words_to_table(ocr_data, page.rect.width, page.rect.height, pix.width, pix.height)
                     
                     if table_data and len(table_data.get("cells", [])) >= 2:
                         print(f"    Page {page_num}: OCR detected table structure ({len(table_data['cells'])} rows)")
@@ -795,143 +857,6 @@ class TableExtractorImpl(TableExtractor):
         
         return tables
 
-    def _ocr_words_to_table(
-        self,
-        ocr_data: Dict[str, List[Any]],
-        page_width: float,
-        page_height: float,
-        image_width: int,
-        image_height: int
-    ) -> Optional[Dict[str, Any]]:
-        """Convert OCR words to a table-like structure when alignment is detected"""
-        words = []
-        scale_x = page_width / image_width
-        scale_y = page_height / image_height
-
-        for i, text in enumerate(ocr_data.get("text", [])):
-            if not text or not text.strip():
-                continue
-            conf = ocr_data.get("conf", [None])[i]
-            try:
-                conf_val = float(conf)
-            except (TypeError, ValueError):
-                conf_val = -1
-            if conf_val != -1 and conf_val < 40:
-                continue
-            x = ocr_data["left"][i]
-            y = ocr_data["top"][i]
-            w = ocr_data["width"][i]
-            h = ocr_data["height"][i]
-            x0 = x * scale_x
-            y0 = y * scale_y
-            x1 = (x + w) * scale_x
-            y1 = (y + h) * scale_y
-            words.append({
-                "text": text.strip(),
-                "x0": x0, "y0": y0, "x1": x1, "y1": y1,
-                "yc": (y0 + y1) / 2,
-                "xc": (x0 + x1) / 2,
-                "w": (x1 - x0),
-                "h": (y1 - y0),
-            })
-
-        # Require at least 5 words for OCR table detection (more lenient)
-        if len(words) < 5:
-            return None
-
-        # Cluster words into rows by y-center proximity
-        words.sort(key=lambda w: w["yc"])
-        heights = [w["h"] for w in words]
-        median_h = np.median(heights) if heights else 8
-        row_threshold = max(4.0, median_h * 0.6)
-        rows = []
-        current_row = []
-        current_y = None
-
-        for word in words:
-            if current_y is None or abs(word["yc"] - current_y) <= row_threshold:
-                current_row.append(word)
-                current_y = word["yc"] if current_y is None else (current_y + word["yc"]) / 2
-            else:
-                rows.append(current_row)
-                current_row = [word]
-                current_y = word["yc"]
-        if current_row:
-            rows.append(current_row)
-
-        # Require at least 2 rows (more lenient for OCR)
-        if len(rows) < 2:
-            return None
-
-        # Cluster columns by x0 alignment
-        x_positions = [w["x0"] for w in words]
-        median_w = np.median([w["w"] for w in words]) if words else 10
-        col_threshold = max(8.0, median_w * 1.2)  # More lenient column detection
-        col_centers = []
-        for x in sorted(x_positions):
-            placed = False
-            for i, center in enumerate(col_centers):
-                if abs(x - center) <= col_threshold:
-                    col_centers[i] = (center + x) / 2
-                    placed = True
-                    break
-            if not placed:
-                col_centers.append(x)
-
-        col_centers = sorted(col_centers)
-        # Allow single column if it has multiple rows (could be a list/table)
-        if len(col_centers) < 1:
-            return None
-
-        # Build cell grid
-        cells = []
-        cell_bboxes = []
-        for row in rows:
-            row_cells = [""] * len(col_centers)
-            row_bboxes = [None] * len(col_centers)
-            row.sort(key=lambda w: w["xc"])
-            for word in row:
-                col_idx = min(range(len(col_centers)), key=lambda i: abs(word["x0"] - col_centers[i]))
-                if row_cells[col_idx]:
-                    row_cells[col_idx] += " " + word["text"]
-                else:
-                    row_cells[col_idx] = word["text"]
-                bbox = row_bboxes[col_idx]
-                if bbox is None:
-                    row_bboxes[col_idx] = (word["x0"], word["y0"], word["x1"], word["y1"])
-                else:
-                    x0, y0, x1, y1 = bbox
-                    row_bboxes[col_idx] = (
-                        min(x0, word["x0"]), min(y0, word["y0"]),
-                        max(x1, word["x1"]), max(y1, word["y1"])
-                    )
-            cells.append(row_cells)
-            cell_bboxes.append(row_bboxes)
-
-        # Check if we have enough filled cells (more lenient for OCR)
-        avg_filled = np.mean([sum(1 for c in row if c.strip()) for row in cells])
-        if avg_filled < 1.5:  # More lenient threshold
-            return None
-        
-        # Additional check: ensure we have at least some structure
-        non_empty_rows = sum(1 for row in cells if any(c.strip() for c in row))
-        if non_empty_rows < 2:
-            return None
-
-        all_bboxes = [b for row in cell_bboxes for b in row if b]
-        if not all_bboxes:
-            return None
-        x0 = min(b[0] for b in all_bboxes)
-        y0 = min(b[1] for b in all_bboxes)
-        x1 = max(b[2] for b in all_bboxes)
-        y1 = max(b[3] for b in all_bboxes)
-
-        return {
-            "cells": cells,
-            "cell_bboxes": cell_bboxes,
-            "bbox": (x0, y0, x1, y1)
-        }
-    
     def _merge_table_regions(self, *table_lists) -> List[Dict]:
         """Merge and deduplicate table regions from multiple extractors"""
         merged = []
@@ -964,63 +889,20 @@ class TableExtractorImpl(TableExtractor):
         return None
     
     def _reconstruct_from_pdfplumber(self, region: Dict) -> Optional[TableSegment]:
-        """Reconstruct from pdfplumber table object"""
-        table_obj = region['table_obj']
-        page_obj = region['page_obj']
+        """Reconstruct from the cells read off a pdfplumber table during the scan"""
         page_num = region['page']
         
-        # Extract cells - handle different pdfplumber formats
-        cells = []
-        cell_bboxes = []
-        
-        try:
-            # Use extract() method which returns list of lists
-            extracted = table_obj.extract()
-            if extracted:
-                for row in extracted:
-                    row_cells = []
-                    row_bboxes = []
-                    for cell in row:
-                        # Handle None, string, or other types
-                        if cell is None:
-                            text = ""
-                            bbox = None
-                        else:
-                            text = str(cell).strip()
-                            bbox = None  # extract() doesn't provide bbox
-                        row_cells.append(text)
-                        row_bboxes.append(bbox)
-                    cells.append(row_cells)
-                    cell_bboxes.append(row_bboxes)
-            else:
-                # Fallback: try rows.cells
-                for row in table_obj.rows:
-                    row_cells = []
-                    row_bboxes = []
-                    for cell in row.cells:
-                        # Handle both cell objects and tuples
-                        if isinstance(cell, tuple):
-                            text = str(cell[0]).strip() if cell and len(cell) > 0 and cell[0] else ""
-                            bbox = cell[1] if len(cell) > 1 else None
-                        elif hasattr(cell, 'text'):
-                            text = cell.text.strip() if cell.text else ""
-                            bbox = cell.bbox if hasattr(cell, 'bbox') else None
-                        else:
-                            text = str(cell).strip() if cell else ""
-                            bbox = None
-                        row_cells.append(text)
-                        row_bboxes.append(bbox)
-                    cells.append(row_cells)
-                    cell_bboxes.append(row_bboxes)
-        except Exception as e:
-            print(f"Could not extract cells from pdfplumber table: {e}")
+        if region.get('cell_error'):
+            print(f"Could not extract cells from pdfplumber table: {region['cell_error']}")
             return None
+        cells = region.get('cells') or []
+        cell_bboxes = region.get('cell_bboxes') or []
         
         if not cells or len(cells) < 1:
             return None
         
         # Detect caption (look above table)
-        caption = self._detect_caption(page_obj, region['bbox'])
+        caption = self._detect_caption(region.get('words'), region['bbox'])
         table_number = self._extract_table_number(caption)
         
         # Extract headers (first row typically)
@@ -1074,7 +956,7 @@ class TableExtractorImpl(TableExtractor):
         )
         
         # Post-process: detect formulas, generate description, etc.
-        self._post_process_table(table_segment, page_obj)
+        self._post_process_table(table_segment, None)
         
         return table_segment
     
@@ -1237,7 +1119,7 @@ class TableExtractorImpl(TableExtractor):
         self._post_process_table(table_segment, None)
         return table_segment
     
-    def _detect_caption(self, page_obj, table_bbox) -> str:
+    def _detect_caption(self, words: Optional[List[Dict]], table_bbox) -> str:
         """Detect table caption above or below the table"""
         if not table_bbox:
             return ""
@@ -1254,7 +1136,6 @@ class TableExtractorImpl(TableExtractor):
         ]
         
         try:
-            words = page_obj.extract_words()
             if not words:
                 return ""
             
@@ -1348,7 +1229,7 @@ class TableExtractorImpl(TableExtractor):
         return None
     
     def _post_process_table(self, table: TableSegment, page_obj):
-        """Post-process table: formulas, descriptions, linking"""
+        """Post-process table: formulas, descriptions (linking runs batched in _link_tables)"""
         # Detect formulas
         formula_cells = self.detect_formulas(table)
         table.formula_cells = formula_cells
@@ -1361,14 +1242,17 @@ class TableExtractorImpl(TableExtractor):
         description = self.generate_description(table)
         table.description = description
         table.table_summary = description
-
+    
+    def _link_tables(self, tables: List[TableSegment]) -> None:
+        """Concept links (batched) then cross-references for each table"""
         # Concept linking (if taxonomy available)
-        if self.concept_taxonomy:
-            self.link_to_concepts(table, self.concept_taxonomy)
+        if self.concept_taxonomy and tables:
+            self.link_tables_to_concepts(tables, self.concept_taxonomy)
 
         # Cross-reference linking (if document text available)
         if self.document_text:
-            self.find_cross_references(table, self.document_text)
+            for table in tables:
+                self.find_cross_references(table, self.document_text)
     
     def detect_formulas(self, table: TableSegment) -> List[FormulaCell]:
         """Detect formulas within table"""
@@ -1479,126 +1363,95 @@ class TableExtractorImpl(TableExtractor):
     
     def link_to_concepts(self, table: TableSegment, concept_taxonomy: Dict) -> List[str]:
         """Link table to concept IDs using keyword and semantic matching"""
-        linked = []
-        linked_concepts = []
+        return self.link_tables_to_concepts([table], concept_taxonomy)[0]
+
+    def link_tables_to_concepts(self, tables: List[TableSegment], concept_taxonomy: Dict) -> List[List[str]]:
+        """Link a batch of tables to concept IDs: one batched similarity product, one keyword scan per table"""
+        index = self._get_concept_index(concept_taxonomy)
         
         # Build search text from table content
-        search_text = f"{table.caption} {' '.join(str(h) for h in table.col_headers if h is not None)} {table.description}"
-        search_text_lower = search_text.lower()
+        search_texts = [
+            f"{table.caption} {' '.join(str(h) for h in table.col_headers if h is not None)} {table.description}"
+            for table in tables
+        ]
         
-        # Try semantic matching first (if available)
-        semantic_matches = []
+        # Semantic matching: top 5 concepts above 0.3 cosine (empty if sentence-transformers unavailable)
         try:
-            from sentence_transformers import SentenceTransformer
-            import numpy as np
-            
-            # Lazy load model (cache it)
-            if not hasattr(self, '_semantic_model'):
-                self._semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
+            semantic_batches = index.semantic_matches(search_texts, threshold=0.3, top_k=5)
+        except Exception:
+            # If semantic matching fails, fall back to keyword matching
+            semantic_batches = [[] for _ in tables]
+        
+        results = []
+        for table, search_text, semantic_matches in zip(tables, search_texts, semantic_batches):
+            linked = []
+            linked_concepts = []
             
-            # Embed table description
-            table_embedding = self._semantic_model.encode([search_text], convert_to_numpy=True)[0]
+            # Keyword matching
+            keyword_matches = index.keyword_matches(search_text)
             
-            # Embed all concepts
-            concept_texts = []
-            concept_ids = []
-            for concept_id, concept_info in concept_taxonomy.items():
-                concept_text = f"{concept_info.get('name', '')} {concept_info.get('description', '')} {' '.join(concept_info.get('keywords', []))}"
-                concept_texts.append(concept_text)
-                concept_ids.append(concept_id)
+            # Combine semantic and keyword matches
+            all_matches = {}
             
-            if concept_texts:
-                concept_embeddings = self._semantic_model.encode(concept_texts, convert_to_numpy=True)
-                
-                # Compute cosine similarities
-                similarities = np.dot(concept_embeddings, table_embedding) / (
-                    np.linalg.norm(concept_embeddings, axis=1) * np.linalg.norm(table_embedding)
-                )
-                
-                # Get top matches above threshold
-                threshold = 0.3  # Lower threshold for semantic matching
-                for i, similarity in enumerate(similarities):
-                    if similarity >= threshold:
-                        semantic_matches.append((concept_ids[i], similarity))
+            # Add semantic matches (higher confidence)
+            for concept_id, similarity in semantic_matches:
+                all_matches[concept_id] = {
+                    'confidence': float(similarity),
+                    'method': 'semantic',
+                    'evidence': f"Semantic similarity: {similarity:.2f}"
+                }
             
-            # Sort by similarity
-            semantic_matches.sort(key=lambda x: x[1], reverse=True)
+            # Add keyword matches (merge with semantic if exists)
+            for concept_id, score, matches in keyword_matches:
+                if concept_id in all_matches:
+                    # Boost confidence if both methods agree
+                    all_matches[concept_id]['confidence'] = min(1.0, all_matches[concept_id]['confidence'] + 0.2)
+                    all_matches[concept_id]['method'] = 'semantic+keyword'
+                    all_matches[concept_id]['evidence'] += f" + Keywords: {', '.join(matches[:3])}"
+                else:
+                    all_matches[concept_id] = {
+                        'confidence': score * 0.8,  # Slightly lower than semantic
+                        'method': 'keyword',
+                        'evidence': f"Keyword match: {', '.join(matches[:3])}"
+                    }
             
-        except ImportError:
-            # sentence-transformers not available, skip semantic matching
-            pass
-        except Exception as e:
-            # If semantic matching fails, fall back to keyword matching
-            pass
-        
-        # Keyword matching
-        keyword_matches = []
-        for concept_id, concept_info in concept_taxonomy.items():
-            concept_keywords = concept_info.get('keywords', [])
-            concept_name = concept_info.get('name', '')
+            # Create links for matches above threshold
+            final_threshold = 0.4
+            for concept_id, match_info in all_matches.items():
+                if match_info['confidence'] >= final_threshold:
+                    linked.append(concept_id)
+                    linked_concepts.append((concept_id, match_info))
+                    
+                    table.links.append(TableLink(
+                        link_type=LinkType.TABLE_OF,
+                        target_id=concept_id,
+                        source_anchor=table.source_anchor,
+                        evidence=match_info['evidence'],
+                        confidence=match_info['confidence']
+                    ))
             
-            # Check keyword matches
-            matches = []
-            for kw in concept_keywords + [concept_name]:
-                if kw.lower() in search_text_lower:
-                    matches.append(kw)
+            # Sort by confidence
+            linked_concepts.sort(key=lambda x: x[1]['confidence'], reverse=True)
+            table.linked_concept_ids = [c[0] for c in linked_concepts]
             
-            if matches:
-                # Score based on number of keyword matches
-                score = min(1.0, len(matches) / max(len(concept_keywords), 1))
-                keyword_matches.append((concept_id, score, matches))
-        
-        # Combine semantic and keyword matches
-        all_matches = {}
-        
-        # Add semantic matches (higher confidence)
-        for concept_id, similarity in semantic_matches[:5]:  # Top 5 semantic matches
-            all_matches[concept_id] = {
-                'confidence': float(similarity),
-                'method': 'semantic',
-                'evidence': f"Semantic similarity: {similarity:.2f}"
-            }
-        
-        # Add keyword matches (merge with semantic if exists)
-        for concept_id, score, matches in keyword_matches:
-            if concept_id in all_matches:
-                # Boost confidence if both methods agree
-                all_matches[concept_id]['confidence'] = min(1.0, all_matches[concept_id]['confidence'] + 0.2)
-                all_matches[concept_id]['method'] = 'semantic+keyword'
-                all_matches[concept_id]['evidence'] += f" + Keywords: {', '.join(matches[:3])}"
-            else:
-                all_matches[concept_id] = {
-                    'confidence': score * 0.8,  # Slightly lower than semantic
-                    'method': 'keyword',
-                    'evidence': f"Keyword match: {', '.join(matches[:3])}"
-                }
-        
-        # Create links for matches above threshold
-        final_threshold = 0.4
-        for concept_id, match_info in all_matches.items():
-            if match_info['confidence'] >= final_threshold:
-                linked.append(concept_id)
-                linked_concepts.append((concept_id, match_info))
-                
-                concept_name = concept_taxonomy[concept_id].get('name', concept_id)
-                table.links.append(TableLink(
-                    link_type=LinkType.TABLE_OF,
-                    target_id=concept_id,
-                    source_anchor=table.source_anchor,
-                    evidence=match_info['evidence'],
-                    confidence=match_info['confidence']
-                ))
-        
-        # Sort by confidence
-        linked_concepts.sort(key=lambda x: x[1]['confidence'], reverse=True)
-        table.linked_concept_ids = [c[0] for c in linked_concepts]
+            if linked:
+                methods_used = set(m['method'] for _, m in linked_concepts)
+                print(f"  Linked to {len(linked)} concept(s) using: {', '.join(methods_used)}")
+            results.append(table.linked_concept_ids)
         
-        if linked:
-            methods_used = set(m['method'] for _, m in linked_concepts)
-            print(f"  Linked to {len(linked)} concept(s) using: {', '.join(methods_used)}")
-        
-        return table.linked_concept_ids
+        return results
     
+    def _get_reference_index(self, document_text: str):
+        """Reference index over the document, built once per document text"""
+        if self._reference_index is None or self._reference_index_source != id(document_text):
+            if document_text is self.document_text and self.page_text_by_number:
+                pages = sorted(self.page_text_by_number.items())
+                self._reference_index = ReferenceIndex.from_pages(pages)
+            else:
+                self._reference_index = ReferenceIndex(document_text)
+            self._reference_index_source = id(document_text)
+        return self._reference_index
+
     def find_cross_references(self, table: TableSegment, document_text: str) -> List[TableLink]:
         """Find paragraphs that reference this table"""
         links = []
@@ -1607,6 +1460,25 @@ class TableExtractorImpl(TableExtractor):
             return links
         
         # Look for references like "see Table 2.1", "Table 2.1 shows", etc.
+        if REFERENCE_INDEX_AVAILABLE:
+            index = self._get_reference_index(document_text)
+            for mention in index.verb_mentions("table", table.table_number):
+                links.append(TableLink(
+                    link_type=LinkType.REFERENCES,
+                    target_id=table.segment_id,
+                    source_anchor=SourceAnchor(
+                        page_number=table.source_anchor.page_number,
+                        bbox=(0, 0, 0, 0),
+                        extractor='text_search',
+                        confidence=0.9,
+                        metadata={'mention_page': mention['page'], 'char_offset': mention['start']}
+                    ),
+                    evidence=mention['evidence'],
+                    confidence=0.9
+                ))
+            table.links.extend(links)
+            return links
+        
         patterns = [
             rf'see\s+Table\s+{re.escape(table.table_number)}',
             rf'Table\s+{re.escape(table.table_number)}\s+shows',